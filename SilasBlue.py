@@ -1,41 +1,28 @@
 """
 Silas Blue - Discord Bot powered by local AI models via Ollama
-Main entry point: launches both the Discord bot and the GUI.
+Main entry point: launches the GUI and runs the Discord bot in a child process.
+Run with --headless (or SILASBLUE_HEADLESS=1) to start only the bot, the Ollama
+supervisor and file logging, without importing PySide6.
 """
 
 import sys
 import threading
 import os
 import logging
+import signal
+import time
+import argparse
+import multiprocessing
 
-from gui.main_window import MainWindow
-from PySide6.QtWidgets import QApplication, QSplashScreen
-from PySide6.QtCore import QTimer
-from PySide6.QtGui import QPixmap
+import psutil
 
-from bot_core import start_bot, stop_bot, restart_bot
+from bot_core import start_bot, stop_bot, restart_bot, reload_all_server_configs, get_discord_token
+from bot_ipc import BotProcess
 from ollama_api import OllamaClient
+from ollama_supervisor import get_supervisor
 import config  # Changed from 'from config import DEBUG'
 from utils import get_resource_path
 
-# Ensure logs directory exists
-os.makedirs('logs', exist_ok=True)
-
-# Set up logging to file
-logging.basicConfig(
-    filename='logs/silasblue.log',
-    filemode='a',
-    format='%(asctime)s %(levelname)s:%(message)s',
-    level=logging.DEBUG  # or INFO, as needed
-)
-
-# Redirect stdout and stderr to log files
-sys.stdout = open('logs/stdout.log', 'a')
-sys.stderr = open('logs/stderr.log', 'a')
-
-# Force the root logger's level based on config.DEBUG
-logging.getLogger().setLevel(logging.DEBUG if getattr(config, 'DEBUG', False) else logging.INFO)
-
 # --- Crash counter logic for auto-debug ---
 CRASH_COUNTER_FILE = get_resource_path(os.path.join('config', 'crash_counter.txt'))
 def get_crash_counter():
@@ -52,21 +39,61 @@ def set_crash_counter(val):
     except Exception:
         pass
 
-# Only check and set debug mode if crash counter is high, but do not increment here
-count = get_crash_counter()
-if count >= 2:
-    # Set DEBUG=True in config.py
-    try:
-        with open('config.py', 'w', encoding='utf-8') as f:
-            f.write('DEBUG = True\n')
-    except Exception:
-        pass
-    set_crash_counter(0)  # Reset after enabling debug
+def setup_main_process():
+    """
+    Token prompt, file logging, output redirection and the crash counter check.
+    Only for the main process: bot and shard group processes are spawned, and they
+    import this module again, so none of this may run at import time.
+    """
+    # Ask for the token now, while the console is still attached, so it is saved before a bot process is spawned
+    get_discord_token()
+
+    # Ensure logs directory exists
+    os.makedirs('logs', exist_ok=True)
+
+    # Set up logging to file
+    logging.basicConfig(
+        filename='logs/silasblue.log',
+        filemode='a',
+        format='%(asctime)s %(levelname)s:%(message)s',
+        level=logging.DEBUG  # or INFO, as needed
+    )
+
+    # Redirect stdout and stderr to log files
+    sys.stdout = open('logs/stdout.log', 'a')
+    sys.stderr = open('logs/stderr.log', 'a')
+
+    # Force the root logger's level based on config.DEBUG
+    logging.getLogger().setLevel(logging.DEBUG if getattr(config, 'DEBUG', False) else logging.INFO)
+
+    # Only check and set debug mode if crash counter is high, but do not increment here
+    count = get_crash_counter()
+    if count >= 2:
+        # Set DEBUG=True in config.py
+        try:
+            with open('config.py', 'w', encoding='utf-8') as f:
+                f.write('DEBUG = True\n')
+        except Exception:
+            pass
+        set_crash_counter(0)  # Reset after enabling debug
+
+def log_startup_stats(mode):
+    """Logs time since process start and current RSS, so GUI and headless startup can be compared."""
+    process = psutil.Process()
+    elapsed = time.time() - process.create_time()
+    rss_mb = process.memory_info().rss / (1024 * 1024)
+    logging.info(f"Startup complete ({mode} mode) in {elapsed:.2f}s, RSS {rss_mb:.1f} MB.")
 
 def start_gui_and_bot():
     """
-    Starts the PySide6 GUI in the main thread and starts the bot after the event loop starts.
+    Starts the PySide6 GUI in the main thread and starts the bot process after the event loop starts.
     """
+    # Imported here so headless mode never loads Qt
+    from gui.main_window import MainWindow
+    from PySide6.QtWidgets import QApplication, QSplashScreen
+    from PySide6.QtCore import QTimer
+    from PySide6.QtGui import QPixmap
+
     print("[DEBUG] Creating QApplication...")
     logging.debug("Creating QApplication...")
     app = QApplication(sys.argv)
@@ -84,7 +111,11 @@ def start_gui_and_bot():
     def show_main_window():
         print("[DEBUG] Creating MainWindow...")
         logging.debug("Creating MainWindow...")
-        window = MainWindow(start_bot=start_bot, stop_bot=stop_bot, restart_bot=restart_bot)
+        bot_process = BotProcess()
+        window = MainWindow(
+            start_bot=bot_process.start, stop_bot=bot_process.stop,
+            restart_bot=bot_process.restart, bot_client=bot_process
+        )
         print("[DEBUG] MainWindow created.")
         logging.debug("MainWindow created.")
         window.show()
@@ -94,7 +125,7 @@ def start_gui_and_bot():
         logging.debug("MainWindow shown.")
         window.redirect_output_to_log()
         # Start the bot after the event loop starts
-        QTimer.singleShot(100, lambda: logging.debug("Starting bot...") or start_bot())
+        QTimer.singleShot(100, lambda: logging.debug("Starting bot...") or bot_process.start() or log_startup_stats("GUI"))
 
     # Show the main window as soon as possible (no fixed delay)
     QTimer.singleShot(100, show_main_window)
@@ -105,7 +136,14 @@ def start_gui_and_bot():
 def ensure_ollama_running():
     """
     Checks if Ollama is running, and starts it if not. Runs in a background thread.
+    If supervised Ollama instances are configured, starts those instead.
     """
+    supervisor = get_supervisor()
+    if supervisor is not None:
+        logging.info(f"Starting {len(supervisor.instances)} supervised Ollama instance(s)...")
+        if not supervisor.start():
+            logging.error("Some supervised Ollama instances failed to start; they will be retried.")
+        return
     ollama_client = OllamaClient()
     if not ollama_client.status():
         logging.info("Ollama is not running. Attempting to start Ollama service...")
@@ -117,12 +155,62 @@ def ensure_ollama_running():
     else:
         logging.info("Ollama service is already running.")
 
+def run_headless():
+    """
+    Runs the bot without a GUI until SIGTERM/SIGINT. SIGHUP reloads every server config
+    and SIGUSR1 restarts the bot without dropping prompts.
+    """
+    stop_requested = threading.Event()
+
+    def request_stop(signum, frame):
+        logging.info(f"Received {signal.Signals(signum).name}; shutting down.")
+        stop_requested.set()
+
+    def request_reload(signum, frame):
+        logging.info("Received SIGHUP; reloading server configs.")
+        # Off the signal handler, since loading configs queries Ollama
+        threading.Thread(target=reload_all_server_configs, daemon=True).start()
+
+    def request_restart(signum, frame):
+        logging.info("Received SIGUSR1; restarting the bot gracefully.")
+        threading.Thread(target=restart_bot, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    if hasattr(signal, "SIGHUP"):  # Not available on Windows
+        signal.signal(signal.SIGHUP, request_reload)
+        signal.signal(signal.SIGUSR1, request_restart)
+
+    ensure_ollama_running()
+    start_bot()
+    log_startup_stats("headless")
+    # Wake up periodically so signals are handled promptly on every platform
+    while not stop_requested.wait(1.0):
+        pass
+    stop_bot()
+    supervisor = get_supervisor()
+    if supervisor is not None:
+        supervisor.stop()
+    logging.info("Headless shutdown complete.")
+
 if __name__ == "__main__":
-    logging.debug("Starting Ollama ensure thread...")
+    # In the frozen build a spawned bot or shard process runs this exe again; this makes it
+    # run the child's target instead of a second GUI. It returns at once in the main process.
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(description="Silas Blue Discord bot")
+    parser.add_argument("--headless", action="store_true", help="run without the GUI (no PySide6 needed)")
+    args = parser.parse_args()
+    headless = args.headless or os.environ.get("SILASBLUE_HEADLESS") == "1"
+    setup_main_process()
     try:
-        threading.Thread(target=ensure_ollama_running, daemon=True).start()
-        logging.debug("Starting GUI and bot...")
-        start_gui_and_bot()
+        if headless:
+            logging.debug("Starting headless bot...")
+            run_headless()
+        else:
+            logging.debug("Starting Ollama ensure thread...")
+            threading.Thread(target=ensure_ollama_running, daemon=True).start()
+            logging.debug("Starting GUI and bot...")
+            start_gui_and_bot()
         set_crash_counter(0)  # Reset on clean exit
     except Exception as e:
         logging.error(f"Unhandled exception: {e}")
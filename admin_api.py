@@ -0,0 +1,199 @@
+"""
+Local admin API for the running bot.
+Serves the bot_control commands over HTTP on the loopback interface (or a Unix socket),
+so headless instances can be inspected and controlled by scripts. Runs on the bot's own
+event loop with aiohttp; commands run in a worker thread so message handling never waits.
+"""
+
+import asyncio
+import logging
+import secrets
+
+from aiohttp import web
+
+from bot_control import dispatch, ControlError
+from metrics import REGISTRY
+
+logger = logging.getLogger("silasblue")
+
+
+class AdminAPI:
+    """
+    HTTP front end for bot_control.dispatch().
+
+    Routes (all answer {"ok": true, "result": ...} or {"ok": false, "error": "..."}):
+        GET  /status, /guilds, /models, /models/stats, /queue, /inflight, /traces, /loop
+        GET  /guilds/{guild_id}/config
+        PATCH /guilds/{guild_id}/config      body: fields to change
+        POST /cancel/{message_id}
+        POST /reload                         body (optional): {"guild_id": ...}
+        GET  /bench                          stored benchmark results
+        POST /bench                          body (optional): {"models": [...], "replay": n}
+        GET  /memory?limit&group_by&objects  memory use, allocation growth, live object counts
+        POST /memory/snapshot                body (optional): {"baseline": true}
+        POST /memory/tracing                 body: {"enabled": true|false, "frames": n}
+        POST /profile                        body (optional): {"seconds": n, "interval": s}; answers when done
+        POST /commands/{name}                body: keyword arguments for any command
+        GET  /metrics                        Prometheus text format (see metrics.py)
+    If `token` is set, requests need an "Authorization: Bearer <token>" header. Request
+    bodies must be sent as application/json (415 otherwise), so a web page cannot post
+    a plain form to the API.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, socket_path=None, token=None):
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.token = token
+        self._runner = None
+
+    async def start(self):
+        app = web.Application(middlewares=[self._auth])
+        app.add_routes([
+            web.get("/status", self._simple("status")),
+            web.get("/guilds", self._simple("guilds")),
+            web.get("/models", self._simple("models")),
+            web.get("/models/stats", self._simple("model_stats")),
+            web.get("/queue", self._simple("queue")),
+            web.get("/inflight", self._simple("in_flight")),
+            web.get("/traces", self._traces),
+            web.get("/loop", self._simple("loop_monitor")),
+            web.get("/guilds/{guild_id}/config", self._get_config),
+            web.patch("/guilds/{guild_id}/config", self._update_config),
+            web.post("/cancel/{message_id}", self._cancel),
+            web.post("/reload", self._reload),
+            web.get("/bench", self._simple("bench_results")),
+            web.post("/bench", self._bench),
+            web.get("/memory", self._memory),
+            web.post("/memory/snapshot", self._memory_snapshot),
+            web.post("/memory/tracing", self._memory_tracing),
+            web.post("/profile", self._profile),
+            web.post("/commands/{name}", self._command),
+            web.get("/metrics", self._metrics),
+        ])
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        if self.socket_path:
+            site = web.UnixSite(self._runner, self.socket_path)
+        else:
+            site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info(f"Admin API listening on {self.socket_path or f'http://{self.host}:{self.port}'}")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @web.middleware
+    async def _auth(self, request, handler):
+        if self.token and request.headers.get("Authorization") != f"Bearer {self.token}":
+            return web.json_response({"ok": False, "error": "Unauthorized"}, status=401)
+        return await handler(request)
+
+    async def _call(self, name, args=None):
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(None, dispatch, name, args)
+        except ControlError as e:
+            return web.json_response({"ok": False, "error": str(e)}, status=400)
+        except Exception as e:
+            logger.error(f"Admin API command {name} failed: {e}")
+            return web.json_response({"ok": False, "error": f"Error: {e}"}, status=500)
+        return web.json_response({"ok": True, "result": result})
+
+    @staticmethod
+    async def _json_body(request):
+        if not request.can_read_body:
+            return {}
+        if request.content_type != "application/json":
+            raise web.HTTPUnsupportedMediaType(text="Body must be sent as application/json.")
+        try:
+            body = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(text="Body must be JSON.")
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(text="Body must be a JSON object.")
+        return body
+
+    def _simple(self, name):
+        async def handler(request):
+            return await self._call(name)
+        return handler
+
+    async def _get_config(self, request):
+        return await self._call("get_config", {"guild_id": request.match_info["guild_id"]})
+
+    async def _update_config(self, request):
+        changes = await self._json_body(request)
+        return await self._call("update_config", {"guild_id": request.match_info["guild_id"], "changes": changes})
+
+    async def _cancel(self, request):
+        return await self._call("cancel", {"message_id": request.match_info["message_id"]})
+
+    async def _reload(self, request):
+        body = await self._json_body(request)
+        return await self._call("reload_config", {"guild_id": body.get("guild_id")})
+
+    async def _bench(self, request):
+        body = await self._json_body(request)
+        return await self._call("bench", {key: body[key] for key in ("models", "replay") if key in body})
+
+    async def _memory(self, request):
+        args = {key: request.query[key] for key in ("limit", "group_by") if key in request.query}
+        if "objects" in request.query:
+            args["objects"] = request.query["objects"].lower() in ("1", "true", "yes")
+        return await self._call("memory", args)
+
+    async def _memory_snapshot(self, request):
+        body = await self._json_body(request)
+        return await self._call("memory_snapshot", {"baseline": bool(body.get("baseline", False))})
+
+    async def _memory_tracing(self, request):
+        body = await self._json_body(request)
+        return await self._call("memory_tracing", {key: body[key] for key in ("enabled", "frames") if key in body})
+
+    async def _profile(self, request):
+        body = await self._json_body(request)
+        return await self._call("profile", {key: body[key] for key in ("seconds", "interval") if key in body})
+
+    async def _command(self, request):
+        return await self._call(request.match_info["name"], await self._json_body(request))
+
+    async def _traces(self, request):
+        args = {key: request.query[key] for key in ("limit", "order") if key in request.query}
+        return await self._call("traces", args)
+
+    async def _metrics(self, request):
+        return web.Response(text=REGISTRY.render(), content_type="text/plain", headers={"X-Content-Type-Options": "nosniff"})
+
+
+async def start_admin_api():
+    """
+    Starts the admin API from app_config.json settings (admin_api_enabled, admin_api_host,
+    admin_api_port, admin_api_socket, admin_api_token). Returns it, or None if it is
+    disabled or could not bind. Without a token, one is generated and saved to
+    app_config.json, so any local program (or web page) cannot drive the bot unasked.
+    """
+    from utils import load_app_config, save_app_config
+    app_config = load_app_config()
+    if not app_config.get("admin_api_enabled", True):
+        return None
+    token = app_config.get("admin_api_token")
+    if not token:
+        token = app_config["admin_api_token"] = secrets.token_urlsafe(32)
+        save_app_config(app_config)
+        logger.info("Generated an admin API token; it is admin_api_token in config/app_config.json.")
+    api = AdminAPI(
+        host=app_config.get("admin_api_host", "127.0.0.1"),
+        port=app_config.get("admin_api_port", 8765),
+        socket_path=app_config.get("admin_api_socket"),
+        token=token,
+    )
+    try:
+        await api.start()
+    except OSError as e:
+        logger.error(f"Admin API could not start: {e}")
+        await api.stop()
+        return None
+    return api
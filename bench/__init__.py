@@ -0,0 +1,6 @@
+"""
+Offline benchmark harness for Silas Blue.
+mock_ollama serves a fake Ollama HTTP API and discord_fakes provides stand-ins for
+discord.py messages, guilds and members, so the bot's prompt path can be exercised and
+timed without a Discord token or a real Ollama.
+"""
@@ -0,0 +1,166 @@
+"""
+Stand-ins for the discord.py objects the bot's prompt path touches.
+They implement just enough of Message, TextChannel, Guild, Member and Role for
+bot_core.handle_ollama_prompt and the permission checks, record every send, edit and
+delete, and can add a fixed latency to each Discord call to mimic the real API.
+
+    bot_core = load_bot_core()
+    guild = FakeGuild("Bench Server")
+    channel = FakeChannel(guild, latency=0.05)
+    message = channel.incoming("Tell me a joke", FakeMember(guild, "alice"))
+"""
+
+import os
+import time
+import asyncio
+import itertools
+import importlib
+from types import SimpleNamespace
+
+# Snowflake-sized IDs, unique across all fake objects
+_ids = itertools.count(900000000000000000)
+
+def next_id():
+    return next(_ids)
+
+
+class FakeRole:
+    def __init__(self, name, guild=None, position=0):
+        self.id = next_id()
+        self.name = name
+        self.guild = guild
+        self.position = position
+
+    def is_default(self):
+        return self.name == "@everyone"
+
+    def __str__(self):
+        return self.name
+
+
+class FakeGuild:
+    def __init__(self, name="Bench Server", role_names=("admin", "member")):
+        self.id = next_id()
+        self.name = name
+        self.roles = [FakeRole("@everyone", self, 0)] + [
+            FakeRole(role, self, position) for position, role in enumerate(role_names, start=1)
+        ]
+        self.members = []
+        self.owner = None
+        self.shard_id = 0
+
+    def get_role(self, name):
+        return next((role for role in self.roles if role.name == name), None)
+
+    def get_member(self, member_id):
+        return next((member for member in self.members if member.id == member_id), None)
+
+
+class FakeMember:
+    def __init__(self, guild, name="bench-user", roles=(), administrator=False, bot=False):
+        self.id = next_id()
+        self.name = name
+        self.display_name = name
+        self.guild = guild
+        self.bot = bot
+        self.roles = [guild.get_role("@everyone")] + [guild.get_role(role) or FakeRole(role, guild) for role in roles]
+        self.guild_permissions = SimpleNamespace(administrator=administrator)
+        self.mention = f"<@{self.id}>"
+        guild.members.append(self)
+        if guild.owner is None and administrator:
+            guild.owner = self
+
+    def __str__(self):
+        return self.name
+
+    def __eq__(self, other):
+        return getattr(other, "id", None) == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class FakeMessage:
+    def __init__(self, channel, content, author, reference=None, view=None, attachments=()):
+        self.id = next_id()
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.author = author
+        self.reference = reference
+        self.view = view
+        self.attachments = list(attachments)
+        self.mentions = []
+        self.deleted = False
+        self.edits = []  # (time.perf_counter(), changes) per edit
+        self.created = time.perf_counter()
+
+    async def edit(self, **changes):
+        await self.channel._call("edit")
+        if "content" in changes:
+            self.content = changes["content"]
+        if "view" in changes:
+            self.view = changes["view"]
+        if "attachments" in changes:
+            self.attachments = list(changes["attachments"])
+        self.edits.append((time.perf_counter(), changes))
+        return self
+
+    async def delete(self):
+        await self.channel._call("delete")
+        self.deleted = True
+
+    async def reply(self, content=None, **kwargs):
+        return await self.channel.send(content, reference=self, **kwargs)
+
+
+class FakeChannel:
+    """
+    A text channel that records what the bot sends. `latency` (seconds) is added to every
+    send, edit and delete; `calls` counts them by kind.
+    """
+
+    def __init__(self, guild, name="bench", latency=0.0, bot_user=None):
+        self.id = next_id()
+        self.name = name
+        self.guild = guild
+        self.latency = latency
+        self.bot_user = bot_user or FakeMember(guild, "Silas Blue", bot=True)
+        self.messages = {}
+        self.sent = []
+        self.calls = {"send": 0, "edit": 0, "delete": 0}
+
+    async def _call(self, kind):
+        self.calls[kind] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def incoming(self, content, author, mentions_bot=False):
+        """A message from `author`, as on_message would receive it."""
+        if mentions_bot:
+            content = f"<@{self.bot_user.id}> {content}"
+        message = FakeMessage(self, content, author)
+        if mentions_bot:
+            message.mentions.append(self.bot_user)
+        self.messages[message.id] = message
+        return message
+
+    async def send(self, content=None, *, view=None, reference=None, file=None, files=None, embed=None, **kwargs):
+        await self._call("send")
+        attachments = [file] if file is not None else list(files or [])
+        message = FakeMessage(self, content, self.bot_user, reference=reference, view=view, attachments=attachments)
+        self.messages[message.id] = message
+        self.sent.append(message)
+        return message
+
+    async def fetch_message(self, message_id):
+        message = self.messages.get(message_id)
+        if message is None:
+            raise LookupError(f"Unknown message {message_id}")
+        return message
+
+
+def load_bot_core(token="bench-token"):
+    """Imports bot_core without a Discord token or a console prompt, and returns it."""
+    os.environ.setdefault("SILASBLUE_DISCORD_TOKEN", token)
+    return importlib.import_module("bot_core")
@@ -0,0 +1,350 @@
+"""
+End-to-end load generator.
+Drives the real on_message pipeline (permissions, routing, the prompt queue, streaming
+from Ollama, pagination and Discord sends) with synthetic traffic from many guilds,
+channels and users, against the mock Ollama server. Reports throughput, latency
+percentiles, event-loop lag and memory.
+
+    python -m bench.loadgen ramp --start-rate 1 --end-rate 40 --steps 8 --step-seconds 20
+    python -m bench.loadgen soak --rate 5 --duration 600
+
+Profiles:
+    ramp  raises the message rate step by step, to find where latency collapses
+    soak  holds one rate for a long time, to catch leaks and slow drift
+
+Traffic is a mix of prompts that mention the bot, commands and noise (messages not
+addressed to the bot). Commands are routed by on_message as usual but answered with a
+plain send, because discord.py's command context needs a live connection.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+import psutil
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+RESULTS_DIR = os.path.join(REPO_DIR, "bench", "results")
+
+PROMPTS = [
+    "what's a good name for a cat?",
+    "explain recursion like I'm five",
+    "write a haiku about servers",
+    "give me three tips for learning python",
+    "summarise the plot of a heist movie in two sentences",
+]
+NOISE = ["lol", "anyone up for a game tonight?", "brb", "that patch broke everything", "gg"]
+COMMANDS = ["!ping", "!models", "!config"]
+
+
+def percentiles(values):
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "count": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": ordered[-1],
+    }
+
+
+class Traffic:
+    """Synthetic guilds, channels and users, and a message picker with a fixed mix."""
+
+    def __init__(self, guilds, channels, users, mention_share, command_share, discord_latency, seed=1):
+        from bench.discord_fakes import FakeGuild, FakeChannel, FakeMember
+        self.random = random.Random(seed)
+        self.mention_share = mention_share
+        self.command_share = command_share
+        self.guilds = []
+        self.channels = []
+        self.users = {}
+        bot_user = None
+        for g in range(guilds):
+            guild = FakeGuild(f"Load Guild {g}")
+            if bot_user is None:
+                bot_user = FakeMember(guild, "Silas Blue", bot=True)
+            self.guilds.append(guild)
+            self.users[guild.id] = [FakeMember(guild, f"user-{g}-{u}") for u in range(users)]
+            for c in range(channels):
+                self.channels.append(FakeChannel(guild, f"chat-{c}", latency=discord_latency, bot_user=bot_user))
+        self.bot_user = bot_user
+
+    def next_message(self):
+        """Returns (kind, message) with kind in "prompt", "command", "noise"."""
+        channel = self.random.choice(self.channels)
+        author = self.random.choice(self.users[channel.guild.id])
+        roll = self.random.random()
+        if roll < self.mention_share:
+            return "prompt", channel.incoming(self.random.choice(PROMPTS), author, mentions_bot=True)
+        if roll < self.mention_share + self.command_share:
+            return "command", channel.incoming(self.random.choice(COMMANDS), author)
+        return "noise", channel.incoming(self.random.choice(NOISE), author)
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic timer fires; that delay is time the loop was blocked."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def take(self):
+        samples, self.samples = self.samples, []
+        return samples
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+class LoadRun:
+    def __init__(self, args):
+        self.args = args
+        self.process = psutil.Process()
+        self.latencies = {"prompt": [], "command": [], "noise": []}
+        self.sent = {"prompt": 0, "command": 0, "noise": 0}
+        self.completed = 0
+        self.errors = 0
+        self.outcomes = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.memory_samples = []
+
+    def on_event(self, event, data):
+        if event == "reply":
+            self.outcomes["replied"] = self.outcomes.get("replied", 0) + 1
+        elif event == "cancelled":
+            reason = data.get("reason") or "cancelled"
+            self.outcomes[reason] = self.outcomes.get(reason, 0) + 1
+
+    async def dispatch(self, on_message, kind, message):
+        # Like discord.py: every event is handled in its own task
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        started = time.perf_counter()
+        try:
+            await on_message(message)
+        except Exception:
+            self.errors += 1
+        else:
+            self.latencies[kind].append(time.perf_counter() - started)
+            if kind == "prompt":
+                self.completed += 1
+        finally:
+            self.in_flight -= 1
+
+    def snapshot(self, window, lag_samples, elapsed):
+        """Stats for one window, then resets the per-window counters."""
+        latencies, self.latencies = self.latencies, {"prompt": [], "command": [], "noise": []}
+        completed, self.completed = self.completed, 0
+        rss = self.process.memory_info().rss / (1024 * 1024)
+        self.memory_samples.append((elapsed, rss))
+        return {
+            **window,
+            "prompts_completed": completed,
+            "throughput_per_second": completed / window["seconds"] if window["seconds"] else 0,
+            "prompt_latency": percentiles(latencies["prompt"]),
+            "command_latency": percentiles(latencies["command"]),
+            "noise_latency": percentiles(latencies["noise"]),
+            "loop_lag": percentiles(lag_samples),
+            "in_flight": self.in_flight,
+            "rss_mb": rss,
+        }
+
+
+async def _generate(run, traffic, on_message, rate, seconds, tasks):
+    """Sends messages with exponential gaps (Poisson arrivals) at `rate` per second."""
+    loop = asyncio.get_running_loop()
+    end = loop.time() + seconds
+    while True:
+        gap = traffic.random.expovariate(rate) if rate > 0 else seconds
+        if loop.time() + gap >= end:
+            await asyncio.sleep(max(0.0, end - loop.time()))
+            return
+        await asyncio.sleep(gap)
+        kind, message = traffic.next_message()
+        run.sent[kind] += 1
+        task = asyncio.create_task(run.dispatch(on_message, kind, message))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+def _windows(args):
+    """(label, rate, seconds) for each reporting window of the profile."""
+    if args.profile == "ramp":
+        steps = max(args.steps, 1)
+        for step in range(steps):
+            rate = args.start_rate + (args.end_rate - args.start_rate) * step / max(steps - 1, 1)
+            yield f"step {step + 1}/{steps}", rate, args.step_seconds
+    else:
+        windows = max(1, int(args.duration // args.report_every))
+        for window in range(windows):
+            yield f"{(window + 1) * args.report_every:.0f}s", args.rate, args.duration / windows
+
+async def _run(args, bot_core):
+    traffic = Traffic(args.guilds, args.channels, args.users, args.mention, args.command, args.discord_latency, args.seed)
+    bot = bot_core.create_bot()
+    bot._connection.user = traffic.bot_user  # What login would set
+    import utils
+    for guild in traffic.guilds:
+        # The defaults load_config writes for a new guild, without a file per guild
+        bot_core.server_configs[guild.id] = {
+            "default_model": "mock-llama",
+            "reply_roles": ["everyone"],
+            "change_model_roles": ["admin", "owner"],
+            "change_permission_roles": ["admin", "owner"],
+            "pagination_enabled": True,
+            "pagination_max_chars": 2000,
+            "random_prompt_enabled": False,
+            "random_prompt_probability": 0,
+            **utils.GENERATION_DEFAULTS,
+            "num_predict": args.tokens,
+        }
+    async def process_commands(message):
+        await message.channel.send("ok")
+    bot.process_commands = process_commands  # See the module docstring
+    on_message = bot.on_message
+
+    run = LoadRun(args)
+    bot_core.add_event_listener(run.on_event)
+    monitor = LoopLagMonitor()
+    monitor.start()
+    tasks = set()
+    windows = []
+    started = time.perf_counter()
+    print(f"{'window':<12} {'rate':>6} {'done/s':>7} {'p50':>7} {'p95':>7} {'p99':>7} {'lag p99':>8} {'lag max':>8} {'flight':>7} {'rss MB':>8}")
+    try:
+        for label, rate, seconds in _windows(args):
+            await _generate(run, traffic, on_message, rate, seconds, tasks)
+            window = run.snapshot({"window": label, "rate": rate, "seconds": seconds}, monitor.take(), time.perf_counter() - started)
+            windows.append(window)
+            latency = window["prompt_latency"]
+            lag = window["loop_lag"]
+            def ms(stats, key):
+                return f"{stats[key] * 1000:.0f}ms" if stats.get("count") else "-"
+            print(f"{label:<12} {rate:>6.1f} {window['throughput_per_second']:>7.2f} {ms(latency, 'p50'):>7} "
+                  f"{ms(latency, 'p95'):>7} {ms(latency, 'p99'):>7} {ms(lag, 'p99'):>8} {ms(lag, 'max'):>8} "
+                  f"{window['in_flight']:>7} {window['rss_mb']:>8.1f}")
+        # Let in-flight prompts finish so their latencies are counted
+        if tasks:
+            await asyncio.wait(list(tasks), timeout=args.drain_timeout)
+        drained = run.snapshot({"window": "drain", "rate": 0, "seconds": 0}, monitor.take(), time.perf_counter() - started)
+    finally:
+        await monitor.stop()
+        bot_core.remove_event_listener(run.on_event)
+        for task in tasks:
+            task.cancel()
+    # Prompts that neither got a reply nor were cancelled were dropped from the queue or failed
+    settled = sum(run.outcomes.values())
+    run.outcomes["dropped_or_failed"] = max(0, run.sent["prompt"] - settled)
+    memory = run.memory_samples
+    growth = None
+    if len(memory) >= 2 and memory[-1][0] > memory[0][0]:
+        growth = (memory[-1][1] - memory[0][1]) / (memory[-1][0] - memory[0][0]) * 60
+    return {
+        "profile": args.profile,
+        "settings": {key: value for key, value in vars(args).items() if key != "output"},
+        "sent": run.sent,
+        "errors": run.errors,
+        "outcomes": run.outcomes,
+        "peak_in_flight": run.peak_in_flight,
+        "windows": windows,
+        "drain": drained,
+        "memory": {"start_mb": memory[0][1], "end_mb": memory[-1][1], "peak_mb": max(m[1] for m in memory),
+                   "growth_mb_per_minute": growth},
+    }
+
+def run(args):
+    from bench.mock_ollama import MockOllama
+    from bench.discord_fakes import load_bot_core
+    workdir = tempfile.mkdtemp(prefix="silasblue-load-")
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)  # Before importing: config paths are resolved at import time
+    try:
+        with MockOllama(tokens_per_second=args.tokens_per_second, first_token_latency=args.first_token_latency,
+                        max_tokens=args.tokens, failure_rate=args.failure_rate, models=["mock-llama"]) as mock:
+            import utils
+            import ollama_api
+            # Default-URL clients should reach the mock, not a real Ollama
+            utils.OllamaClient = lambda base_url=None: ollama_api.OllamaClient(base_url or mock.url)
+            utils.save_app_config({
+                "ollama_backends": [{"url": mock.url}],
+                "max_concurrent_prompts": args.max_concurrent,
+                "admin_api_enabled": False,
+            })
+            bot_core = load_bot_core()
+            result = asyncio.run(_run(args, bot_core))
+            result["mock_requests"] = mock.requests
+            return result
+    finally:
+        os.chdir(previous_cwd)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for Silas Blue's message pipeline.")
+    sub = parser.add_subparsers(dest="profile", required=True)
+    ramp = sub.add_parser("ramp", help="raise the message rate step by step")
+    ramp.add_argument("--start-rate", type=float, default=1.0, help="messages per second in the first step")
+    ramp.add_argument("--end-rate", type=float, default=40.0, help="messages per second in the last step")
+    ramp.add_argument("--steps", type=int, default=8)
+    ramp.add_argument("--step-seconds", type=float, default=20.0)
+    soak = sub.add_parser("soak", help="hold one rate for a long time")
+    soak.add_argument("--rate", type=float, default=5.0, help="messages per second")
+    soak.add_argument("--duration", type=float, default=600.0, help="seconds")
+    soak.add_argument("--report-every", type=float, default=30.0, help="seconds per reporting window")
+    for profile in (ramp, soak):
+        profile.add_argument("--guilds", type=int, default=50)
+        profile.add_argument("--channels", type=int, default=3, help="channels per guild")
+        profile.add_argument("--users", type=int, default=20, help="users per guild")
+        profile.add_argument("--mention", type=float, default=0.3, help="share of messages that are prompts")
+        profile.add_argument("--command", type=float, default=0.1, help="share of messages that are commands")
+        profile.add_argument("--max-concurrent", type=int, default=4, help="max_concurrent_prompts for the bot")
+        profile.add_argument("--discord-latency", type=float, default=0.05, help="seconds added to each Discord call")
+        profile.add_argument("--tokens-per-second", type=float, default=50.0, help="mock Ollama generation speed")
+        profile.add_argument("--first-token-latency", type=float, default=0.2, help="mock Ollama prompt eval time")
+        profile.add_argument("--tokens", type=int, default=64, help="reply length in tokens")
+        profile.add_argument("--failure-rate", type=float, default=0.0, help="share of mock Ollama requests that fail")
+        profile.add_argument("--drain-timeout", type=float, default=60.0)
+        profile.add_argument("--seed", type=int, default=1)
+        profile.add_argument("--output", help="result file (default: bench/results/loadgen-<profile>-<time>.json)")
+    args = parser.parse_args()
+
+    result = run(args)
+    output = args.output or os.path.join(RESULTS_DIR, f"loadgen-{args.profile}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Sent {result['sent']}, outcomes {result['outcomes']}, errors {result['errors']}, "
+          f"peak in flight {result['peak_in_flight']}")
+    print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    main()
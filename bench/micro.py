@@ -0,0 +1,297 @@
+"""
+Micro-benchmarks for the bot's hot paths.
+
+    python -m bench.micro                         # run all, save bench/results/micro-<time>.json
+    python -m bench.micro --only paginate         # benchmarks whose name contains "paginate"
+    python -m bench.micro --compare OLD.json      # run, then compare against an earlier result
+    python -m bench.micro --compare OLD.json NEW.json
+
+Compare mode prints the change per benchmark and exits with status 1 if any got slower
+than --threshold (default 10%). Runs happen in a scratch working directory, so configs
+and logs written by the code under test never touch the real ones. Needs discord.py
+installed (bot_core is imported), but no Discord token or Ollama: load_config talks to
+the mock Ollama server.
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+RESULTS_DIR = os.path.join(REPO_DIR, "bench", "results")
+
+BENCHMARKS = []
+
+def benchmark(name):
+    """Registers a setup function returning the callable to time (optionally async)."""
+    def register(setup):
+        BENCHMARKS.append((name, setup))
+        return setup
+    return register
+
+
+# --- Timing ---
+def _autorange(func, target=0.2):
+    """Number of calls that takes at least `target` seconds."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= target or number >= 10 ** 7:
+            return number
+        number *= 10
+
+def measure(func, repeat=5, target=0.2):
+    """Per-call time in microseconds: best and median over `repeat` rounds."""
+    number = _autorange(func, target)
+    times = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            times.append((time.perf_counter() - start) / number * 1e6)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return {"calls": number * repeat, "best_us": min(times), "median_us": statistics.median(times)}
+
+
+# --- Benchmarks ---
+def _reply_text(size):
+    """Markdown-ish reply of roughly `size` characters with paragraphs and a code block."""
+    rng = random.Random(size)
+    words = "the bot streams a reply with words of varying length and some punctuation, too.".split()
+    lines = []
+    total = 0
+    while total < size:
+        if rng.random() < 0.05:
+            block = ["```python"] + [f"    value_{i} = compute({i})" for i in range(rng.randint(3, 12))] + ["```"]
+            lines.extend(block)
+            total += sum(len(line) + 1 for line in block)
+        else:
+            line = " ".join(rng.choice(words) for _ in range(rng.randint(5, 30)))
+            lines.append(line)
+            total += len(line) + 1
+    return "\n".join(lines)[:size]
+
+@benchmark("paginate_small")
+def setup_paginate_small(ctx):
+    text = _reply_text(1500)
+    return lambda: ctx.bot_core.paginate_text(text, 2000)
+
+@benchmark("paginate_100kb")
+def setup_paginate_large(ctx):
+    text = _reply_text(100_000)
+    return lambda: ctx.bot_core.paginate_text(text, 2000)
+
+@benchmark("paginate_100kb_single_line")
+def setup_paginate_single_line(ctx):
+    text = "x" * 100_000
+    return lambda: ctx.bot_core.paginate_text(text, 2000)
+
+@benchmark("on_message_not_addressed")
+def setup_on_message(ctx):
+    from bench.discord_fakes import FakeGuild, FakeChannel, FakeMember
+    bot = ctx.bot_core.create_bot()
+    guild = FakeGuild()
+    channel = FakeChannel(guild)
+    bot._connection.user = channel.bot_user  # What login would set
+    author = FakeMember(guild, "chatter")
+    message = channel.incoming("just chatting with friends, nothing for the bot here", author)
+    on_message = bot.on_message
+    async def run():
+        await on_message(message)
+    return run
+
+def _many_roles_member(count):
+    from bench.discord_fakes import FakeGuild, FakeMember
+    guild = FakeGuild(role_names=[f"role-{i}" for i in range(count)])
+    member = FakeMember(guild, "member", roles=[f"role-{i}" for i in range(0, count, 5)])
+    config = {
+        "reply_roles": [f"allowed-{i}" for i in range(20)] + [f"role-{count - 5}"],  # Matches only the member's last role
+        "change_model_roles": [f"allowed-{i}" for i in range(20)],
+    }
+    return guild, member, config
+
+@benchmark("permissions_can_reply_250_roles")
+def setup_can_reply(ctx):
+    from permissions import PermissionManager
+    from bench.discord_fakes import FakeChannel
+    guild, member, config = _many_roles_member(250)
+    message = FakeChannel(guild).incoming("hello", member)
+    permissions = PermissionManager()
+    return lambda: permissions.can_reply(message, config)
+
+@benchmark("permissions_can_change_model_250_roles")
+def setup_can_change_model(ctx):
+    from permissions import PermissionManager
+    guild, member, config = _many_roles_member(250)
+    permissions = PermissionManager()
+    return lambda: permissions.can_change_model(member, guild, config)
+
+def _config_guild_ids(ctx):
+    """Writes configs for ctx.guild_count guilds once and returns their IDs."""
+    if ctx.guild_ids is None:
+        import utils
+        ctx.guild_ids = list(range(10 ** 17, 10 ** 17 + ctx.guild_count))
+        config = utils.load_config(ctx.guild_ids[0])
+        for guild_id in ctx.guild_ids:
+            utils.save_config(guild_id, config)
+    return ctx.guild_ids
+
+@benchmark("save_config_10k_guilds")
+def setup_save_config(ctx):
+    import utils
+    guild_ids = _config_guild_ids(ctx)
+    config = utils.load_config(guild_ids[0])
+    cycle = iter(range(10 ** 9))
+    return lambda: utils.save_config(guild_ids[next(cycle) % len(guild_ids)], config)
+
+@benchmark("load_config_10k_guilds")
+def setup_load_config(ctx):
+    import utils
+    guild_ids = _config_guild_ids(ctx)
+    cycle = iter(range(10 ** 9))
+    return lambda: utils.load_config(guild_ids[next(cycle) % len(guild_ids)])
+
+@benchmark("log_to_gui")
+def setup_log_to_gui(ctx):
+    # With a listener, as when the bot runs in its own process and forwards events to the GUI
+    received = []
+    ctx.bot_core.add_event_listener(lambda event, data: received.append(event) if len(received) < 1000 else None)
+    data = {"guild_id": 123456789012345678, "user": "bench-user", "prompt": "a typical short prompt " * 4}
+    return lambda: ctx.bot_core.log_to_gui("prompt", data)
+
+
+# --- Running ---
+class Context:
+    """Shared state for benchmark setups: the imported bot_core, the mock Ollama, config IDs."""
+
+    def __init__(self, guild_count):
+        self.guild_count = guild_count
+        self.guild_ids = None
+        self.bot_core = None
+        self.mock = None
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+def run(only=None, repeat=5, target=0.2, guild_count=10_000):
+    """Runs the selected benchmarks in a scratch directory and returns the result document."""
+    from bench.mock_ollama import MockOllama
+    from bench.discord_fakes import load_bot_core
+    workdir = tempfile.mkdtemp(prefix="silasblue-bench-")
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)  # Before importing: config paths are resolved at import time
+    ctx = Context(guild_count)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    results = {}
+    try:
+        with MockOllama() as mock:
+            ctx.mock = mock
+            import utils
+            import ollama_api
+            # Default-URL clients created by load_config should reach the mock, not a real Ollama
+            utils.OllamaClient = lambda base_url=None: ollama_api.OllamaClient(base_url or mock.url)
+            utils.save_app_config({"ollama_backends": [{"url": mock.url}], "admin_api_enabled": False})
+            ctx.bot_core = load_bot_core()
+            for name, setup in BENCHMARKS:
+                if only and not any(part in name for part in only):
+                    continue
+                func = setup(ctx)
+                if asyncio.iscoroutinefunction(func):
+                    result = _measure_async(loop, func, repeat, target)
+                else:
+                    result = measure(func, repeat, target)
+                results[name] = result
+                print(f"{name:<42} {result['median_us']:>12.2f} us  (best {result['best_us']:.2f}, {result['calls']} calls)")
+    finally:
+        loop.close()
+        os.chdir(previous_cwd)
+    return {
+        "timestamp": time.time(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+def _measure_async(loop, coroutine_func, repeat, target, batch=100):
+    """Like measure(), but awaits `batch` calls per loop entry so loop overhead does not dominate."""
+    async def run_batch():
+        for _ in range(batch):
+            await coroutine_func()
+    result = measure(lambda: loop.run_until_complete(run_batch()), repeat, target)
+    return {"calls": result["calls"] * batch, "best_us": result["best_us"] / batch, "median_us": result["median_us"] / batch}
+
+def compare(old, new, threshold=0.10):
+    """Prints the change per benchmark (median); returns the names that regressed."""
+    regressions = []
+    print(f"{'benchmark':<42} {'old us':>12} {'new us':>12} {'change':>8}")
+    for name in sorted(set(old["results"]) | set(new["results"])):
+        before = old["results"].get(name)
+        after = new["results"].get(name)
+        if before is None or after is None:
+            cells = ["-" if r is None else "%.2f" % r["median_us"] for r in (before, after)]
+            print(f"{name:<42} {cells[0]:>12} {cells[1]:>12}")
+            continue
+        change = after["median_us"] / before["median_us"] - 1
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{name:<42} {before['median_us']:>12.2f} {after['median_us']:>12.2f} {change:>+8.1%}{flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for Silas Blue's hot paths.")
+    parser.add_argument("--only", nargs="*", help="run benchmarks whose name contains any of these")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--target", type=float, default=0.2, help="seconds per timing round")
+    parser.add_argument("--guilds", type=int, default=10_000, help="guild configs for the config benchmarks")
+    parser.add_argument("--output", help="result file (default: bench/results/micro-<time>.json)")
+    parser.add_argument("--compare", nargs="+", metavar="RESULT", help="baseline (and optionally new) result file")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        sys.exit(1 if compare(old, new, args.threshold) else 0)
+
+    result = run(args.only, args.repeat, args.target, args.guilds)
+    output = args.output or os.path.join(RESULTS_DIR, f"micro-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved {output}")
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        sys.exit(1 if compare(old, result, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
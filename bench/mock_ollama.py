@@ -0,0 +1,226 @@
+"""
+In-process stub of the Ollama HTTP API.
+Streams NDJSON from /api/generate at a configurable token rate, with configurable model
+load time, first-token latency and failures, and answers /api/tags, /api/ps and
+/api/version. The final chunk carries the same counters as Ollama's (load_duration,
+prompt_eval_duration, eval_duration, eval_count, ...).
+
+    with MockOllama(tokens_per_second=50, first_token_latency=0.2) as mock:
+        client = OllamaClient(mock.url)
+
+Or standalone: python -m bench.mock_ollama --port 11434 --rate 40
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+WORDS = ("the quick brown fox jumps over a lazy dog while silas blue answers every prompt "
+         "with retro flair and a steady stream of tokens").split()
+
+# Failure modes picked at random for a `failure_rate` share of /api/generate requests
+FAILURE_MODES = ("http_500", "error_chunk", "disconnect")
+
+
+class MockOllama:
+    """
+    Fake Ollama server on a background thread.
+
+    tokens_per_second: generation speed once the first token is out
+    first_token_latency: prompt eval time before the first token (seconds)
+    load_time: extra delay the first time each model is used, or after it is unloaded
+    max_tokens: reply length when the request does not set num_predict
+    failure_rate: share of generate requests that fail, using one of `failure_modes`
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, models=("mock-llama", "mock-mistral"),
+                 tokens_per_second=50.0, first_token_latency=0.1, load_time=0.0,
+                 max_tokens=64, failure_rate=0.0, failure_modes=FAILURE_MODES, seed=None):
+        self.models = list(models)
+        self.tokens_per_second = tokens_per_second
+        self.first_token_latency = first_token_latency
+        self.load_time = load_time
+        self.max_tokens = max_tokens
+        self.failure_rate = failure_rate
+        self.failure_modes = tuple(failure_modes)
+        self.random = random.Random(seed)
+        self.loaded = set()
+        self.requests = 0
+        self.active = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass  # Keep benchmark output clean
+
+            def _send_json(self, obj, status=200):
+                body = json.dumps(obj).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json({"models": [{"name": name, "size": 4 * 1024 ** 3} for name in mock.models]})
+                elif self.path == "/api/ps":
+                    with mock._lock:
+                        loaded = sorted(mock.loaded)
+                    self._send_json({"models": [{"name": name, "size": 4 * 1024 ** 3} for name in loaded]})
+                elif self.path == "/api/version":
+                    self._send_json({"version": "0.0.0-mock"})
+                else:
+                    self._send_json({"error": "not found"}, status=404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    data = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self._send_json({"error": "invalid JSON"}, status=400)
+                    return
+                if self.path != "/api/generate":
+                    self._send_json({"error": "not found"}, status=404)
+                    return
+                with mock._lock:
+                    mock.requests += 1
+                    mock.active += 1
+                try:
+                    self._generate(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client aborted the stream, as the bot does on cancel
+                finally:
+                    with mock._lock:
+                        mock.active -= 1
+
+            def _generate(self, data):
+                model = data.get("model")
+                if model not in mock.models:
+                    self._send_json({"error": f"model '{model}' not found"}, status=404)
+                    return
+                if data.get("keep_alive") == 0 and not data.get("prompt"):
+                    with mock._lock:
+                        mock.loaded.discard(model)
+                    self._send_json({"model": model, "done": True, "done_reason": "unload"})
+                    return
+                failure = None
+                if mock.failure_rate and mock.random.random() < mock.failure_rate:
+                    failure = mock.random.choice(mock.failure_modes)
+                if failure == "http_500":
+                    self._send_json({"error": "mock failure"}, status=500)
+                    return
+
+                started = time.perf_counter()
+                with mock._lock:
+                    cold = model not in mock.loaded
+                    mock.loaded.add(model)
+                load = mock.load_time if cold else 0.0
+                time.sleep(load + mock.first_token_latency)
+                prompt_eval = time.perf_counter() - started - load
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                options = data.get("options") or {}
+                tokens = options.get("num_predict") or mock.max_tokens
+                interval = 1.0 / mock.tokens_per_second if mock.tokens_per_second else 0
+                eval_started = time.perf_counter()
+                for i in range(tokens):
+                    if failure in ("error_chunk", "disconnect") and i == tokens // 2:
+                        if failure == "disconnect":
+                            self.close_connection = True
+                            return
+                        self._write_chunk({"error": "mock failure mid-stream"})
+                        self._end_chunks()
+                        return
+                    word = mock.random.choice(WORDS) if not options.get("seed") else WORDS[i % len(WORDS)]
+                    self._write_chunk({"model": model, "response": word + " ", "done": False})
+                    if interval:
+                        time.sleep(interval)
+                eval_duration = time.perf_counter() - eval_started
+                self._write_chunk({
+                    "model": model,
+                    "response": "",
+                    "done": True,
+                    "done_reason": "length",
+                    "total_duration": int((time.perf_counter() - started) * 1e9),
+                    "load_duration": int(load * 1e9),
+                    "prompt_eval_count": len(str(data.get("prompt", "")).split()),
+                    "prompt_eval_duration": int(prompt_eval * 1e9),
+                    "eval_count": tokens,
+                    "eval_duration": int(eval_duration * 1e9),
+                })
+                self._end_chunks()
+
+            def _write_chunk(self, obj):
+                line = (json.dumps(obj) + "\n").encode("utf-8")
+                self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+                self.wfile.flush()
+
+            def _end_chunks(self):
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a mock Ollama server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--rate", type=float, default=50.0, help="tokens per second")
+    parser.add_argument("--latency", type=float, default=0.1, help="first-token latency in seconds")
+    parser.add_argument("--load-time", type=float, default=0.0, help="cold model load time in seconds")
+    parser.add_argument("--tokens", type=int, default=64, help="reply length in tokens")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--models", default="mock-llama,mock-mistral")
+    args = parser.parse_args()
+    mock = MockOllama(args.host, args.port, args.models.split(","), args.rate, args.latency,
+                      args.load_time, args.tokens, args.failure_rate)
+    print(f"Mock Ollama listening on {mock.url}")
+    mock.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        mock.stop()
+
+
+if __name__ == "__main__":
+    main()
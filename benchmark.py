@@ -0,0 +1,178 @@
+"""
+Model benchmark for Silas Blue.
+Runs a fixed prompt set (or prompts sampled from the prompt journal) against installed
+models and measures cold load time, time to first token, tokens/sec and the memory the
+loaded model takes. Results are appended to config/bench_results.jsonl so runs on the
+same machine can be compared over time.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+import statistics
+
+import psutil
+
+from ollama_api import OllamaClient
+
+logger = logging.getLogger("silasblue")
+
+# Short prompts covering chat, reasoning, code and a longer answer
+STANDARD_PROMPTS = [
+    "Say hello in one short sentence.",
+    "A train leaves at 3pm and travels 120 km at 80 km/h. When does it arrive? Explain briefly.",
+    "Write a Python function that checks whether a string is a palindrome.",
+    "Summarise the causes of the French Revolution in a paragraph.",
+]
+# Fixed output length and no sampling randomness, so runs are comparable
+BENCH_OPTIONS = {"num_predict": 128, "temperature": 0, "seed": 1}
+
+_BENCH_LOCK = threading.Lock()
+
+
+def get_results_path():
+    from utils import get_resource_path
+    return os.path.join(get_resource_path("config"), "bench_results.jsonl")
+
+def bench_prompts(replay=0):
+    """The standard prompt set, or up to `replay` prompts sampled from the prompt journal."""
+    if replay:
+        from prompt_journal import get_prompt_journal
+        journal = get_prompt_journal()
+        prompts = journal.sample_prompts(replay) if journal is not None else []
+        if prompts:
+            return prompts, "journal"
+        logger.warning("No journalled prompts to replay; using the standard prompt set.")
+    return list(STANDARD_PROMPTS), "standard"
+
+def _model_memory_mb(client, model):
+    """Size of `model` as reported by Ollama's /api/ps while it is loaded."""
+    try:
+        resp = client.transport.get("/api/ps", retries=0)
+        for entry in resp.json().get("models", []):
+            if entry.get("name") == model:
+                return entry.get("size", 0) / (1024 * 1024)
+    except Exception:
+        pass
+    return None
+
+def _run_prompt(client, model, prompt):
+    started = time.perf_counter()
+    ttft = None
+    final = {}
+    # Cold loads and the fixed prompt set would skew the stats of real traffic
+    for chunk in client.stream_prompt(prompt, model, options=BENCH_OPTIONS, record_stats=False):
+        if ttft is None and chunk.get("response"):
+            ttft = time.perf_counter() - started
+        if chunk.get("done"):
+            final = chunk
+    run = {"ttft": ttft, "total": time.perf_counter() - started, "load": final.get("load_duration", 0) / 1e9}
+    if final.get("eval_duration"):
+        run["tokens_per_second"] = final.get("eval_count", 0) / (final["eval_duration"] / 1e9)
+    if final.get("prompt_eval_duration"):
+        run["prompt_tokens_per_second"] = final.get("prompt_eval_count", 0) / (final["prompt_eval_duration"] / 1e9)
+    return run
+
+def _median(runs, key):
+    values = [run[key] for run in runs if run.get(key) is not None]
+    return statistics.median(values) if values else None
+
+def bench_model(client, model, prompts):
+    """
+    Benchmarks one model: unloads it, then runs every prompt. The first run gives the cold
+    load time and cold TTFT; the rest give warm TTFT and throughput.
+    """
+    client.unload_model(model)
+    time.sleep(1)  # Let Ollama release the memory
+    memory_before = psutil.virtual_memory().used
+    runs = []
+    errors = []
+    for prompt in prompts:
+        try:
+            runs.append(_run_prompt(client, model, prompt))
+        except Exception as e:
+            errors.append(str(e))
+    memory_after = psutil.virtual_memory().used
+    warm = runs[1:] or runs
+    return {
+        "model": model,
+        "backend": client.base_url,
+        "runs": len(runs),
+        "errors": errors,
+        "cold_load_seconds": runs[0]["load"] if runs else None,
+        "cold_ttft_seconds": runs[0]["ttft"] if runs else None,
+        "ttft_seconds": _median(warm, "ttft"),
+        "tokens_per_second": _median(runs, "tokens_per_second"),
+        "prompt_tokens_per_second": _median(runs, "prompt_tokens_per_second"),
+        # Only meaningful when Ollama runs on this machine
+        "memory_delta_mb": (memory_after - memory_before) / (1024 * 1024),
+        "model_memory_mb": _model_memory_mb(client, model),
+    }
+
+def _pool_client(model):
+    """The client of the backend the pool would route `model` to."""
+    from ollama_pool import get_backend_pool
+    backend = get_backend_pool().pick_backend(model)
+    return backend.client if backend is not None else OllamaClient()
+
+def run_benchmark(models, replay=0, client_for=None, progress=None):
+    """
+    Benchmarks `models` one after another and appends the results to bench_results.jsonl.
+    `client_for(model)` picks the Ollama client (default: the backend the pool would use);
+    `progress(text)` is called before each model. Returns the results, or None if a
+    benchmark is already running.
+    """
+    if not _BENCH_LOCK.acquire(blocking=False):
+        return None
+    try:
+        prompts, prompt_set = bench_prompts(replay)
+        results = []
+        for model in models:
+            if progress:
+                progress(f"Benchmarking {model} ({len(results) + 1}/{len(models)})...")
+            client = (client_for or _pool_client)(model)
+            result = bench_model(client, model, prompts)
+            result.update(timestamp=time.time(), prompt_set=prompt_set, prompts=len(prompts))
+            results.append(result)
+            save_result(result)
+            logger.info(f"Benchmark {model}: {format_result(result)}")
+        return results
+    finally:
+        _BENCH_LOCK.release()
+
+def is_running():
+    return _BENCH_LOCK.locked()
+
+def save_result(result):
+    path = get_results_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result) + "\n")
+
+def load_results(limit=100, model=None):
+    """The most recent stored results (newest last), optionally for one model."""
+    path = get_results_path()
+    if not os.path.exists(path):
+        return []
+    results = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if model is None or result.get("model") == model:
+                results.append(result)
+    return results[-limit:]
+
+def format_result(result):
+    def fmt(value, unit):
+        return "n/a" if value is None else f"{value:.1f}{unit}"
+    text = (f"load {fmt(result['cold_load_seconds'], 's')}, TTFT {fmt(result['ttft_seconds'], 's')} "
+            f"(cold {fmt(result['cold_ttft_seconds'], 's')}), {fmt(result['tokens_per_second'], ' tok/s')}, "
+            f"memory {fmt(result['model_memory_mb'] or result['memory_delta_mb'], ' MB')}")
+    if result["errors"]:
+        text += f", {len(result['errors'])} errors"
+    return text
@@ -0,0 +1,331 @@
+"""
+Control commands for the running bot.
+Every control channel (the GUI's IPC pipe and the local admin API) goes through
+dispatch(), so each command is implemented once and behaves the same everywhere.
+Commands are called from worker threads; anything touching bot state that is not
+thread-safe runs on the bot's event loop.
+"""
+
+import os
+import time
+import asyncio
+import inspect
+import logging
+import threading
+
+import bot_core
+import benchmark
+import profiler
+from ollama_pool import get_backend_pool
+from prompt_journal import get_prompt_journal, reset_prompt_journal
+from tracing import TRACES
+from model_stats import get_model_stats, ModelStats
+import memdiag
+from utils import load_config, save_config
+
+logger = logging.getLogger("silasblue")
+
+
+class ControlError(Exception):
+    """Raised for unknown commands, bad arguments or requests the bot cannot serve."""
+
+
+COMMANDS = {}
+
+def command(name):
+    """Registers a function as the handler for `name`."""
+    def register(func):
+        COMMANDS[name] = func
+        return func
+    return register
+
+def dispatch(name, args=None):
+    """Runs command `name` with keyword `args` and returns its (picklable, JSON-friendly) result."""
+    func = COMMANDS.get(name)
+    if func is None:
+        raise ControlError(f"Unknown command: {name}")
+    args = args or {}
+    try:
+        inspect.signature(func).bind(**args)
+    except TypeError as e:
+        raise ControlError(f"Bad arguments for {name}: {e}")
+    return func(**args)
+
+def _on_loop(func, timeout=5):
+    """Runs func() on the bot's event loop and returns its result."""
+    loop = bot_core._bot_loop
+    if loop is None or loop.is_closed():
+        raise ControlError("The bot is not running.")
+    async def call():
+        return func()
+    return asyncio.run_coroutine_threadsafe(call(), loop).result(timeout)
+
+def _in_shard_groups(name, args=None):
+    """
+    With shard_processes above 1, runs `name` in every shard group process and returns
+    the results of the groups that ran it; otherwise None, and the caller runs it here.
+    """
+    manager = bot_core._shard_manager
+    if manager is None:
+        return None
+    replies = manager.request(name, args)
+    results = [reply["result"] for reply in replies.values() if "error" not in reply]
+    if not results:
+        errors = [reply["error"] for reply in replies.values()]
+        raise ControlError(errors[0] if errors else "No shard group answered.")
+    return results
+
+def _find_guild(guild_id):
+    bot = bot_core._bot_instance
+    guild = bot.get_guild(int(guild_id)) if bot else None
+    if guild is None:
+        raise ControlError(f"Server {guild_id} is not available in this process.")
+    return guild
+
+
+@command("status")
+def status():
+    bot = bot_core._bot_instance
+    return {
+        "running": bot_core.is_bot_running(),
+        "pid": os.getpid(),
+        "user": str(bot.user) if bot and bot.user else None,
+        "guild_count": len(bot_core.list_guilds()),
+        "shards": bot_core.shard_health(),
+    }
+
+@command("guilds")
+def guilds():
+    return [{"name": name, "id": gid, "shard_id": shard_id} for name, gid, shard_id in bot_core.list_guilds()]
+
+@command("guild_roles")
+def guild_roles(guild_id):
+    """Role names of a server, highest first, without @everyone."""
+    results = _in_shard_groups("guild_roles", {"guild_id": guild_id})
+    if results is not None:
+        return results[0]  # Only the group serving the server finds it
+    guild = _find_guild(guild_id)
+    return [role.name for role in reversed(guild.roles) if not role.is_default()]
+
+@command("get_config")
+def get_config(guild_id):
+    guild_id = int(guild_id)
+    config = bot_core.server_configs.get(guild_id)
+    if config is None:
+        config = load_config(guild_id)
+    return dict(config)
+
+@command("update_config")
+def update_config(guild_id, changes):
+    """Merges `changes` into a server's config, saves it and applies it to the running bot."""
+    guild_id = int(guild_id)
+    if not isinstance(changes, dict):
+        raise ControlError("changes must be an object of config fields.")
+    config = load_config(guild_id)
+    config.update(changes)
+    save_config(guild_id, config)
+    bot_core.server_configs[guild_id] = config
+    _in_shard_groups("reload_config", {"guild_id": guild_id})  # Shard groups keep their own copies
+    logger.info(f"Config for server {guild_id} updated: {', '.join(changes)}")
+    return dict(config)
+
+@command("models")
+def models():
+    pool = get_backend_pool()
+    return {"models": pool.list_models(), "backends": pool.snapshot()}
+
+@command("model_stats")
+def model_stats():
+    """Throughput and latency percentiles per model (see model_stats.py), over all shard groups."""
+    groups = _in_shard_groups("model_stats_data")
+    if groups is None:
+        return get_model_stats().summary()
+    combined = ModelStats()
+    for data in groups:
+        combined.merge(data)
+    return combined.summary()
+
+@command("model_stats_data")
+def model_stats_data():
+    """The histograms behind model_stats, for merging the stats of several processes."""
+    return get_model_stats().to_dict()
+
+@command("reset_model_stats")
+def reset_model_stats(model=None):
+    if _in_shard_groups("reset_model_stats", {"model": model}) is None:
+        get_model_stats().reset(model)
+    return True
+
+@command("bench")
+def bench(models=None, replay=0):
+    """
+    Starts a benchmark of `models` (default: all installed) in the background and returns
+    at once; poll bench_results. `replay` > 0 samples that many prompts from the journal.
+    """
+    if models is not None and (not isinstance(models, list) or not all(isinstance(m, str) for m in models)):
+        raise ControlError("models must be a list of model names.")
+    try:
+        replay = int(replay)
+    except (TypeError, ValueError):
+        raise ControlError("replay must be a number.")
+    installed = get_backend_pool().list_models()
+    unknown = [m for m in models or [] if m not in installed]
+    if unknown:
+        raise ControlError(f"Unknown models: {', '.join(unknown)}")
+    models = models or installed
+    if not models:
+        raise ControlError("No models to benchmark.")
+    if benchmark.is_running():
+        raise ControlError("A benchmark is already running.")
+    threading.Thread(target=benchmark.run_benchmark, args=(models, replay), daemon=True).start()
+    return {"started": True, "models": models}
+
+@command("bench_results")
+def bench_results(limit=50, model=None):
+    return {"running": benchmark.is_running(), "results": benchmark.load_results(int(limit), model)}
+
+@command("queue")
+def queue():
+    """Prompt queue depth plus the running and waiting prompts (of all shard groups)."""
+    snapshots = _in_shard_groups("queue")
+    if snapshots is None:
+        return _on_loop(bot_core.prompt_queue.snapshot)
+    return {
+        "max_concurrent": sum(snapshot["max_concurrent"] for snapshot in snapshots),
+        "depth": sum(snapshot["depth"] for snapshot in snapshots),
+        "running": [item for snapshot in snapshots for item in snapshot["running"]],
+        "queued": [item for snapshot in snapshots for item in snapshot["queued"]],
+    }
+
+@command("in_flight")
+def in_flight():
+    return queue()["running"]
+
+@command("cancel")
+def cancel(message_id):
+    """Cancels a queued or running prompt by its Discord message ID."""
+    message_id = int(message_id)
+    results = _in_shard_groups("cancel", {"message_id": message_id})
+    if results is not None:
+        return results[0]  # Only the group that has the prompt succeeds
+    def do_cancel():
+        if bot_core.prompt_queue.cancel(message_id):
+            journal = get_prompt_journal()
+            if journal is not None:
+                journal.set_state(message_id, "cancelled")
+            return "queued"
+        if bot_core.active_generations.cancel(message_id, "admin"):
+            return "running"
+        return None
+    was = _on_loop(do_cancel)
+    if was is None:
+        raise ControlError(f"No queued or running prompt for message {message_id}.")
+    return {"message_id": message_id, "was": was}
+
+@command("restart")
+def restart():
+    """
+    Starts a graceful restart and returns at once. It runs in its own thread because the
+    draining instance shuts down the admin API that may be serving this very request.
+    """
+    threading.Thread(target=bot_core.restart_bot, daemon=True).start()
+    return {"restarting": True}
+
+@command("reload_config")
+def reload_config(guild_id=None):
+    reset_prompt_journal()  # In case prompt_journal_enabled was turned on
+    if _in_shard_groups("reload_config", {"guild_id": guild_id}) is not None:
+        return True
+    if guild_id is None:
+        bot_core.reload_all_server_configs()
+    else:
+        bot_core.reload_server_config(int(guild_id))
+    return True
+
+@command("traces")
+def traces(limit=20, order="slowest"):
+    """Recent finished request traces, slowest first (order="slowest") or newest first."""
+    limit = int(limit)
+    return TRACES.slowest(limit) if order == "slowest" else TRACES.recent(limit)
+
+@command("export_traces")
+def export_traces(path=None):
+    """Appends the buffered traces to a JSON-lines file (logs/traces-<time>.jsonl by default)."""
+    if path is None:
+        os.makedirs("logs", exist_ok=True)
+        path = os.path.join("logs", f"traces-{time.strftime('%Y%m%d-%H%M%S')}.jsonl")
+    count = TRACES.export_jsonl(path)
+    logger.info(f"Exported {count} traces to {path}")
+    return {"path": os.path.abspath(path), "count": count}
+
+@command("profile")
+def profile(seconds=10, interval=0.005):
+    """
+    Samples every thread of the bot process for `seconds` (blocking), writes a
+    collapsed-stack file for flamegraph tools and logs the busiest functions.
+    """
+    summary = profiler.run_profile(seconds, interval, label="bot")
+    if summary is None:
+        raise ControlError("A profile is already running.")
+    logger.info(profiler.format_summary(summary))
+    return summary
+
+def _loop_monitor():
+    """The watchdog of the running bot instance (the replacement, during a graceful restart)."""
+    bot = bot_core._bot_instance
+    monitor = getattr(bot, "loop_monitor", None)
+    if monitor is None:
+        raise ControlError("The event loop monitor is not running (see loop_monitor_enabled).")
+    return monitor
+
+@command("loop_monitor")
+def loop_monitor():
+    """Event-loop lag and the call sites that blocked the loop, costliest first."""
+    return _loop_monitor().summary()
+
+@command("reset_loop_monitor")
+def reset_loop_monitor():
+    _loop_monitor().reset()
+    return True
+
+@command("memory")
+def memory(limit=15, group_by="lineno", objects=False):
+    """
+    RSS, tracemalloc totals, the largest allocation sites and their growth since the
+    baseline snapshot, and what the bot keeps in memory. `objects` also counts live
+    objects by type, which walks the whole heap.
+    """
+    diagnostics = memdiag.get_memory_diagnostics()
+    try:
+        result = diagnostics.summary(int(limit), group_by)
+    except ValueError as e:
+        raise ControlError(str(e))
+    bot = bot_core._bot_instance
+    result["bot"] = {
+        "server_configs": len(bot_core.server_configs),
+        "page_store": bot_core.page_store.stats(),
+        "cached_messages": len(bot.cached_messages) if bot else 0,
+        "active_generations": len(bot_core.active_generations.by_message),
+        "tracked_users": len(bot_core.active_generations.latest_by_user),
+    }
+    if objects:
+        result["objects"] = memdiag.object_counts()
+    return result
+
+@command("memory_snapshot")
+def memory_snapshot(baseline=False):
+    """Takes a tracemalloc snapshot; with `baseline`, later snapshots are compared with this one."""
+    diagnostics = memdiag.get_memory_diagnostics()
+    if not diagnostics.is_tracing():
+        raise ControlError("Memory tracing is off; start it with memory_tracing first.")
+    return diagnostics.take_snapshot("baseline" if baseline else "manual", bool(baseline))
+
+@command("memory_tracing")
+def memory_tracing(enabled=True, frames=10):
+    """Starts or stops tracemalloc. Tracing slows the bot down a little while it is on."""
+    diagnostics = memdiag.get_memory_diagnostics()
+    if enabled:
+        diagnostics.start_tracing(int(frames))
+    else:
+        diagnostics.stop_tracing()
+    return diagnostics.is_tracing()
@@ -6,19 +6,51 @@ Handles commands, permissions, per-server config, and Ollama integration.
 import discord
 from discord.ext import commands
 import logging
+import io
 import os
 import asyncio
 import json
 import getpass
 import time
 import threading
-
-from ollama_api import OllamaClient
+import contextvars
+
+from ollama_api import Generation
+from ollama_transport import OllamaUnavailableError
+from ollama_pool import get_backend_pool
+from paginator import StreamingPaginator, paginate_stream
+from page_store import PageStore
+from prompt_queue import PromptQueue, PromptItem, PromptHandover
+from prompt_journal import get_prompt_journal, reset_prompt_journal
+from tracing import start_trace, current_trace, finish_trace, span
+from model_stats import get_model_stats
+from loop_monitor import start_loop_monitor
+from memdiag import start_memdiag, get_memory_diagnostics
+import benchmark
 from permissions import PermissionManager
-from utils import load_config, save_config, get_config_path, set_default_model, get_resource_path
+from metrics import (
+    MESSAGES_SEEN, MESSAGES_HANDLED, QUEUE_DEPTH, PROMPTS_RUNNING, TIME_TO_FIRST_TOKEN, GENERATION_TIME,
+    TOKENS_PER_SECOND, TOKENS_GENERATED, DISCORD_REQUEST_TIME, DISCORD_RATE_LIMITS, OLLAMA_ERRORS
+)
+from utils import load_config, save_config, get_config_path, set_default_model, get_resource_path, get_generation_options, load_app_config
 
 logger = logging.getLogger("silasblue")
 
+DISCORD_SEND_TIME = DISCORD_REQUEST_TIME.labels("send")
+DISCORD_EDIT_TIME = DISCORD_REQUEST_TIME.labels("edit")
+
+class _RateLimitCounter(logging.Handler):
+    """Counts the 429 warnings discord.py logs, since it retries rate-limited calls itself."""
+
+    def __init__(self):
+        super().__init__(level=logging.WARNING)
+
+    def emit(self, record):
+        if "rate limited" in str(record.msg):
+            DISCORD_RATE_LIMITS.inc()
+
+logging.getLogger("discord.http").addHandler(_RateLimitCounter())
+
 # Utility to get the discord_text color from the theme
 _THEME_CACHE = None
 _THEME_PATH = get_resource_path(os.path.join("themes", "retrowave.json"))  # PyInstaller compatible
@@ -35,11 +67,20 @@ def get_discord_theme_color():
     color_hex = _THEME_CACHE.get("discord_text") or _THEME_CACHE.get("accent2") or "#00f0ff"
     return int(color_hex.lstrip("#"), 16)
 
+_DISCORD_TOKEN = None
+
 def get_discord_token():
     """
-    Loads the Discord bot token from config/bot_token.txt.
-    If not found, prompts the user to enter it, then saves it for future use.
+    Returns the Discord bot token: SILASBLUE_DISCORD_TOKEN if set, else config/bot_token.txt.
+    If neither has one, prompts the user to enter it, then saves it for future use.
+    Loaded on first use, so bot_core can be imported without a token (e.g. by bench/).
     """
+    global _DISCORD_TOKEN
+    if _DISCORD_TOKEN is None:
+        _DISCORD_TOKEN = os.environ.get("SILASBLUE_DISCORD_TOKEN", "").strip() or _load_discord_token()
+    return _DISCORD_TOKEN
+
+def _load_discord_token():
     config_dir = get_resource_path("config")
     token_path = os.path.join(config_dir, "bot_token.txt")
     os.makedirs(config_dir, exist_ok=True)
@@ -64,175 +105,247 @@ def get_discord_token():
     print("Token saved to config/bot_token.txt.")
     return token
 
-# Use the new token loading logic
-DISCORD_TOKEN = get_discord_token()
 COMMAND_PREFIX = "!"
-intents = discord.Intents.default()
-intents.messages = True
-intents.guilds = True
-intents.message_content = True
-
-bot = commands.Bot(command_prefix=COMMAND_PREFIX, intents=intents, help_command=None)
-ollama = OllamaClient()
-permissions = PermissionManager()
 
 server_configs = {}
 
+# Pages of every paginated reply, shared by all messages and kept across restarts
+page_store = PageStore(os.path.join(get_resource_path("config"), "pages"))
+
+PAGE_PREV_ID = "silasblue:page_prev"
+PAGE_NEXT_ID = "silasblue:page_next"
+
 class PaginatedView(discord.ui.View):
-    def __init__(self, pages, author_id, timeout=180):
-        super().__init__(timeout=timeout)
-        self.pages = pages
-        self.author_id = author_id
-        self.current_page = 0
-        self.total_pages = len(pages)
-        self.message = None
-        self.update_buttons()
+    """
+    Persistent Previous/Next buttons for paginated replies.
+    A single instance, registered once with add_view, serves every message: the buttons
+    have stable custom_ids and the pages are looked up in page_store by message ID, so they
+    keep working after a restart. Messages are sent with PageButtons, not with this view.
+    """
 
-    def update_buttons(self):
-        self.clear_items()
-        self.add_item(self.prev_button)
-        self.add_item(self.next_button)
+    def __init__(self):
+        super().__init__(timeout=None)
 
-    @discord.ui.button(label="Previous", style=discord.ButtonStyle.primary, disabled=True)
-    async def prev_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if interaction.user.id != self.author_id:
+    @staticmethod
+    def render(entry):
+        total = len(entry["pages"])
+        header = f"Page {entry['current']+1}/{total if entry.get('complete', True) else '...'}"
+        return f"{header}\n{entry['pages'][entry['current']]}"
+
+    async def turn_page(self, interaction, step):
+        entry = page_store.get(interaction.message.id)
+        if entry is None:
+            await interaction.response.send_message("This reply has expired.", ephemeral=True)
+            return
+        if interaction.user.id != entry["author_id"]:
             await interaction.response.send_message("You can't control this pagination.", ephemeral=True)
             return
-        if self.current_page > 0:
-            self.current_page -= 1
-            await self.update_message(interaction)
+        current = entry["current"] + step
+        if not 0 <= current < len(entry["pages"]):
+            await interaction.response.defer()
+            return
+        entry["current"] = current
+        page_store.set_current(interaction.message.id, current)
+        buttons = PageButtons(current, len(entry["pages"]), entry.get("complete", True))
+        await interaction.response.edit_message(content=self.render(entry), view=buttons)
 
-    @discord.ui.button(label="Next", style=discord.ButtonStyle.primary, disabled=False)
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.primary, custom_id=PAGE_PREV_ID)
+    async def prev_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.turn_page(interaction, -1)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.primary, custom_id=PAGE_NEXT_ID)
     async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if interaction.user.id != self.author_id:
-            await interaction.response.send_message("You can't control this pagination.", ephemeral=True)
-            return
-        if self.current_page < self.total_pages - 1:
-            self.current_page += 1
-            await self.update_message(interaction)
-
-    async def update_message(self, interaction):
-        # Update button states
-        self.prev_button.disabled = self.current_page == 0
-        self.next_button.disabled = self.current_page == self.total_pages - 1
-        content = f"Page {self.current_page+1}/{self.total_pages}\n{self.pages[self.current_page]}"
-        await interaction.response.edit_message(content=content, view=self)
-
-    async def on_timeout(self):
-        if self.message:
-            await self.message.edit(view=None)
-
-@bot.event
-async def on_ready():
-    logging.info(f"Silas Blue is online as {bot.user} (ID: {bot.user.id})")
-    logger.info("Bot started and ready.")
-    # Set status to always show the new URL as Playing
-    await bot.change_presence(activity=discord.Game(name="git.new/silasblue"))
-    # Load configs for all guilds and ensure default_model is set
-    for guild in bot.guilds:
-        config = load_config(guild.id)  # utils.load_config ensures default_model is set
-        server_configs[guild.id] = config
-    logging.info("Loaded all server configs.")
-
-@bot.event
-async def on_guild_join(guild):
-    logging.info(f"Joined new guild: {guild.name} (ID: {guild.id})")
-    logger.info(f"Joined server: {guild.name} ({guild.id})")
-    config = load_config(guild.id)  # utils.load_config ensures default_model is set
-    server_configs[guild.id] = config
-
-@bot.event
-async def on_guild_remove(guild):
-    logger.info(f"Left server: {guild.name} ({guild.id})")
-
-@bot.event
-async def on_message(message):
-    if message.author == bot.user:
-        return
+        await self.turn_page(interaction, 1)
 
-    guild_id = message.guild.id if message.guild else None
-    config = server_configs.get(guild_id, {})
+class PageButtons(discord.ui.View):
+    """
+    The pagination buttons as shown on one message, for page `current` of `total`.
+    Only carries the components: discord.py keeps every dispatchable view it sends in its
+    view store for the message's lifetime, so this one says it is not, and the clicks go to
+    the PaginatedView registered in setup_hook.
+    """
 
-    # Permission: Should the bot reply to this user/message?
-    if not permissions.can_reply(message, config):
-        return
+    def __init__(self, current, total, complete=True):
+        super().__init__(timeout=None)
+        self.add_item(discord.ui.Button(label="Previous", style=discord.ButtonStyle.primary,
+                                        custom_id=PAGE_PREV_ID, disabled=current == 0))
+        self.add_item(discord.ui.Button(label="Next", style=discord.ButtonStyle.primary,
+                                        custom_id=PAGE_NEXT_ID, disabled=complete and current >= total - 1))
 
-    # Random prompt probability
-    prob = config.get("random_prompt_probability", 0)
-    import random
-    if prob > 0 and random.randint(1, 100) <= prob:
-        await handle_ollama_prompt(message, config, ollama)
-        return
+    def is_dispatchable(self):
+        return False
 
-    # Check if message starts with prefix or bot mention
-    is_command = False
-    content = message.content
-    mention_str_1 = f"<@{bot.user.id}>"
-    mention_str_2 = f"<@!{bot.user.id}>"
-
-    if content.startswith(COMMAND_PREFIX):
-        is_command = True
-    elif content.startswith(mention_str_1) or content.startswith(mention_str_2):
-        # Remove the mention and any leading whitespace
-        after_mention = content[len(mention_str_1):] if content.startswith(mention_str_1) else content[len(mention_str_2):]
-        after_mention = after_mention.lstrip()
-        # Get the first word after the mention
-        first_word = after_mention.split(' ', 1)[0].lower() if after_mention else ""
-        # List of command names (lowercase)
-        command_names = [cmd.name for cmd in bot.commands]
-        if first_word in command_names:
-            is_command = True
-            # Reconstruct the message as if it started with the prefix for command processing
-            message.content = COMMAND_PREFIX + after_mention
+async def send_paginated(destination, pages, author_id, complete=True, reference=None):
+    """
+    Sends page 1 of `pages` with the pagination buttons and stores the pages.
+    With complete=False the page count shows as '...' until finish_paginated() is called.
+    """
+    entry = {"pages": pages, "author_id": author_id, "current": 0, "complete": complete}
+    with DISCORD_SEND_TIME.time():
+        msg = await destination.send(PaginatedView.render(entry), view=PageButtons(0, len(pages), complete), reference=reference)
+    page_store.put(msg.id, pages, author_id, complete=complete)
+    return msg
 
-    if is_command:
-        await bot.process_commands(message)
-    else:
-        # If the message starts with a mention, treat the rest as a prompt
-        if content.startswith(mention_str_1) or content.startswith(mention_str_2):
-            after_mention = content[len(mention_str_1):] if content.startswith(mention_str_1) else content[len(mention_str_2):]
-            after_mention = after_mention.lstrip()
-            if after_mention:  # Only send prompt if there's text after the mention
-                await handle_ollama_prompt(message, config, ollama)
-        # Optionally: treat any message that mentions the bot anywhere as a prompt
-        elif bot.user in message.mentions:
-            await handle_ollama_prompt(message, config, ollama)
+# Length of the inline preview shown above a reply sent as a file
+ATTACHMENT_PREVIEW_CHARS = 300
+
+def build_reply_file(text, filename):
+    """
+    Returns (preview, discord.File) for a long reply. The file is built from an in-memory
+    buffer and the preview is the first few lines, with any open code block closed.
+    """
+    preview = next(paginate_stream([text], ATTACHMENT_PREVIEW_CHARS), "")
+    return preview, discord.File(io.BytesIO(text.encode("utf-8")), filename=filename)
+
+async def finish_paginated(msg, pages, author_id):
+    """Marks a streamed paginated reply as complete and updates its page count."""
+    page_store.put(msg.id, pages, author_id)
+    entry = page_store.get(msg.id)
+    with DISCORD_EDIT_TIME.time():
+        await msg.edit(content=PaginatedView.render(entry), view=PageButtons(0, len(pages)))
+
+class ActiveGenerations:
+    """
+    Tracks in-flight generations so they can be cancelled when the prompt is deleted,
+    the user presses Stop, a newer prompt from the same user arrives, or the bot stops.
+    """
+
+    def __init__(self):
+        self.by_message = {}  # prompt message ID -> Generation
+        self.latest_by_user = {}  # (guild ID, user ID) -> prompt message ID
+
+    def start(self, message):
+        """Registers a generation for `message`, superseding the user's previous one."""
+        user_key = (message.guild.id if message.guild else None, message.author.id)
+        previous = self.latest_by_user.get(user_key)
+        if previous is not None:
+            self.cancel(previous, "superseded")
+        generation = Generation()
+        self.by_message[message.id] = generation
+        self.latest_by_user[user_key] = message.id
+        return generation
+
+    def finish(self, message):
+        self.by_message.pop(message.id, None)
+        user_key = (message.guild.id if message.guild else None, message.author.id)
+        if self.latest_by_user.get(user_key) == message.id:
+            del self.latest_by_user[user_key]
+
+    def cancel(self, message_id, reason):
+        """Cancels the generation for a prompt message ID. Returns True if one was running."""
+        generation = self.by_message.get(message_id)
+        if generation is None:
+            return False
+        generation.cancel(reason)
+        logger.info(f"Generation for message {message_id} cancelled ({reason}).")
+        return True
+
+    def cancel_all(self, reason):
+        for message_id in list(self.by_message):
+            self.cancel(message_id, reason)
+
+active_generations = ActiveGenerations()
+
+# Limits concurrent generations. Each bot instance gets its own queue from create_bot;
+# this name always points at the newest instance's queue (for the control commands).
+prompt_queue = PromptQueue()
+
+async def enqueue_prompt(message, config, ollama, queue=None, resumed=False):
+    """
+    Queues a prompt and handles it once a generation slot is free. With the prompt journal
+    enabled, its state is recorded so it can be answered after a crash or restart.
+    """
+    item = PromptItem.from_message(message, config.get("default_model", "llama2"))
+    # on_message starts the trace; resumed prompts get a fresh one
+    trace = current_trace() or start_trace("prompt")
+    trace.attrs.update(message_id=item.message_id, guild_id=item.guild_id, model=item.model, resumed=resumed)
+    journal = get_prompt_journal()
+    if journal is not None:
+        journal.record_queued(item)
+    reason = "dropped"  # Stays this way if the prompt is cancelled while queued
+    queued_at = time.perf_counter()
+    async def handler():
+        nonlocal reason
+        trace.add_span("queue", time.perf_counter() - queued_at, queued_at)
+        if journal is not None:
+            journal.set_state(item.message_id, "running")
+        try:
+            reason = await handle_ollama_prompt(message, config, ollama, resumed)
+        except Exception:
+            reason = "error"
+            if journal is not None:
+                journal.set_state(item.message_id, "cancelled")  # Don't retry a prompt that fails on its own
+            raise
+        if journal is None:
+            return
+        if reason == "shutdown":
+            journal.set_state(item.message_id, "queued")  # Answered on the next start
+        elif reason in (None, "timeout", "length"):
+            journal.set_state(item.message_id, "replied")
+        else:
+            journal.set_state(item.message_id, "cancelled")
+    try:
+        await (queue or prompt_queue).run(item, handler)
+    finally:
+        finish_trace(trace, outcome=reason or "replied")
+
+async def resume_prompt(bot_instance, item, ollama, queue):
+    """
+    Re-queues a prompt accepted by another bot instance, looking its message up again
+    by ID. Returns False if the message is gone.
+    """
+    try:
+        channel = bot_instance.get_channel(item.channel_id) or await bot_instance.fetch_channel(item.channel_id)
+        message = await channel.fetch_message(item.message_id)
+    except discord.HTTPException as e:
+        logger.warning(f"Could not resume prompt {item.message_id}: {e}")
+        journal = get_prompt_journal()
+        if journal is not None:
+            journal.set_state(item.message_id, "cancelled")
+        return False
+    config = server_configs.get(item.guild_id) or load_config(item.guild_id)
+    await enqueue_prompt(message, config, ollama, queue, resumed=True)
+    return True
+
+class StopGenerationView(discord.ui.View):
+    """
+    'Stop' button shown on the Thinking placeholder while a reply is being generated.
+    """
+
+    def __init__(self, generation, author_id):
+        super().__init__(timeout=None)
+        self.generation = generation
+        self.author_id = author_id
+
+    @discord.ui.button(label="Stop", style=discord.ButtonStyle.danger)
+    async def stop_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        perms = getattr(interaction.user, "guild_permissions", None)
+        if interaction.user.id != self.author_id and not (perms and perms.manage_messages):
+            await interaction.response.send_message("You can't stop this reply.", ephemeral=True)
+            return
+        self.generation.cancel("stopped")
+        await interaction.response.edit_message(content="Generation stopped.", view=None)
 
 def paginate_text(text, max_chars):
     """
-    Splits text into pages of up to max_chars, preserving line breaks. If a single line is too long, it is split as needed.
+    Splits text into pages of up to max_chars, preserving line breaks and code blocks. If a single line is too long, it is split as needed.
     """
-    lines = text.splitlines(keepends=True)
-    pages = []
-    current = ''
-    for line in lines:
-        while len(line) > max_chars:
-            # Find a split point (preferably at a space)
-            split_at = line.rfind(' ', 0, max_chars)
-            if split_at == -1 or split_at < max_chars // 2:
-                split_at = max_chars  # No good space, just hard split
-            part = line[:split_at]
-            if not part.endswith('\n'):
-                part += '\n'
-            if len(current) + len(part) > max_chars:
-                if current:
-                    pages.append(current)
-                    current = ''
-            current += part
-            line = line[split_at:]
-        if len(current) + len(line) > max_chars:
-            if current:
-                pages.append(current)
-                current = ''
-        current += line
-    if current:
-        pages.append(current)
-    return pages
+    return list(paginate_stream([text], max_chars))
+
+# Callables receiving (event_type, data) for every log_to_gui event, e.g. the GUI's IPC pipe
+_event_listeners = []
+
+def add_event_listener(listener):
+    _event_listeners.append(listener)
+
+def remove_event_listener(listener):
+    if listener in _event_listeners:
+        _event_listeners.remove(listener)
 
 def log_to_gui(event_type, data):
     """
-    Appends a log entry for the GUI.
-    event_type: 'config_change', 'prompt', 'reply'
+    Appends a log entry for the GUI and passes it to the event listeners.
+    event_type: 'config_change', 'prompt', 'reply', 'cancelled'
     data: dict with relevant info
     """
     log_path = os.path.join("config", "gui_log.txt")
@@ -244,31 +357,46 @@ def log_to_gui(event_type, data):
     }
     with open(log_path, "a", encoding="utf-8") as f:
         f.write(json.dumps(entry) + "\n")
+    for listener in list(_event_listeners):
+        try:
+            listener(event_type, data)
+        except Exception as e:
+            logger.debug(f"Event listener failed: {e}")
 
-async def handle_ollama_prompt(message, config, ollama):
+async def handle_ollama_prompt(message, config, ollama, resumed=False):
     """
     Sends a message to Ollama and replies with the result, showing a cycling 'Thinking...' message while waiting.
+    The reply is streamed; the first page is posted as soon as it is full and later pages are added as they arrive.
+    Resumed prompts (from a restart or the prompt journal) reply to the original message so it is clear
+    what is being answered. Returns the generation's cancel reason, or None if it ran to completion.
     """
+    reference = message if resumed else None
     prompt = message.content
     model = config.get("default_model", "llama2")
+    started = time.perf_counter()
     log_to_gui("prompt", {
         "guild_id": message.guild.id if message.guild else None,
         "user": str(message.author),
         "prompt": prompt
     })
 
-    # Send initial 'Thinking' message
+    generation = active_generations.start(message)
+
+    # Send initial 'Thinking' message with a Stop button
     thinking_states = ["Thinking", "Thinking.", "Thinking..", "Thinking..."]
     thinking_idx = 0
-    thinking_msg = await message.channel.send(thinking_states[thinking_idx])
+    stop_view = StopGenerationView(generation, message.author.id)
+    with span("discord.thinking"), DISCORD_SEND_TIME.time():
+        thinking_msg = await message.channel.send(thinking_states[thinking_idx], view=stop_view)
     cycling = True
 
     async def cycle_thinking():
         nonlocal thinking_idx
-        while cycling:
+        while cycling and not generation.cancelled.is_set():
             thinking_idx = (thinking_idx + 1) % len(thinking_states)
             try:
-                await thinking_msg.edit(content=thinking_states[thinking_idx])
+                with DISCORD_EDIT_TIME.time():
+                    await thinking_msg.edit(content=thinking_states[thinking_idx])
             except Exception:
                 pass  # Ignore edit errors
             await asyncio.sleep(0.33)
@@ -276,12 +404,94 @@ async def handle_ollama_prompt(message, config, ollama):
     # Start cycling task
     cycling_task = asyncio.create_task(cycle_thinking())
 
-    # Run ollama.send_prompt in a thread
-    response = await asyncio.to_thread(ollama.send_prompt, prompt, model)
+    # Per-guild budget: Ollama options, a wall-clock cap and a cap on reply length
+    max_chars = config.get("pagination_max_chars", 2000)
+    options = get_generation_options(config)
+    max_pages = config.get("max_pages")  # Missing (older configs) or 0: no cap
+    reply_cap = max_chars * max_pages if max_pages else None
+    timeout = config.get("generation_timeout")
+    loop = asyncio.get_running_loop()
+    timeout_handle = loop.call_later(timeout, generation.cancel, "timeout") if timeout else None
+
+    # Stream the reply from a worker thread; cancelling the generation aborts the HTTP stream
+    chunks = asyncio.Queue()
+    trace = current_trace()
+    def produce():
+        first = True
+        try:
+            for chunk in ollama.stream_prompt(prompt, model, generation, options):
+                if first:
+                    ttft = time.perf_counter() - started
+                    TIME_TO_FIRST_TOKEN.labels(model).observe(ttft)
+                    if trace is not None:
+                        trace.add_span("ollama.first_token", ttft, started)
+                    first = False
+                if chunk.get("done") and chunk.get("eval_duration"):
+                    # Ollama reports durations in nanoseconds on the final chunk
+                    TOKENS_GENERATED.labels(model).inc(chunk.get("eval_count", 0))
+                    TOKENS_PER_SECOND.labels(model).observe(chunk.get("eval_count", 0) / (chunk["eval_duration"] / 1e9))
+                loop.call_soon_threadsafe(chunks.put_nowait, chunk.get("response", ""))
+        except Exception as e:
+            OLLAMA_ERRORS.labels(type(e).__name__).inc()
+            loop.call_soon_threadsafe(chunks.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(chunks.put_nowait, None)
+    # Run in a copy of this task's context so the stream can add Ollama's timings to the trace
+    producer = loop.run_in_executor(None, contextvars.copy_context().run, produce)
+
+    # Pages are built as tokens arrive; the first page is posted as soon as it is full
+    paginator = StreamingPaginator(max_chars)
+    pages = []
+    parts = []
+    received = 0
+    reply_msg = None
+    try:
+        while True:
+            item = await chunks.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                error_text = str(item) if isinstance(item, OllamaUnavailableError) else f"Error: {item}"
+                item = error_text if not parts else f"\n\n{error_text}"
+            parts.append(item)
+            received += len(item)
+            pages.extend(paginator.feed(item))
+            if pages and reply_msg is None and not generation.cancelled.is_set():
+                with span("discord.first_page"):
+                    reply_msg = await send_paginated(message.channel, pages, message.author.id, complete=False, reference=reference)
+            if reply_cap and received >= reply_cap:
+                generation.cancel("length")
+        await producer
+    finally:
+        generation_time = time.perf_counter() - started
+        GENERATION_TIME.labels(model).observe(generation_time)
+        if trace is not None:
+            trace.add_span("generate", generation_time, started)
+        active_generations.finish(message)
+        if timeout_handle:
+            timeout_handle.cancel()
+    response = "".join(parts)
 
     # Stop cycling and clean up
     cycling = False
     await cycling_task
+    stop_view.stop()  # Release the view; it has no timeout
+    if generation.cancelled.is_set() and generation.reason not in ("timeout", "length"):
+        log_to_gui("cancelled", {
+            "guild_id": message.guild.id if message.guild else None,
+            "user": str(message.author),
+            "reason": generation.reason
+        })
+        if generation.reason != "stopped":  # The Stop button already edited the placeholder
+            try:
+                await thinking_msg.delete()
+            except Exception:
+                pass
+        if reply_msg is not None:
+            # Keep what was already posted, but make the page count final
+            pages.extend(paginator.finish())
+            await finish_paginated(reply_msg, pages, message.author.id)
+        return generation.reason
     try:
         await thinking_msg.delete()
     except Exception:
@@ -292,159 +502,115 @@ async def handle_ollama_prompt(message, config, ollama):
         "user": str(message.author),
         "reply": response
     })
-    max_chars = config.get("pagination_max_chars", 2000)
-    pages = paginate_text(response, max_chars)
-    if len(pages) == 1:
-        await message.channel.send(pages[0])
-    else:
-        view = PaginatedView(pages, message.author.id)
-        view.message = await message.channel.send(f"Page 1/{len(pages)}\n{pages[0]}", view=view)
-
-@bot.command(name="ping")
-async def ping(ctx):
-    await ctx.send("Pong!")
-
-@bot.command(name="setmodel")
-async def set_model(ctx, model_name: str):
-    """
-    Set the default Ollama model for this server.
-    """
-    guild_id = ctx.guild.id
-    config = server_configs.get(guild_id, {})
-    if not permissions.can_change_model(ctx.author, ctx.guild, config):
-        await ctx.send("You do not have permission to change the model.")
-        return
-    config["default_model"] = model_name
-    save_config(guild_id, config)
-    server_configs[guild_id] = config
-    log_to_gui("config_change", {
-        "guild_id": guild_id,
-        "user": str(ctx.author),
-        "field": "default_model",
-        "value": model_name
-    })
-    logger.info(f"Default model for server {ctx.guild.name} ({ctx.guild.id}) set to {model_name} by {ctx.author}")
-    await ctx.send(f"Default model set to `{model_name}`.")
-
-@bot.command(name="config")
-async def show_config(ctx):
-    """
-    Show the current server config (raw).
-    """
-    guild_id = ctx.guild.id
-    config = server_configs.get(guild_id, {})
-    config_lines = json.dumps(config, indent=2).splitlines()
-    config_str = '\n'.join(config_lines)
-    await ctx.send(f"Current Server Config:\n{config_str}")
-
-@bot.command(name="models")
-async def models_command(ctx):
-    """
-    List all available Ollama models and show the current selected model.
-    """
-    guild_id = ctx.guild.id
-    config = server_configs.get(guild_id, {})
-    current_model = config.get("default_model", "llama2")
-    try:
-        models = ollama.list_models()
-    except Exception as e:
-        await ctx.send(f"Error fetching models: {e}")
-        return
-    if not models:
-        await ctx.send("No models found on Ollama server.")
-        return
-    msg = "Available Models:\n"
-    for m in models:
-        if m == current_model:
-            msg += f"- {m} (selected)\n"
+    note = ""
+    if generation.reason == "timeout" and not response:
+        # Usually a model that took the whole limit to load or to read the prompt
+        note = f"*(No reply within the {timeout}s time limit.)*"
+    elif generation.reason == "timeout":
+        note = f"\n\n*(Reply cut off after the {timeout}s time limit.)*"
+    elif generation.reason == "length":
+        note = f"\n\n*(Reply cut off at the {max_pages}-page limit.)*"
+    pages.extend(paginator.feed(note))
+    pages.extend(paginator.finish())
+    if not pages:
+        pages.append("*(No response.)*")
+    attachment_pages = config.get("attachment_pages")
+    with span("discord.reply", pages=len(pages)):
+        if attachment_pages and len(pages) > attachment_pages:
+            # One upload instead of a page per button press
+            preview, reply_file = build_reply_file(response + note, f"reply-{message.id}.md")
+            content = f"{preview}\n*(Reply is {len(pages)} pages long; the full text is attached.)*"
+            if reply_msg is not None:
+                page_store.remove(reply_msg.id)
+                with DISCORD_EDIT_TIME.time():
+                    await reply_msg.edit(content=content, attachments=[reply_file], view=None)
+            else:
+                with DISCORD_SEND_TIME.time():
+                    await message.channel.send(content, file=reply_file, reference=reference)
+        elif reply_msg is not None:
+            await finish_paginated(reply_msg, pages, message.author.id)
+        elif len(pages) == 1:
+            with DISCORD_SEND_TIME.time():
+                await message.channel.send(pages[0], reference=reference)
         else:
-            msg += f"- {m}\n"
-    await ctx.send(msg)
-
-@bot.command(name="setpagination")
-async def set_pagination(ctx, max_chars: int):
-    """
-    Set the pagination character limit for this server.
-    """
-    guild_id = ctx.guild.id
-    config = server_configs.get(guild_id, {})
-    if not ctx.author.guild_permissions.administrator:
-        await ctx.send("You do not have permission to change pagination settings.")
-        return
-    if max_chars < 500 or max_chars > 2000:
-        await ctx.send("Please choose a value between 500 and 2000.")
-        return
-    config["pagination_max_chars"] = max_chars
-    save_config(guild_id, config)
-    server_configs[guild_id] = config
-    log_to_gui("config_change", {
-        "guild_id": guild_id,
-        "user": str(ctx.author),
-        "field": "pagination_max_chars",
-        "value": max_chars
-    })
-    await ctx.send(f"Pagination character limit set to {max_chars}.")
-
-@bot.command(name="help")
-async def help_command(ctx):
-    guild_id = ctx.guild.id
-    config = server_configs.get(guild_id, {})
-    max_chars = config.get("pagination_max_chars", 2000)
-    prefix = COMMAND_PREFIX
-    help_text = (
-        f"Silas Blue Bot Help\n"
-        f"\n"
-        f"General Usage:\n"
-        f"Send a prompt by mentioning the bot or using the prefix {prefix} followed by your message.\n"
-        f"Example: {prefix}What is the weather today? or @{bot.user.name} What is the weather today?\n"
-        f"\n"
-        f"Commands:\n"
-        f"\n"
-        f"{prefix}ping\n"
-        f"Check if the bot is online. Replies with 'Pong!'.\n"
-        f"\n"
-        f"{prefix}setmodel <model_name>\n"
-        f"Set the default Ollama model for this server.\n"
-        f"Example: {prefix}setmodel llama2\n"
-        f"\n"
-        f"{prefix}models\n"
-        f"List all available Ollama models and show which is currently selected.\n"
-        f"\n"
-        f"{prefix}config\n"
-        f"Show the current server configuration in raw JSON.\n"
-        f"\n"
-        f"{prefix}help\n"
-        f"Show this help message.\n"
-        f"\n"
-        f"Notes:\n"
-        f"The bot will reply to prompts if you have permission and the server config allows it.\n"
-        f"Pagination is used for long responses, with a max of {max_chars} characters per message.\n"
-    )
-    # Add 8 for the code block markers (```)
-    codeblock_overhead = 8
-    pages = paginate_text(help_text, max_chars - codeblock_overhead)
-    if len(pages) == 1:
-        await ctx.send(f"```\n{pages[0]}\n```")
-    else:
-        view = PaginatedView([f"```\n{p}\n```" for p in pages], ctx.author.id)
-        view.message = await ctx.send(f"Page 1/{len(pages)}\n```\n{pages[0]}\n```", view=view)
+            await send_paginated(message.channel, pages, message.author.id, reference=reference)
+    return generation.reason
 
 # --- Bot control logic ---
 _bot_thread = None
 _bot_loop = None
 _shutdown_event = None
 _bot_instance = None
+_shard_manager = None
 
-def create_bot():
+def create_bot(shard_ids=None, shard_count=None, handover=None):
+    """
+    Builds the bot. With `sharded` set in app_config.json (or when shard IDs are given by
+    the shard manager) it is an AutoShardedBot; `shard_count` defaults to the app_config
+    value, or Discord's recommendation if that is not set either.
+    `handover` carries prompts from the instance this one replaces (see restart_bot).
+    """
+    global prompt_queue
     intents = discord.Intents.default()
     intents.messages = True
     intents.guilds = True
     intents.message_content = True
 
-    bot = commands.Bot(command_prefix=COMMAND_PREFIX, intents=intents, help_command=None)
-    ollama = OllamaClient()
+    app_config = load_app_config()
+    if shard_ids is not None or app_config.get("sharded"):
+        bot = commands.AutoShardedBot(
+            command_prefix=COMMAND_PREFIX, intents=intents, help_command=None,
+            shard_count=shard_count or app_config.get("shard_count") or None,
+            shard_ids=shard_ids
+        )
+    else:
+        bot = commands.Bot(command_prefix=COMMAND_PREFIX, intents=intents, help_command=None)
+    queue = bot.prompt_queue = prompt_queue = PromptQueue(app_config.get("max_concurrent_prompts", 4))
+    QUEUE_DEPTH.set_function(lambda: queue.depth)  # depth is a property
+    PROMPTS_RUNNING.set_function(lambda: len(queue.running_ids()))
+    bot.admin_api = None
+    bot.loop_monitor = None
+    bot.memdiag_schedule = None
+    bot.drain_handover = None  # Set while this instance drains for a restart
+    bot.journal_resumed = False
+    ollama = get_backend_pool()  # Routes prompts across all configured Ollama backends
     permissions = PermissionManager()
-    server_configs = {}
+    # server_configs is the module-level dict, so reload_server_config reaches the running bot
+
+    async def setup_hook():
+        # Register the persistent pagination buttons so old paginated replies keep working
+        bot.add_view(PaginatedView())
+        bot.loop_monitor = start_loop_monitor(asyncio.get_running_loop())
+        bot.memdiag_schedule = start_memdiag()
+        if shard_ids is None:  # Shard group processes would all want the same port
+            from admin_api import start_admin_api
+            bot.admin_api = await start_admin_api()
+    bot.setup_hook = setup_hook
+
+    async def begin_drain(new_handover):
+        """Stops taking prompts: queued ones, and new ones until the replacement is ready, go to `new_handover`."""
+        bot.drain_handover = new_handover
+        if bot.admin_api is not None:
+            await bot.admin_api.stop()  # Free the port for the replacement
+            bot.admin_api = None
+        for item in queue.cancel_waiting():
+            new_handover.put(item)
+        logger.info(f"Draining: {len(queue.running_ids())} prompts still running.")
+    bot.begin_drain = begin_drain
+
+    def owns_guild(guild_id):
+        """Whether this instance (or shard group) serves the guild; DMs belong to shard 0."""
+        if guild_id is None:
+            return shard_ids is None or 0 in shard_ids
+        return bot.get_guild(guild_id) is not None
+
+    async def accept_prompt(message, config):
+        MESSAGES_HANDLED.labels("prompt").inc()
+        if bot.drain_handover is not None:
+            if bot.drain_handover.put(PromptItem.from_message(message, config.get("default_model", "llama2"))):
+                logger.info(f"Prompt {message.id} handed over to the new instance.")
+            return
+        await enqueue_prompt(message, config, ollama, queue)
 
     @bot.event
     async def on_ready():
@@ -457,6 +623,28 @@ def create_bot():
             config = load_config(guild.id)  # utils.load_config ensures default_model is set
             server_configs[guild.id] = config
         logging.info("Loaded all server configs.")
+        if handover is not None:
+            # Take over prompts from the instance being replaced; it ignores new messages from now on
+            items = []
+            for item in handover.take_all():
+                # The old instance may have handed a message over twice (queued, then seen again)
+                if not queue.has(item.message_id) and all(item.message_id != taken.message_id for taken in items):
+                    items.append(item)
+            if items:
+                logger.info(f"Resuming {len(items)} prompts from the previous instance.")
+            for item in items:
+                asyncio.create_task(resume_prompt(bot, item, ollama, queue))
+        elif not bot.journal_resumed:
+            # After a crash or cold start, answer journalled prompts that never got a reply
+            bot.journal_resumed = True
+            journal = get_prompt_journal()
+            if journal is not None:
+                max_age = app_config.get("prompt_journal_max_age", 600)
+                items = [item for item in journal.pending(max_age) if owns_guild(item.guild_id)]
+                if items:
+                    logger.info(f"Resuming {len(items)} unanswered prompts from the journal.")
+                for item in items:
+                    asyncio.create_task(resume_prompt(bot, item, ollama, queue))
 
     @bot.event
     async def on_guild_join(guild):
@@ -469,23 +657,40 @@ def create_bot():
     async def on_guild_remove(guild):
         logger.info(f"Left server: {guild.name} ({guild.id})")
 
+    @bot.event
+    async def on_raw_message_delete(payload):
+        # Raw event so it also fires for prompts that fell out of the message cache
+        active_generations.cancel(payload.message_id, "deleted")
+        page_store.remove(payload.message_id)
+
     @bot.event
     async def on_message(message):
+        MESSAGES_SEEN.inc()
         if message.author == bot.user:
             return
+        if bot.drain_handover is not None and bot.drain_handover.closed:
+            return  # The replacement instance is up and sees this message too
+        if handover is not None and not handover.closed:
+            # Messages arrive before on_ready; the old instance handles them until the handover is taken
+            return
 
         guild_id = message.guild.id if message.guild else None
         config = server_configs.get(guild_id, {})
+        # Each event runs in its own task, so the trace stays with this message; it is only
+        # kept if the message turns into a prompt
+        trace = start_trace("prompt")
 
         # Permission: Should the bot reply to this user/message?
-        if not permissions.can_reply(message, config):
+        with trace.span("permissions"):
+            allowed = permissions.can_reply(message, config)
+        if not allowed:
             return
 
         # Random prompt probability
         prob = config.get("random_prompt_probability", 0)
         import random
         if prob > 0 and random.randint(1, 100) <= prob:
-            await handle_ollama_prompt(message, config, ollama)
+            await accept_prompt(message, config)
             return
 
         # Check if message starts with prefix or bot mention
@@ -510,6 +715,7 @@ def create_bot():
                 message.content = COMMAND_PREFIX + after_mention
 
         if is_command:
+            MESSAGES_HANDLED.labels("command").inc()
             await bot.process_commands(message)
         else:
             # If the message starts with a mention, treat the rest as a prompt
@@ -517,10 +723,10 @@ def create_bot():
                 after_mention = content[len(mention_str_1):] if content.startswith(mention_str_1) else content[len(mention_str_2):]
                 after_mention = after_mention.lstrip()
                 if after_mention:  # Only send prompt if there's text after the mention
-                    await handle_ollama_prompt(message, config, ollama)
+                    await accept_prompt(message, config)
             # Optionally: treat any message that mentions the bot anywhere as a prompt
             elif bot.user in message.mentions:
-                await handle_ollama_prompt(message, config, ollama)
+                await accept_prompt(message, config)
 
     @bot.command(name="ping")
     async def ping(ctx):
@@ -559,7 +765,8 @@ def create_bot():
         config = server_configs.get(guild_id, {})
         current_model = config.get("default_model", "llama2")
         try:
-            models = ollama.list_models()
+            # Off the event loop: the pool may health-check every backend first
+            models = await asyncio.get_running_loop().run_in_executor(None, ollama.list_models)
         except Exception as e:
             await ctx.send(f"Error fetching models: {e}")
             return
@@ -595,6 +802,51 @@ def create_bot():
         })
         await ctx.send(f"Pagination character limit set to {max_chars}.")
 
+    @bot.command(name="bench")
+    async def bench_command(ctx, *args):
+        if ctx.guild is None or not ctx.author.guild_permissions.administrator:
+            await ctx.send("You do not have permission to run benchmarks.")
+            return
+        # Arguments: model names (default: all installed) and optionally replay=<n>
+        replay = 0
+        models = []
+        for arg in args:
+            if arg.startswith("replay="):
+                try:
+                    replay = int(arg[len("replay="):])
+                except ValueError:
+                    await ctx.send("replay must be a number, e.g. replay=5")
+                    return
+            else:
+                models.append(arg)
+        loop = asyncio.get_running_loop()
+        installed = await loop.run_in_executor(None, ollama.list_models)  # Health-checks every backend
+        unknown = [m for m in models if m not in installed]
+        if unknown:
+            await ctx.send(f"Unknown models: {', '.join(unknown)}")
+            return
+        models = models or installed
+        if not models:
+            await ctx.send("No models found on Ollama server.")
+            return
+        if benchmark.is_running():
+            await ctx.send("A benchmark is already running.")
+            return
+        status_msg = await ctx.send(f"Benchmarking {len(models)} models. This unloads each model and may take a while...")
+        def progress(text):
+            asyncio.run_coroutine_threadsafe(status_msg.edit(content=text), loop)
+        results = await loop.run_in_executor(None, benchmark.run_benchmark, models, replay, None, progress)
+        if results is None:
+            await status_msg.edit(content="A benchmark is already running.")
+            return
+        lines = [f"{r['model']}: {benchmark.format_result(r)}" for r in results]
+        await status_msg.edit(content="Benchmark finished.")
+        pages = paginate_text("\n".join(lines), 1900)
+        if len(pages) == 1:
+            await ctx.send(f"```\n{pages[0]}\n```")
+        else:
+            await send_paginated(ctx, [f"```\n{p}\n```" for p in pages], ctx.author.id)
+
     @bot.command(name="help")
     async def help_command(ctx):
         guild_id = ctx.guild.id
@@ -623,6 +875,9 @@ def create_bot():
             f"{prefix}config\n"
             f"Show the current server configuration in raw JSON.\n"
             f"\n"
+            f"{prefix}bench [model ...] [replay=<n>]\n"
+            f"Benchmark models on this machine (administrators only). Defaults to all installed models; replay=<n> uses n prompts sampled from the prompt journal instead of the standard set.\n"
+            f"\n"
             f"{prefix}help\n"
             f"Show this help message.\n"
             f"\n"
@@ -636,61 +891,162 @@ def create_bot():
         if len(pages) == 1:
             await ctx.send(f"```\n{pages[0]}\n```")
         else:
-            view = PaginatedView([f"```\n{p}\n```" for p in pages], ctx.author.id)
-            view.message = await ctx.send(f"Page 1/{len(pages)}\n```\n{pages[0]}\n```", view=view)
+            await send_paginated(ctx, [f"```\n{p}\n```" for p in pages], ctx.author.id)
 
     return bot
 
+def get_shard_health(bot_instance):
+    """
+    Returns [{"shard_id", "latency", "closed", "guilds"}] for a running bot. A bot without
+    sharding is reported as a single entry with shard_id None.
+    """
+    if bot_instance is None:
+        return []
+    guild_counts = {}
+    for guild in bot_instance.guilds:
+        guild_counts[guild.shard_id] = guild_counts.get(guild.shard_id, 0) + 1
+    if isinstance(bot_instance, commands.AutoShardedBot):
+        return [{
+            "shard_id": shard.id,
+            "latency": None if shard.latency != shard.latency else round(shard.latency * 1000),  # NaN before the first heartbeat
+            "closed": shard.is_closed(),
+            "guilds": guild_counts.get(shard.id, 0)
+        } for shard in bot_instance.shards.values()]
+    latency = bot_instance.latency
+    return [{
+        "shard_id": None,
+        "latency": None if latency != latency else round(latency * 1000),
+        "closed": bot_instance.is_closed(),
+        "guilds": len(bot_instance.guilds)
+    }]
+
+def is_bot_running():
+    if _shard_manager is not None:
+        return _shard_manager.is_running()
+    return _bot_thread is not None and _bot_thread.is_alive()
+
+def list_guilds():
+    """Returns (name, id, shard_id) for every guild the bot is in, across all shard processes."""
+    if _shard_manager is not None:
+        return _shard_manager.guilds()
+    return [(guild.name, guild.id, guild.shard_id) for guild in getattr(_bot_instance, "guilds", [])]
+
+def shard_health():
+    """Shard health for the GUI: from the shard processes, or from the in-process bot."""
+    if _shard_manager is not None:
+        return _shard_manager.shard_health()
+    return get_shard_health(_bot_instance)
+
 def start_bot():
-    global _bot_thread, _bot_loop, _shutdown_event, _bot_instance
-    if _bot_thread and _bot_thread.is_alive():
+    global _shard_manager
+    if is_bot_running():
         logger.info("Bot is already running.")
         return
+    app_config = load_app_config()
+    processes = app_config.get("shard_processes", 1)
+    if processes > 1:
+        # Shard groups run in their own processes; see shard_manager.py
+        from shard_manager import ShardManager, fetch_recommended_shards
+        shard_count = app_config.get("shard_count") or fetch_recommended_shards(get_discord_token())
+        _shard_manager = ShardManager(shard_count, processes)
+        _shard_manager.start()
+        return
+    _shard_manager = None
+    _start_bot_thread()
+
+def _start_bot_thread(handover=None):
+    global _bot_thread, _shutdown_event
     _shutdown_event = threading.Event()
+    shutdown_event = _shutdown_event
     def run():
         import asyncio
         global _bot_loop, _bot_instance
-        _bot_loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(_bot_loop)
-        _bot_instance = create_bot()
+        loop = _bot_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        bot_instance = _bot_instance = create_bot(handover=handover)
         try:
-            _bot_loop.run_until_complete(_run_bot(_shutdown_event, _bot_instance))
+            loop.run_until_complete(_run_bot(shutdown_event, bot_instance))
         finally:
-            _bot_loop.run_until_complete(_bot_loop.shutdown_asyncgens())
-            _bot_loop.close()
-    _bot_thread = threading.Thread(target=run, daemon=True)
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+    _bot_thread = threading.Thread(target=run, name="bot-loop", daemon=True)
     _bot_thread.start()
     logger.info("Bot thread started.")
 
 def stop_bot():
     global _shutdown_event, _bot_thread
+    if _shard_manager is not None:
+        _shard_manager.stop()
     if _shutdown_event:
         _shutdown_event.set()
     if _bot_thread:
         _bot_thread.join(timeout=10)  # Wait for the thread to finish
     logger.info("Bot shutdown requested.")
 
-def restart_bot():
-    stop_bot()
-    time.sleep(1)  # Give time for shutdown
-    start_bot()
-    logger.info("Bot restart requested.")
+def restart_bot(graceful=True):
+    """
+    Restarts the bot. A graceful restart keeps the bot answering: the running instance
+    stops taking prompts and hands its queue to a new instance, then finishes its in-flight
+    generations (for up to `drain_timeout` seconds from app_config) before disconnecting.
+    """
+    if not graceful or _shard_manager is not None or not is_bot_running() or _bot_instance is None:
+        stop_bot()
+        time.sleep(1)  # Give time for shutdown
+        start_bot()
+        logger.info("Bot restart requested.")
+        return
+    old_instance, old_loop, old_event, old_thread = _bot_instance, _bot_loop, _shutdown_event, _bot_thread
+    handover = PromptHandover()
+    asyncio.run_coroutine_threadsafe(old_instance.begin_drain(handover), old_loop).result(timeout=10)
+    _start_bot_thread(handover)
+    drain_timeout = load_app_config().get("drain_timeout", 60)
+
+    def retire_old_instance():
+        future = asyncio.run_coroutine_threadsafe(old_instance.prompt_queue.join(drain_timeout), old_loop)
+        try:
+            drained = future.result(timeout=drain_timeout + 5)
+        except Exception:
+            drained = False
+        if not drained:
+            logger.warning(f"In-flight prompts did not finish within {drain_timeout}s; cancelling them.")
+        old_event.set()
+        old_thread.join(timeout=30)
+        logger.info("Previous bot instance stopped.")
+    threading.Thread(target=retire_old_instance, daemon=True).start()
+    logger.info("Graceful bot restart started.")
 
 async def _run_bot(shutdown_event, bot_instance):
     import asyncio
+    loop = asyncio.get_running_loop()
     shutdown_asyncio_event = asyncio.Event()
-    def set_shutdown():
-        shutdown_asyncio_event.set()
-    # Link threading event to asyncio event
-    def check_shutdown():
-        if shutdown_event.is_set():
-            set_shutdown()
-        else:
-            _bot_loop.call_later(0.5, check_shutdown)
-    _bot_loop.call_soon(check_shutdown)
-    bot_task = asyncio.create_task(bot_instance.start(DISCORD_TOKEN))
+    # A helper thread blocks on the (threading or multiprocessing) event and wakes the loop
+    # directly, instead of the loop polling it
+    def wait_for_shutdown():
+        shutdown_event.wait()
+        try:
+            loop.call_soon_threadsafe(shutdown_asyncio_event.set)
+        except RuntimeError:
+            pass  # The loop already finished
+    threading.Thread(target=wait_for_shutdown, daemon=True).start()
+    bot_task = asyncio.create_task(bot_instance.start(get_discord_token()))
     await shutdown_asyncio_event.wait()
+    if bot_instance.admin_api is not None:
+        await bot_instance.admin_api.stop()
+        bot_instance.admin_api = None
+    bot_instance.prompt_queue.cancel_waiting()
+    # Only this instance's generations; a replacement instance may be running already
+    for message_id in bot_instance.prompt_queue.running_ids():
+        active_generations.cancel(message_id, "shutdown")
     await bot_instance.close()
+    if bot_instance.loop_monitor is not None:
+        bot_instance.loop_monitor.stop()
+        bot_instance.loop_monitor = None
+    if bot_instance.memdiag_schedule is not None:
+        # Only the schedule this instance started; the replacement's keeps running
+        get_memory_diagnostics().stop_schedule(bot_instance.memdiag_schedule)
+        bot_instance.memdiag_schedule = None
+    await loop.run_in_executor(None, page_store.flush)
+    get_model_stats().flush()
     try:
         await bot_task
     except Exception:
@@ -704,4 +1060,15 @@ def run_discord_bot():
 # Utility to reload a server's config from disk (for GUI live updates)
 def reload_server_config(guild_id):
     config = load_config(guild_id)
-    server_configs[guild_id] = config 
\ No newline at end of file
+    server_configs[guild_id] = config
+
+def reload_all_server_configs():
+    """Reloads the config of every loaded server from disk (e.g. on SIGHUP in headless mode)."""
+    reset_prompt_journal()
+    if _shard_manager is not None:
+        _shard_manager.request("reload_config")  # Each shard group process keeps its own configs
+        logger.info("Asked every shard group to reload its server configs.")
+        return
+    for guild_id in list(server_configs):
+        reload_server_config(guild_id)
+    logger.info(f"Reloaded {len(server_configs)} server configs.") 
\ No newline at end of file
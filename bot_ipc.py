@@ -0,0 +1,231 @@
+"""
+Runs the Discord bot in a child process and talks to it over a local pipe.
+The GUI keeps its own process (and GIL); it asks the bot for status, servers and configs
+with request(), and receives bot events and log records with poll_events().
+
+Messages on the pipe are dicts:
+    GUI -> bot:  {"id": n, "command": name, "args": {...}}
+    bot -> GUI:  {"id": n, "ok": True, "result": ...} / {"id": n, "ok": False, "error": "..."}
+                 {"event": name, "data": {...}, "timestamp": t}
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+import itertools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("silasblue")
+
+
+class BotIPCError(Exception):
+    """Raised when the bot process is not running, does not answer, or rejects a request."""
+
+
+class _ForwardLogHandler(logging.Handler):
+    """Sends the bot's log records to the GUI so they still show up in the Bot Log."""
+
+    def __init__(self, send_event):
+        super().__init__(level=logging.INFO)
+        self.send_event = send_event
+
+    def emit(self, record):
+        try:
+            self.send_event("log", {
+                "name": record.name,
+                "levelno": record.levelno,
+                "levelname": record.levelname,
+                "msg": record.getMessage(),
+                "created": record.created,
+            })
+        except Exception:
+            pass  # Never let logging break the bot
+
+
+def run_bot_process(conn):
+    """Child process entry point: runs the bot and serves requests until told to stop."""
+    os.makedirs("logs", exist_ok=True)
+    logging.basicConfig(
+        filename="logs/silasblue.log",
+        filemode="a",
+        format="%(asctime)s %(levelname)s:[bot] %(message)s",
+        level=logging.INFO
+    )
+    import bot_core
+    from bot_control import dispatch
+    from ollama_pool import get_backend_pool
+    from ollama_supervisor import register_supervised_backends
+
+    send_lock = threading.Lock()
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    def send_event(event, data):
+        send({"event": event, "data": data, "timestamp": time.time()})
+
+    # Supervised Ollama instances run in the GUI process; route prompts to them too
+    register_supervised_backends(get_backend_pool())
+    bot_core.add_event_listener(send_event)
+    logging.getLogger("silasblue").addHandler(_ForwardLogHandler(send_event))
+
+    def handle(message):
+        try:
+            result = dispatch(message["command"], message.get("args"))
+            reply = {"id": message["id"], "ok": True, "result": result}
+        except Exception as e:
+            reply = {"id": message["id"], "ok": False, "error": str(e)}
+        try:
+            send(reply)
+        except (OSError, EOFError):
+            pass
+
+    bot_core.start_bot()
+    # Requests run on a small pool so one slow config load does not hold up the rest
+    executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ipc")
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                logger.warning("Control pipe closed; stopping the bot.")
+                break
+            if message.get("command") == "shutdown":
+                send({"id": message["id"], "ok": True, "result": True})
+                break
+            executor.submit(handle, message)
+    finally:
+        bot_core.remove_event_listener(send_event)
+        bot_core.stop_bot()
+        executor.shutdown(wait=False)
+        conn.close()
+
+
+class BotProcess:
+    """
+    Starts, stops and queries the bot process from the GUI.
+
+    A reader thread matches replies to pending requests and queues events; the GUI drains
+    them with poll_events() on its own thread.
+    """
+
+    def __init__(self, request_timeout=5.0):
+        self.request_timeout = request_timeout
+        self._ctx = multiprocessing.get_context("spawn")
+        self._process = None
+        self._conn = None
+        self._reader = None
+        self._send_lock = threading.Lock()
+        self._pending = {}  # request id -> [threading.Event, reply]
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._events = queue.Queue(maxsize=10000)
+
+    def start(self):
+        if self.is_running():
+            logger.info("Bot process is already running.")
+            return
+        parent_conn, child_conn = self._ctx.Pipe()
+        self._process = self._ctx.Process(target=run_bot_process, args=(child_conn,), name="silasblue-bot")
+        self._process.start()
+        child_conn.close()  # Only the child holds its end, so its exit shows up as EOF here
+        self._conn = parent_conn
+        self._reader = threading.Thread(target=self._read_loop, args=(parent_conn,), daemon=True)
+        self._reader.start()
+        logger.info(f"Bot process started (PID {self._process.pid}).")
+
+    def stop(self, timeout=15):
+        process = self._process
+        if process is None:
+            return
+        if process.is_alive():
+            try:
+                self.request("shutdown", timeout=timeout)
+            except BotIPCError:
+                pass
+            process.join(timeout=timeout)
+            if process.is_alive():
+                logger.warning("Bot process did not stop in time; terminating.")
+                process.terminate()
+                process.join(timeout=5)
+        self._process = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        logger.info("Bot process stopped.")
+
+    def restart(self):
+        """Gracefully restarts the bot inside the running process (see bot_core.restart_bot)."""
+        if not self.is_running():
+            self.start()
+            return
+        try:
+            self.request("restart")
+        except BotIPCError as e:
+            logger.warning(f"Graceful restart failed ({e}); restarting the bot process.")
+            self.stop()
+            self.start()
+
+    def is_running(self):
+        return self._process is not None and self._process.is_alive()
+
+    def request(self, command, timeout=None, **args):
+        """Sends a command to the bot process and returns its result. Raises BotIPCError."""
+        conn = self._conn
+        if conn is None or not self.is_running():
+            raise BotIPCError("The bot is not running.")
+        request_id = next(self._ids)
+        waiter = [threading.Event(), None]
+        with self._pending_lock:
+            self._pending[request_id] = waiter
+        try:
+            with self._send_lock:
+                conn.send({"id": request_id, "command": command, "args": args})
+            if not waiter[0].wait(timeout or self.request_timeout):
+                raise BotIPCError(f"The bot did not answer '{command}' in time.")
+        except (OSError, EOFError) as e:
+            raise BotIPCError(f"Lost connection to the bot: {e}")
+        finally:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+        reply = waiter[1]
+        if reply is None:
+            raise BotIPCError("The bot process exited.")
+        if not reply["ok"]:
+            raise BotIPCError(reply["error"])
+        return reply["result"]
+
+    def poll_events(self, max_events=500):
+        """Returns the events received since the last call (oldest first)."""
+        events = []
+        while len(events) < max_events:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def _read_loop(self, conn):
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            if "event" in message:
+                try:
+                    self._events.put_nowait(message)
+                except queue.Full:
+                    pass  # The GUI is not keeping up; drop rather than grow without bound
+                continue
+            with self._pending_lock:
+                waiter = self._pending.get(message.get("id"))
+            if waiter is not None:
+                waiter[1] = message
+                waiter[0].set()
+        # Wake anyone still waiting; their reply stays None
+        with self._pending_lock:
+            for waiter in self._pending.values():
+                waiter[0].set()
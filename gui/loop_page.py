@@ -0,0 +1,108 @@
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
+    QPlainTextEdit
+)
+from PySide6.QtCore import QTimer
+import time
+
+COLUMNS = ["Call Site", "Kind", "Blocks", "Total", "Worst", "Last Seen"]
+
+def _ms(value):
+    return "" if value is None else f"{value * 1000:.1f} ms"
+
+class LoopMonitorPage(QWidget):
+    """
+    GUI page showing the bot's event-loop lag and the code that blocked the loop.
+    Data comes from the bot process (see loop_monitor.py).
+    """
+
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+        self.offenders = []
+        self.refreshing = False  # A request is on its way; timer ticks skip until it is answered
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        self.lag_label = QLabel("")
+        layout.addWidget(self.lag_label)
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionMode(QTableWidget.SingleSelection)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.itemSelectionChanged.connect(self.show_stack)
+        layout.addWidget(self.table, 2)
+
+        layout.addWidget(QLabel("Stack of the worst block (select a row):"))
+        self.stack_view = QPlainTextEdit()
+        self.stack_view.setReadOnly(True)
+        layout.addWidget(self.stack_view, 1)
+
+        buttons = QHBoxLayout()
+        self.status_label = QLabel("")
+        buttons.addWidget(self.status_label, 1)
+        self.refresh_btn = QPushButton("Refresh")
+        self.refresh_btn.clicked.connect(self.refresh)
+        buttons.addWidget(self.refresh_btn)
+        self.reset_btn = QPushButton("Reset")
+        self.reset_btn.clicked.connect(self.reset)
+        buttons.addWidget(self.reset_btn)
+        layout.addLayout(buttons)
+
+        # Only poll the bot while this tab is showing
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(5000)
+
+    def refresh(self):
+        if not self.isVisible() or self.refreshing:
+            return
+        self.refreshing = True
+        self.main_window.bot_request("loop_monitor", self.show_summary, timeout=2.0, quiet=True)
+
+    def show_summary(self, summary):
+        self.refreshing = False
+        if summary is None:
+            self.status_label.setText("Bot is not running, or loop_monitor_enabled is off.")
+            return
+        lag = summary["lag"]
+        self.lag_label.setText(
+            f"Loop lag p50 {_ms(lag['p50'])}, p95 {_ms(lag['p95'])}, p99 {_ms(lag['p99'])}, max {_ms(lag['max'])} "
+            f"- {summary['blocks']} blocks over {_ms(summary['threshold'])} since "
+            f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(summary['started']))}"
+        )
+        selected = self.table.currentRow()
+        selected_site = self.offenders[selected]["site"] if 0 <= selected < len(self.offenders) else None
+        self.offenders = summary["offenders"]
+        self.table.setRowCount(len(self.offenders))
+        for row, entry in enumerate(self.offenders):
+            values = [
+                entry["site"], entry["kind"], str(entry["count"]),
+                _ms(entry["total_seconds"]), _ms(entry["max_seconds"]),
+                time.strftime("%H:%M:%S", time.localtime(entry["last_seen"])),
+            ]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+            if entry["site"] == selected_site:
+                self.table.selectRow(row)
+        self.status_label.setText(f"{len(self.offenders)} call sites")
+
+    def show_stack(self):
+        row = self.table.currentRow()
+        if 0 <= row < len(self.offenders):
+            self.stack_view.setPlainText(self.offenders[row]["stack"] or "(no details)")
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def reset(self):
+        self.main_window.bot_request("reset_loop_monitor", self.on_reset)
+
+    def on_reset(self, result):
+        if result is not None:
+            self.stack_view.clear()
+            self.refresh()
@@ -10,17 +10,26 @@ import logging
 import concurrent.futures
 import json
 import traceback
+import threading
 import webbrowser
 
 from .theme_manager import ThemeManager
 from .server_config_page import ServerConfigPage
+from .traces_page import TracesPage
+from .loop_page import LoopMonitorPage
+from .memory_page import MemoryPage
+from .model_stats_page import ModelStatsPage
 from ollama_api import OllamaClient
-from bot_core import bot
+from ollama_supervisor import get_supervisor
+from bot_ipc import BotIPCError
+from profiler import run_profile, format_summary
 import config
 import utils  # Add this import
 from .animated_checkbox import AnimatedCheckBox, AnimatedUsageSquares
 from utils import get_resource_path
 
+PROFILE_SECONDS = 10
+
 def debug_print(msg):
     if config.DEBUG:
         print(msg)
@@ -70,6 +79,8 @@ class WorkerSignals(QObject):
     ollama_status_checked = Signal(bool)
     model_download_progress = Signal(int, str)
     model_download_finished = Signal()
+    profile_finished = Signal(list)
+    bot_reply = Signal(object, object)  # callback, result (None on failure)
 
 class UsageWorker(QObject):
     usage_updated = Signal(float, float, float, float)
@@ -166,11 +177,18 @@ class MainWindow(QMainWindow):
     Provides controls for bot and Ollama status, model management, and configuration.
     """
 
-    def __init__(self, start_bot=None, stop_bot=None, restart_bot=None):
+    def __init__(self, start_bot=None, stop_bot=None, restart_bot=None, bot_client=None):
         try:
             debug_print("[DEBUG] MainWindow.__init__ starting...")
             super().__init__()
             debug_print("[DEBUG] QMainWindow super().__init__ done")
+            self._start_bot_func = start_bot
+            self._stop_bot_func = stop_bot
+            self._restart_bot_func = restart_bot
+            # BotProcess from bot_ipc: the bot runs in its own process and is queried over a pipe
+            self.bot_client = bot_client
+            self._guilds = []  # (name, id, shard_id) as last reported by the bot process
+            self._servers_pending = False  # A status/guilds round trip is under way
             self.setWindowFlag(Qt.FramelessWindowHint)
             self.setAttribute(Qt.WA_TranslucentBackground, False)
             # Initialize bot status attributes early
@@ -202,6 +220,8 @@ class MainWindow(QMainWindow):
 
             debug_print("[DEBUG] Creating OllamaClient")
             self.ollama = OllamaClient()
+            # Start/Stop/Restart act on the supervised instances when they are configured
+            self.ollama_controller = get_supervisor() or self.ollama
 
             # --- Custom Title Bar ---
             self.title_bar = CustomTitleBar(self, self._checkbox_colors)
@@ -225,6 +245,8 @@ class MainWindow(QMainWindow):
 
             debug_print("[DEBUG] Creating ThreadPoolExecutor")
             self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+            # Bot process requests get their own workers, so slow Ollama calls cannot hold them up
+            self.bot_executor = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="bot-request")
 
             debug_print("[DEBUG] Creating status tab")
             self.status_tab = QWidget()
@@ -367,6 +389,9 @@ class MainWindow(QMainWindow):
             self.theme_select.currentTextChanged.connect(self.change_theme)
             servers_theme_row.addWidget(self.theme_select, 1)
             status_layout.addLayout(servers_theme_row)
+            # Shard health (gateway latency per shard), filled in by update_servers_list
+            self.shards_label = QLabel("")
+            status_layout.addWidget(self.shards_label)
 
             debug_print("[DEBUG] Creating server list timer")
             self.server_list_timer = QTimer(self)
@@ -377,6 +402,22 @@ class MainWindow(QMainWindow):
             self.server_config_tab = ServerConfigPage(self)
             self.tabs.addTab(self.server_config_tab, "Server Config")
 
+            debug_print("[DEBUG] Creating model stats tab")
+            self.model_stats_tab = ModelStatsPage(self)
+            self.tabs.insertTab(1, self.model_stats_tab, "Model Stats")  # Next to the Status tab's model selector
+
+            debug_print("[DEBUG] Creating traces tab")
+            self.traces_tab = TracesPage(self)
+            self.tabs.addTab(self.traces_tab, "Traces")
+
+            debug_print("[DEBUG] Creating event loop tab")
+            self.loop_tab = LoopMonitorPage(self)
+            self.tabs.addTab(self.loop_tab, "Event Loop")
+
+            debug_print("[DEBUG] Creating memory tab")
+            self.memory_tab = MemoryPage(self)
+            self.tabs.addTab(self.memory_tab, "Memory")
+
             debug_print("[DEBUG] Creating log output section")
             log_layout = QHBoxLayout()
             self.system_log_output = QTextEdit()
@@ -405,6 +446,12 @@ class MainWindow(QMainWindow):
             checkboxes_layout.addWidget(self.system_log_to_file_checkbox)
             checkboxes_layout.addWidget(self.bot_log_to_file_checkbox)
             checkboxes_layout.addWidget(self.debug_checkbox)
+            # CPU profiling is a debugging tool, so it is only offered in debug mode
+            self.profile_btn = QPushButton(f"Profile CPU ({PROFILE_SECONDS}s)")
+            self.profile_btn.setToolTip("Sample the GUI and the bot for a few seconds; results go to the System Log.")
+            self.profile_btn.setEnabled(debug_mode)
+            self.profile_btn.clicked.connect(self.profile_cpu)
+            checkboxes_layout.addWidget(self.profile_btn)
             status_layout.addLayout(checkboxes_layout)
 
             debug_print("[DEBUG] Setting up logging handler")
@@ -459,6 +506,8 @@ class MainWindow(QMainWindow):
             self.signals.ollama_status_checked.connect(self.on_ollama_status_checked)
             self.signals.model_download_progress.connect(self.on_model_download_progress)
             self.signals.model_download_finished.connect(self.on_model_download_finished)
+            self.signals.profile_finished.connect(self.on_profile_finished)
+            self.signals.bot_reply.connect(self.on_bot_reply)
 
             QTimer.singleShot(100, self.refresh_models_async)
             self.server_list_timer.setInterval(5000)  # 5 seconds
@@ -589,19 +638,22 @@ class MainWindow(QMainWindow):
             if self.servers_list.count() > 0:
                 guild_id = self.servers_list.currentData()
             if guild_id:
-                import utils
-                config = utils.load_config(guild_id)
-                current_model = config.get("default_model", "")
-                if current_model and current_model in models:
-                    idx = self.model_select.findText(current_model)
-                    if idx != -1:
-                        self.model_select.blockSignals(True)
-                        self.model_select.setCurrentIndex(idx)
-                        self.model_select.blockSignals(False)
-                elif models:
-                    # If no model set or model missing, set to first available
-                    utils.set_default_model(guild_id, models[0])
-                    self.model_select.setCurrentIndex(0)
+                self.bot_request("get_config", lambda config: self.select_configured_model(guild_id, models, config), guild_id=guild_id)
+
+    def select_configured_model(self, guild_id, models, config):
+        if self.servers_list.currentData() != guild_id:
+            return  # Another server was selected while the config was on its way
+        current_model = (config or {}).get("default_model", "")
+        if current_model and current_model in models:
+            idx = self.model_select.findText(current_model)
+            if idx != -1:
+                self.model_select.blockSignals(True)
+                self.model_select.setCurrentIndex(idx)
+                self.model_select.blockSignals(False)
+        elif models:
+            # If no model set or model missing, set to first available
+            self.bot_request("update_config", guild_id=guild_id, changes={"default_model": models[0]})
+            self.model_select.setCurrentIndex(0)
 
     def on_model_selected(self, idx):
         # When the user selects a model, update the config for the selected server
@@ -613,11 +665,8 @@ class MainWindow(QMainWindow):
         model_name = self.model_select.currentText()
         if model_name and model_name not in ("No models found", "Ollama not running"):
             def do_model_change():
-                import utils
                 try:
-                    utils.set_default_model(guild_id, model_name)
-                    import bot_core
-                    bot_core.reload_server_config(guild_id)
+                    self.bot_client.request("update_config", guild_id=guild_id, changes={"default_model": model_name})
                     return None  # Success
                 except Exception as e:
                     return str(e)
@@ -716,27 +765,86 @@ class MainWindow(QMainWindow):
             utils.save_app_config(app_config)
 
     def update_servers_list(self):
-        """Update the list of connected servers."""
+        """Update the list of connected servers and the shard health (the bot answers in the background)."""
+        if self._servers_pending:
+            return  # The previous round has not been answered yet
+        self._servers_pending = True
+        self.bot_request("status", self.on_bot_status, timeout=1.0, quiet=True)
+
+    def on_bot_status(self, status):
+        if not status:
+            self._servers_pending = False
+            return
+        self.update_shards_label(status["shards"])
+        self.bot_request("guilds", self.on_guilds_listed, timeout=1.0, quiet=True)
+
+    def on_guilds_listed(self, guilds):
+        self._servers_pending = False
         try:
-            from bot_core import _bot_instance
-            bot = _bot_instance
-            if not bot:
+            new_servers = [(g["name"], g["id"], g["shard_id"]) for g in guilds or []]
+            self._guilds = new_servers
+            if not new_servers:
                 return
             current_servers = [self.servers_list.itemData(i) for i in range(self.servers_list.count())]
-            new_servers = [(guild.name, guild.id) for guild in getattr(bot, 'guilds', [])]
             # Only update if changed
             if len(current_servers) != len(new_servers) or any(str(gid) not in [str(x[1]) for x in new_servers] for gid in current_servers):
                 self.servers_list.clear()
-                for name, gid in new_servers:
-                    self.servers_list.addItem(f"{name} ({gid})", userData=gid)
+                for name, gid, shard_id in new_servers:
+                    label = f"{name} ({gid})" if shard_id is None else f"{name} ({gid}) [shard {shard_id}]"
+                    self.servers_list.addItem(label, userData=gid)
             # Also update the config page's server list if it exists
             if hasattr(self, "server_config_tab"):
                 self.server_config_tab.update_guilds()
         except Exception as e:
             self.system_log_output.append(f"[ERROR] Failed to update server list: {e}")
 
+    def bot_request(self, command, callback=None, timeout=None, quiet=False, **args):
+        """
+        Sends a request to the bot process from a worker thread, so a busy bot never freezes
+        the window. `callback(result)` runs on the GUI thread afterwards, with None on
+        failure (logged unless quiet).
+        """
+        bot_client = self.bot_client
+        if bot_client is None:
+            if callback is not None:
+                callback(None)
+            return
+        def run():
+            try:
+                result = bot_client.request(command, timeout=timeout, **args)
+            except BotIPCError as e:
+                result = None
+                if not quiet:
+                    self.signals.bot_reply.emit(self.system_log_output.append, f"[ERROR] Bot request '{command}' failed: {e}")
+            if callback is not None:
+                self.signals.bot_reply.emit(callback, result)
+        self.bot_executor.submit(run)
+
+    @Slot(object, object)
+    def on_bot_reply(self, callback, result):
+        callback(result)
+
+    def update_shards_label(self, health):
+        """Shows latency per shard, or 'down' for closed shards and unresponsive shard processes."""
+        if not health or (len(health) == 1 and health[0]["shard_id"] is None):
+            self.shards_label.setText("")
+            return
+        parts = []
+        for shard in health:
+            if shard["closed"] or shard["latency"] is None:
+                parts.append(f"#{shard['shard_id']} <span style='color:red;'>down</span>")
+            else:
+                parts.append(f"#{shard['shard_id']} {shard['latency']}ms ({shard.get('guilds', 0)} servers)")
+        self.shards_label.setText("Shards: " + " · ".join(parts))
+
     def read_gui_log(self):
-        """Read new lines from config/gui_log.txt and append to log_output."""
+        """
+        Show new bot events. They arrive over the bot process pipe; without a bot process,
+        new lines are read from config/gui_log.txt instead.
+        """
+        if self.bot_client is not None:
+            self.handle_bot_events(self.bot_client.poll_events())
+            return
         log_path = get_resource_path(os.path.join("config", "gui_log.txt"))
         if not os.path.exists(log_path):
             return
@@ -745,49 +853,63 @@ class MainWindow(QMainWindow):
                 f.seek(self._gui_log_pos)
                 lines = f.readlines()
                 self._gui_log_pos = f.tell()
+            entries = []
             for line in lines:
                 try:
-                    entry = json.loads(line)
-                    event = entry.get("event")
-                    data = entry.get("data", {})
-                    ts = entry.get("timestamp")
-                    # Route prompt/reply/discord events to bot log, config_change/errors to system log
-                    if event == "config_change":
-                        msg = f"[Config Change] Guild: {data.get('guild_id')} User: {data.get('user')} Field: {data.get('field')} -> {data.get('value')}"
-                        self.system_log_output.append(msg)
-                        # If the config change is for default_model and the current server is affected, update the dropbox
-                        if data.get("field") == "default_model":
-                            current_guild = self.servers_list.currentData()
-                            if str(current_guild) == str(data.get("guild_id")):
-                                # Update the model_select dropbox to match the new value
-                                model_name = data.get("value")
-                                idx = self.model_select.findText(model_name)
-                                if idx != -1:
-                                    self.model_select.blockSignals(True)
-                                    self.model_select.setCurrentIndex(idx)
-                                    self.model_select.blockSignals(False)
-                    elif event == "prompt":
-                        msg = f"[Prompt] Guild: {data.get('guild_id')} User: {data.get('user')} Prompt: {data.get('prompt')}"
-                        self.bot_log_output.append(msg)
-                    elif event == "reply":
-                        msg = f"[Reply] Guild: {data.get('guild_id')} User: {data.get('user')} Reply: {data.get('reply')[:200]}{'...' if len(data.get('reply',''))>200 else ''}"
-                        self.bot_log_output.append(msg)
-                    else:
-                        # Assume all other Discord events go to bot log
-                        msg = str(entry)
-                        self.bot_log_output.append(msg)
+                    entries.append(json.loads(line))
                 except Exception as e:
                     self.system_log_output.append(f"[Log Parse Error] {e}")
+            self.handle_bot_events(entries)
         except Exception as e:
             self.system_log_output.append(f"[Log File Error] {e}")
 
+    def handle_bot_events(self, entries):
+        """Route prompt/reply/discord events to the bot log, config changes and errors to the system log."""
+        for entry in entries:
+            try:
+                event = entry.get("event")
+                data = entry.get("data", {})
+                ts = entry.get("timestamp")
+                if event == "log":
+                    # A log record from the bot process. Only for the Bot Log widget: the bot
+                    # process already wrote it to logs/silasblue.log itself
+                    self.bot_log_handler.handle(logging.makeLogRecord(data))
+                elif event == "config_change":
+                    msg = f"[Config Change] Guild: {data.get('guild_id')} User: {data.get('user')} Field: {data.get('field')} -> {data.get('value')}"
+                    self.system_log_output.append(msg)
+                    # If the config change is for default_model and the current server is affected, update the dropbox
+                    if data.get("field") == "default_model":
+                        current_guild = self.servers_list.currentData()
+                        if str(current_guild) == str(data.get("guild_id")):
+                            # Update the model_select dropbox to match the new value
+                            model_name = data.get("value")
+                            idx = self.model_select.findText(model_name)
+                            if idx != -1:
+                                self.model_select.blockSignals(True)
+                                self.model_select.setCurrentIndex(idx)
+                                self.model_select.blockSignals(False)
+                elif event == "prompt":
+                    msg = f"[Prompt] Guild: {data.get('guild_id')} User: {data.get('user')} Prompt: {data.get('prompt')}"
+                    self.bot_log_output.append(msg)
+                elif event == "reply":
+                    msg = f"[Reply] Guild: {data.get('guild_id')} User: {data.get('user')} Reply: {data.get('reply')[:200]}{'...' if len(data.get('reply',''))>200 else ''}"
+                    self.bot_log_output.append(msg)
+                elif event == "cancelled":
+                    msg = f"[Cancelled] Guild: {data.get('guild_id')} User: {data.get('user')} Reason: {data.get('reason')}"
+                    self.bot_log_output.append(msg)
+                else:
+                    # Assume all other Discord events go to bot log
+                    msg = str(entry)
+                    self.bot_log_output.append(msg)
+            except Exception as e:
+                self.system_log_output.append(f"[Log Parse Error] {e}")
+
     def update_bot_status(self):
         """
         Update the bot status label based on thread state and errors.
         """
         try:
-            from bot_core import _bot_thread, _bot_loop
-            if _bot_thread is not None and _bot_thread.is_alive():
+            if self.bot_client is not None and self.bot_client.is_running():
                 self._bot_status = "Running"
                 self._bot_status_error = None
             else:
@@ -877,7 +999,7 @@ class MainWindow(QMainWindow):
         """Start the Ollama service via OllamaClient."""
         try:
             self.system_log_output.append("[INFO] Starting Ollama service...")
-            started = self.ollama.start()
+            started = self.ollama_controller.start()
             if started:
                 self.system_log_output.append("[INFO] Ollama service started successfully.")
             else:
@@ -893,7 +1015,7 @@ class MainWindow(QMainWindow):
         """Stop the Ollama service via OllamaClient, if supported."""
         try:
             self.system_log_output.append("[INFO] Stopping Ollama service...")
-            stopped = getattr(self.ollama, 'stop', lambda: False)()
+            stopped = getattr(self.ollama_controller, 'stop', lambda: False)()
             if stopped:
                 self.system_log_output.append("[INFO] Ollama service stopped successfully.")
             else:
@@ -909,13 +1031,13 @@ class MainWindow(QMainWindow):
         """Restart the Ollama service via OllamaClient, if supported."""
         try:
             self.system_log_output.append("[INFO] Restarting Ollama service...")
-            restarted = getattr(self.ollama, 'restart', None)
+            restarted = getattr(self.ollama_controller, 'restart', None)
             if callable(restarted):
                 result = restarted()
             else:
                 # Fallback: stop then start
-                stop = getattr(self.ollama, 'stop', lambda: False)
-                start = getattr(self.ollama, 'start', lambda: False)
+                stop = getattr(self.ollama_controller, 'stop', lambda: False)
+                start = getattr(self.ollama_controller, 'start', lambda: False)
                 result = stop() and start()
             if result:
                 self.system_log_output.append("[INFO] Ollama service restarted successfully.")
@@ -940,6 +1062,41 @@ class MainWindow(QMainWindow):
         # Update logger levels
         logging.getLogger().setLevel(logging.DEBUG if debug_enabled else logging.INFO)
         logging.getLogger("silasblue").setLevel(logging.DEBUG if debug_enabled else logging.INFO)
+        if self.profile_btn.text().startswith("Profile"):  # Not while a profile is running
+            self.profile_btn.setEnabled(debug_enabled)
+
+    def profile_cpu(self):
+        """Profiles the GUI and bot processes at the same time; on_profile_finished logs the results."""
+        self.profile_btn.setEnabled(False)
+        self.profile_btn.setText("Profiling...")
+        bot_client = self.bot_client
+        # Plain threads, not self.executor: both workers would be tied up for the whole run
+        def profile_bot(results):
+            if bot_client is None:
+                return
+            try:
+                results.append(bot_client.request("profile", timeout=PROFILE_SECONDS + 15, seconds=PROFILE_SECONDS))
+            except BotIPCError as e:
+                results.append(f"Bot profile failed: {e}")
+        def do_profile():
+            results = []
+            bot_thread = threading.Thread(target=profile_bot, args=(results,), daemon=True)
+            bot_thread.start()
+            summary = run_profile(PROFILE_SECONDS, label="gui")
+            bot_thread.join()
+            results.insert(0, summary if summary is not None else "A GUI profile is already running.")
+            self.signals.profile_finished.emit(results)
+        threading.Thread(target=do_profile, name="profile-request", daemon=True).start()
+
+    @Slot(list)
+    def on_profile_finished(self, results):
+        for result in results:
+            if isinstance(result, dict):
+                logging.info(format_summary(result))
+            else:
+                self.system_log_output.append(f"[ERROR] {result}")
+        self.profile_btn.setText(f"Profile CPU ({PROFILE_SECONDS}s)")
+        self.profile_btn.setEnabled(self.debug_checkbox.isChecked())
 
     def handle_crash_counter(self):
         count = get_crash_counter()
@@ -963,6 +1120,10 @@ class MainWindow(QMainWindow):
             self.usage_worker.stop()
             self.usage_thread.quit()
             self.usage_thread.wait()
+        if self.bot_client is not None and self.bot_client.is_running():
+            self.bot_client.stop()  # The bot process would otherwise keep the app from exiting
+        if self.ollama_controller is not self.ollama:
+            self.ollama_controller.stop()  # Don't leave supervised ollama serve processes behind
         set_crash_counter(0)
         self.save_checkbox_states()  # Save on close
         super().closeEvent(event)
@@ -0,0 +1,180 @@
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QTableWidget, QTableWidgetItem, QHeaderView
+)
+import time
+
+from memdiag import rss_mb
+
+SITE_COLUMNS = ["Allocation Site", "Size", "Change", "Blocks", "Block Change"]
+OBJECT_COLUMNS = ["Process", "What", "Count"]
+
+def _kb(value, sign=False):
+    if value is None:
+        return ""
+    spec = "+.1f" if sign else ".1f"
+    return f"{value / 1024:{spec}} MB" if abs(value) >= 1024 else f"{value:{spec}} KB"
+
+class MemoryPage(QWidget):
+    """
+    GUI page for memory diagnostics: the bot's allocation growth since a baseline
+    tracemalloc snapshot, live object counts, and the GUI's own log sizes.
+    Data comes from the bot process (see memdiag.py). It is not polled, because
+    snapshots and object counts walk the whole heap; use the buttons.
+    """
+
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+        self.object_counts = None
+        self.refreshing = False  # A request is on its way; further refreshes wait for it
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        self.summary_label = QLabel("")
+        layout.addWidget(self.summary_label)
+
+        controls = QHBoxLayout()
+        self.tracing_btn = QPushButton("Start Tracing")
+        self.tracing_btn.clicked.connect(self.toggle_tracing)
+        controls.addWidget(self.tracing_btn)
+        self.snapshot_btn = QPushButton("Take Snapshot")
+        self.snapshot_btn.clicked.connect(lambda: self.snapshot(baseline=False))
+        controls.addWidget(self.snapshot_btn)
+        self.baseline_btn = QPushButton("Set Baseline")
+        self.baseline_btn.clicked.connect(lambda: self.snapshot(baseline=True))
+        controls.addWidget(self.baseline_btn)
+        controls.addWidget(QLabel("Group by:"))
+        self.group_select = QComboBox()
+        self.group_select.addItem("Line", userData="lineno")
+        self.group_select.addItem("File", userData="filename")
+        self.group_select.addItem("Call stack", userData="traceback")
+        self.group_select.currentIndexChanged.connect(self.refresh)
+        controls.addWidget(self.group_select)
+        controls.addStretch(1)
+        self.objects_btn = QPushButton("Count Objects")
+        self.objects_btn.clicked.connect(self.count_objects)
+        controls.addWidget(self.objects_btn)
+        self.refresh_btn = QPushButton("Refresh")
+        self.refresh_btn.clicked.connect(self.refresh)
+        controls.addWidget(self.refresh_btn)
+        layout.addLayout(controls)
+
+        self.sites_label = QLabel("")
+        layout.addWidget(self.sites_label)
+        self.sites_table = QTableWidget(0, len(SITE_COLUMNS))
+        self.sites_table.setHorizontalHeaderLabels(SITE_COLUMNS)
+        self.sites_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.sites_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.sites_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        layout.addWidget(self.sites_table, 2)
+
+        layout.addWidget(QLabel("What is held in memory:"))
+        self.objects_table = QTableWidget(0, len(OBJECT_COLUMNS))
+        self.objects_table.setHorizontalHeaderLabels(OBJECT_COLUMNS)
+        self.objects_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.objects_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        layout.addWidget(self.objects_table, 1)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+    def refresh(self):
+        if not self.isVisible() or self.refreshing:
+            return
+        self.refreshing = True
+        self.main_window.bot_request("memory", self.show_summary, timeout=10.0, quiet=True, group_by=self.group_select.currentData())
+
+    def show_summary(self, summary):
+        self.refreshing = False
+        gui_rss = rss_mb()
+        if summary is None:
+            self.summary_label.setText(f"GUI RSS {gui_rss:.0f} MB - bot is not running.")
+            self.show_objects(None)
+            return
+        self.tracing_btn.setText("Stop Tracing" if summary["tracing"] else "Start Tracing")
+        self.snapshot_btn.setEnabled(summary["tracing"])
+        self.baseline_btn.setEnabled(summary["tracing"])
+        text = f"Bot RSS {summary['rss_mb']:.0f} MB, GUI RSS {gui_rss:.0f} MB"
+        if summary["tracing"]:
+            text += f" - traced {summary['traced_mb']:.1f} MB (peak {summary['peak_traced_mb']:.1f} MB)"
+            if summary["snapshot_interval"]:
+                text += f", snapshot every {summary['snapshot_interval']}s"
+        else:
+            text += " - tracing is off"
+        self.summary_label.setText(text)
+
+        baseline = summary["baseline"]
+        rows = summary["growth"]
+        if rows:
+            self.sites_label.setText(
+                f"Growth since the baseline ({time.strftime('%Y-%m-%d %H:%M', time.localtime(baseline['time']))}, "
+                f"{len(summary['snapshots'])} snapshots kept):"
+            )
+        else:
+            rows = summary["top"]
+            self.sites_label.setText("Largest allocation sites in the latest snapshot:" if rows else
+                                     "Take a snapshot to see allocation sites (start tracing first).")
+        self.sites_table.setRowCount(len(rows))
+        for row, entry in enumerate(rows):
+            values = [
+                entry["site"], _kb(entry["size_kb"]), _kb(entry.get("size_diff_kb"), sign=True),
+                str(entry["count"]), f"{entry['count_diff']:+d}" if "count_diff" in entry else "",
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if "stack" in entry:
+                    item.setToolTip("\n".join(entry["stack"]))
+                self.sites_table.setItem(row, column, item)
+        self.show_objects(summary["bot"])
+
+    def show_objects(self, bot):
+        rows = []
+        if bot is not None:
+            rows += [
+                ("Bot", "Server configs", bot["server_configs"]),
+                ("Bot", "Cached Discord messages", bot["cached_messages"]),
+                ("Bot", "Paginated replies in memory", bot["page_store"]["memory_entries"]),
+                ("Bot", "Paginated reply characters in memory", bot["page_store"]["memory_chars"]),
+                ("Bot", "Running generations", bot["active_generations"]),
+            ]
+        if self.object_counts is not None:
+            rows += [("Bot", f"{name} objects", count) for name, count in self.object_counts["watched"].items()]
+            rows += [("Bot", f"{name} objects (most common)", count) for name, count in self.object_counts["top"][:5]]
+        for name, widget in (("System Log", self.main_window.system_log_output), ("Bot Log", self.main_window.bot_log_output)):
+            document = widget.document()
+            rows.append(("GUI", f"{name} lines", document.blockCount()))
+            rows.append(("GUI", f"{name} characters", document.characterCount()))
+        self.objects_table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                self.objects_table.setItem(row, column, QTableWidgetItem(str(value)))
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def toggle_tracing(self):
+        enabled = self.tracing_btn.text() == "Start Tracing"
+        def done(result):
+            if result is not None:
+                self.status_label.setText("Tracing started; take a baseline snapshot." if enabled else "Tracing stopped.")
+                self.refresh()
+        self.main_window.bot_request("memory_tracing", done, enabled=enabled)
+
+    def snapshot(self, baseline):
+        def done(result):
+            if result is not None:
+                self.status_label.setText(f"{'Baseline' if baseline else 'Snapshot'} taken: {result['size_mb']:.1f} MB traced.")
+                self.refresh()
+        self.status_label.setText("Taking a snapshot...")
+        self.main_window.bot_request("memory_snapshot", done, timeout=30.0, baseline=baseline)
+
+    def count_objects(self):
+        self.status_label.setText("Counting objects...")
+        self.main_window.bot_request("memory", self.on_objects_counted, timeout=30.0, limit=0, objects=True)
+
+    def on_objects_counted(self, result):
+        if result is not None:
+            self.object_counts = result["objects"]
+            self.status_label.setText(f"Counted {self.object_counts['total']} objects in the bot process.")
+            self.refresh()
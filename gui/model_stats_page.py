@@ -0,0 +1,180 @@
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
+    QListWidget, QListWidgetItem, QSpinBox
+)
+from PySide6.QtCore import Qt, QTimer
+import time
+
+COLUMNS = [
+    "Model", "Runs", "Tokens",
+    "Tok/s p50", "Tok/s p95",
+    "Prompt tok/s p50",
+    "Load p50 (s)", "Load p95 (s)",
+    "Latency p50 (s)", "Latency p95 (s)", "Latency p99 (s)",
+]
+
+BENCH_COLUMNS = [
+    "When", "Model", "Prompts", "Cold Load", "Cold TTFT", "TTFT", "Tok/s", "Prompt tok/s", "Memory", "Errors",
+]
+
+def _fmt(value, unit=""):
+    return "" if value is None else f"{value:.1f}{unit}"
+
+def _number_item(value):
+    """A cell that sorts by value; text cells would sort "9.5" after "10.2"."""
+    item = QTableWidgetItem()
+    if value is not None:
+        item.setData(Qt.DisplayRole, round(value, 1) if isinstance(value, float) else value)
+    return item
+
+class ModelStatsPage(QWidget):
+    """
+    GUI page comparing models by measured throughput and latency on this machine.
+    Stats come from the bot process (see model_stats.py).
+    """
+
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+        self.refreshing = False  # A request is on its way; timer ticks skip until it is answered
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        layout.addWidget(QLabel("Measured per model from Ollama's own timings (p50/p95/p99 over all generations):"))
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSortingEnabled(True)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        self.status_label = QLabel("")
+        buttons.addWidget(self.status_label, 1)
+        self.refresh_btn = QPushButton("Refresh")
+        self.refresh_btn.clicked.connect(self.refresh)
+        buttons.addWidget(self.refresh_btn)
+        self.reset_btn = QPushButton("Reset Stats")
+        self.reset_btn.clicked.connect(self.reset)
+        buttons.addWidget(self.reset_btn)
+        layout.addLayout(buttons)
+
+        # --- Benchmark: run a fixed prompt set against selected models ---
+        layout.addWidget(QLabel("Benchmark (unloads each model first; select models, none = all):"))
+        bench_row = QHBoxLayout()
+        self.bench_models = QListWidget()
+        self.bench_models.setSelectionMode(QListWidget.MultiSelection)
+        self.bench_models.setMaximumHeight(100)
+        bench_row.addWidget(self.bench_models, 2)
+        bench_controls = QVBoxLayout()
+        bench_controls.addWidget(QLabel("Replay journal prompts:"))
+        self.bench_replay = QSpinBox()
+        self.bench_replay.setRange(0, 50)
+        self.bench_replay.setSpecialValueText("Standard set")
+        bench_controls.addWidget(self.bench_replay)
+        self.bench_btn = QPushButton("Run Benchmark")
+        self.bench_btn.clicked.connect(self.run_benchmark)
+        bench_controls.addWidget(self.bench_btn)
+        bench_row.addLayout(bench_controls, 1)
+        layout.addLayout(bench_row)
+        self.bench_table = QTableWidget(0, len(BENCH_COLUMNS))
+        self.bench_table.setHorizontalHeaderLabels(BENCH_COLUMNS)
+        self.bench_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.bench_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        layout.addWidget(self.bench_table)
+
+        # Only poll the bot while this tab is showing
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(5000)
+
+    def refresh(self):
+        if not self.isVisible() or self.refreshing:
+            return
+        self.refreshing = True
+        self.main_window.bot_request("model_stats", self.show_stats, timeout=2.0, quiet=True)
+
+    def show_stats(self, stats):
+        self.refreshing = False
+        if stats is None:
+            self.status_label.setText("Bot is not running.")
+            return
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(stats))
+        for row, (model, entry) in enumerate(sorted(stats.items())):
+            tps = entry["tokens_per_second"]
+            prompt_tps = entry["prompt_tokens_per_second"]
+            load = entry["load_seconds"]
+            latency = entry["latency_seconds"]
+            values = [
+                entry["generations"], entry["tokens"],
+                tps["p50"], tps["p95"],
+                prompt_tps["p50"],
+                load["p50"], load["p95"],
+                latency["p50"], latency["p95"], latency["p99"],
+            ]
+            self.table.setItem(row, 0, QTableWidgetItem(model))
+            for column, value in enumerate(values, start=1):
+                self.table.setItem(row, column, _number_item(value))
+        self.table.setSortingEnabled(True)
+        self.status_label.setText(f"{len(stats)} models")
+        self.refresh_benchmarks()
+
+    def refresh_benchmarks(self):
+        if not self.bench_models.count():
+            self.main_window.bot_request("models", self.show_models, timeout=5.0, quiet=True)
+        self.main_window.bot_request("bench_results", self.show_benchmarks, timeout=2.0, quiet=True, limit=50)
+
+    def show_models(self, models):
+        if self.bench_models.count():
+            return  # Filled in by an earlier answer
+        for model in (models or {}).get("models", []):
+            self.bench_models.addItem(QListWidgetItem(model))
+
+    def show_benchmarks(self, bench):
+        if bench is None:
+            return
+        self.bench_btn.setEnabled(not bench["running"])
+        self.bench_btn.setText("Benchmark running..." if bench["running"] else "Run Benchmark")
+        results = list(reversed(bench["results"]))  # Newest first
+        self.bench_table.setRowCount(len(results))
+        for row, result in enumerate(results):
+            memory = result.get("model_memory_mb") or result.get("memory_delta_mb")
+            values = [
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(result["timestamp"])),
+                result["model"],
+                f"{result['prompts']} ({result['prompt_set']})",
+                _fmt(result["cold_load_seconds"], "s"),
+                _fmt(result["cold_ttft_seconds"], "s"),
+                _fmt(result["ttft_seconds"], "s"),
+                _fmt(result["tokens_per_second"]),
+                _fmt(result["prompt_tokens_per_second"]),
+                _fmt(memory, " MB"),
+                str(len(result["errors"])),
+            ]
+            for column, value in enumerate(values):
+                self.bench_table.setItem(row, column, QTableWidgetItem(value))
+
+    def run_benchmark(self):
+        models = [item.text() for item in self.bench_models.selectedItems()] or None
+        self.bench_btn.setEnabled(False)  # Until bench_results says whether it is running
+        self.main_window.bot_request("bench", self.on_benchmark_started, models=models, replay=self.bench_replay.value())
+
+    def on_benchmark_started(self, started):
+        if started is None:
+            self.bench_btn.setEnabled(True)
+            return
+        self.status_label.setText(f"Benchmarking {len(started['models'])} models...")
+        self.refresh_benchmarks()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def reset(self):
+        self.main_window.bot_request("reset_model_stats", self.on_reset)
+
+    def on_reset(self, result):
+        if result is not None:
+            self.refresh()
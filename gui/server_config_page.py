@@ -1,13 +1,11 @@
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QLabel, QComboBox, QSpinBox, QTextEdit, QPushButton, QTabWidget, QListWidget, QListWidgetItem, QHBoxLayout
+    QWidget, QVBoxLayout, QLabel, QComboBox, QSpinBox, QDoubleSpinBox, QTextEdit, QPushButton, QTabWidget, QListWidget, QListWidgetItem, QHBoxLayout
 )
 from PySide6.QtCore import QTimer, Qt
 import os
 import json
 import logging
 
-from utils import load_config, save_config
-from bot_core import bot
 from .animated_checkbox import AnimatedCheckBox
 
 class ServerConfigPage(QWidget):
@@ -18,6 +16,7 @@ class ServerConfigPage(QWidget):
     def __init__(self, main_window):
         super().__init__()
         self.main_window = main_window
+        self._roles = []  # Role names of the selected server, from the bot process
         main_layout = QVBoxLayout()
         self.setLayout(main_layout)
 
@@ -80,6 +79,43 @@ class ServerConfigPage(QWidget):
         pag_rand_row.addWidget(self.random_prompt_probability, 2)
         gui_layout.addLayout(pag_rand_row)
 
+        # Generation budget controls (passed to Ollama as options, plus time/length caps)
+        budget_row = QHBoxLayout()
+        budget_row.addWidget(QLabel("Max tokens:"))
+        self.num_predict = QSpinBox()
+        self.num_predict.setRange(0, 32768)
+        self.num_predict.setSpecialValueText("Model default")
+        budget_row.addWidget(self.num_predict, 1)
+        budget_row.addWidget(QLabel("Context size:"))
+        self.num_ctx = QSpinBox()
+        self.num_ctx.setRange(0, 131072)
+        self.num_ctx.setSingleStep(1024)
+        self.num_ctx.setSpecialValueText("Model default")
+        budget_row.addWidget(self.num_ctx, 1)
+        budget_row.addWidget(QLabel("Temperature:"))
+        self.temperature = QDoubleSpinBox()
+        self.temperature.setRange(-0.1, 2.0)  # The minimum stands for "model default"
+        self.temperature.setSingleStep(0.1)
+        self.temperature.setDecimals(2)
+        self.temperature.setSpecialValueText("Model default")
+        budget_row.addWidget(self.temperature, 1)
+        budget_row.addWidget(QLabel("Time limit (s):"))
+        self.generation_timeout = QSpinBox()
+        self.generation_timeout.setRange(0, 3600)
+        self.generation_timeout.setSpecialValueText("No limit")
+        budget_row.addWidget(self.generation_timeout, 1)
+        budget_row.addWidget(QLabel("Max pages:"))
+        self.max_pages = QSpinBox()
+        self.max_pages.setRange(0, 50)
+        self.max_pages.setSpecialValueText("No limit")
+        budget_row.addWidget(self.max_pages, 1)
+        budget_row.addWidget(QLabel("Attach after (pages):"))
+        self.attachment_pages = QSpinBox()
+        self.attachment_pages.setRange(0, 50)
+        self.attachment_pages.setSpecialValueText("Never")
+        budget_row.addWidget(self.attachment_pages, 1)
+        gui_layout.addLayout(budget_row)
+
         self.save_btn = QPushButton("Save Config")
         save_btn_row = QHBoxLayout()
         save_btn_row.addStretch(2)
@@ -115,12 +151,8 @@ class ServerConfigPage(QWidget):
     def update_guilds(self):
         """Populate the guild selection box with connected servers."""
         try:
-            from bot_core import _bot_instance
-            bot = _bot_instance
-            if not bot:
-                return
             current_ids = [self.guild_select.itemData(i) for i in range(self.guild_select.count())]
-            new_guilds = [(guild.name, guild.id) for guild in getattr(bot, 'guilds', [])]
+            new_guilds = [(name, gid) for name, gid, shard_id in self.main_window._guilds]
             if len(current_ids) != len(new_guilds) or any(str(gid) not in [str(x[1]) for x in new_guilds] for gid in current_ids):
                 self.guild_select.blockSignals(True)
                 self.guild_select.clear()
@@ -135,37 +167,37 @@ class ServerConfigPage(QWidget):
         guild_id = self.guild_select.currentData()
         if guild_id is None:
             return
-        try:
-            from bot_core import _bot_instance
-            bot = _bot_instance
-            if not bot:
-                return
-            guild = next((g for g in getattr(bot, 'guilds', []) if g.id == guild_id), None)
-            if not guild:
-                return
-        except Exception as e:
-            logging.getLogger("silasblue").error(f"Failed to load config: {e}")
+        # Roles and config come from the bot process; show them once both have arrived
+        replies = {}
+        def arrived(key, value):
+            replies[key] = value
+            if len(replies) == 2:
+                self.show_config(guild_id, replies["roles"], replies["config"])
+        self.main_window.bot_request("guild_roles", lambda roles: arrived("roles", roles), guild_id=guild_id)
+        self.main_window.bot_request("get_config", lambda config: arrived("config", config), guild_id=guild_id)
+
+    def show_config(self, guild_id, roles, config):
+        if roles is None or config is None or self.guild_select.currentData() != guild_id:
             return
-        config = load_config(guild_id)
-        self.set_roles_list(self.reply_roles_list, guild, config.get("reply_roles", []))
-        self.set_roles_list(self.change_model_roles_list, guild, config.get("change_model_roles", []))
-        self.set_roles_list(self.change_permission_roles_list, guild, config.get("change_permission_roles", []))
+        self._roles = roles
+        self.set_roles_list(self.reply_roles_list, roles, config.get("reply_roles", []))
+        self.set_roles_list(self.change_model_roles_list, roles, config.get("change_model_roles", []))
+        self.set_roles_list(self.change_permission_roles_list, roles, config.get("change_permission_roles", []))
         self.pagination_enabled.setChecked(config.get("pagination_enabled", True))
         self.pagination_max_chars.setValue(config.get("pagination_max_chars", 2000))
         self.random_prompt_enabled.setChecked(config.get("random_prompt_enabled", False))
         self.random_prompt_probability.setCurrentText(f"{config.get('random_prompt_probability', 0)}%")
+        self.set_budget_widgets(config)
         self.raw_config.setPlainText(json.dumps(config, indent=2))
 
-    def set_roles_list(self, list_widget, guild, selected_roles):
+    def set_roles_list(self, list_widget, roles, selected_roles):
         # Block signals to prevent unwanted itemChanged events
         list_widget.blockSignals(True)
         list_widget.clear()
-        for role in reversed(guild.roles):
-            if role.is_default():
-                continue  # Skip @everyone for selection, handle separately if needed
-            item = QListWidgetItem(role.name)
+        for role in roles:  # Highest first, without @everyone (handled separately)
+            item = QListWidgetItem(role)
             item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
-            item.setCheckState(Qt.Checked if role.name in selected_roles else Qt.Unchecked)
+            item.setCheckState(Qt.Checked if role in selected_roles else Qt.Unchecked)
             list_widget.addItem(item)
         # Optionally add @everyone
         item = QListWidgetItem("@everyone")
@@ -194,10 +226,25 @@ class ServerConfigPage(QWidget):
             "pagination_enabled": self.pagination_enabled.isChecked(),
             "pagination_max_chars": self.pagination_max_chars.value(),
             "random_prompt_enabled": self.random_prompt_enabled.isChecked(),
-            "random_prompt_probability": int(self.random_prompt_probability.currentText().replace("%", ""))
+            "random_prompt_probability": int(self.random_prompt_probability.currentText().replace("%", "")),
+            "num_predict": self.num_predict.value(),
+            "num_ctx": self.num_ctx.value(),
+            "temperature": None if self.temperature.value() < 0 else round(self.temperature.value(), 2),
+            "generation_timeout": self.generation_timeout.value(),
+            "max_pages": self.max_pages.value(),
+            "attachment_pages": self.attachment_pages.value()
         }
         return config
 
+    def set_budget_widgets(self, config):
+        self.num_predict.setValue(config.get("num_predict") or 0)
+        self.num_ctx.setValue(config.get("num_ctx") or 0)
+        temperature = config.get("temperature")
+        self.temperature.setValue(-0.1 if temperature is None else float(temperature))
+        self.generation_timeout.setValue(config.get("generation_timeout") or 0)
+        self.max_pages.setValue(config.get("max_pages") or 0)
+        self.attachment_pages.setValue(config.get("attachment_pages") or 0)
+
     def on_tab_changed(self, idx):
         # 0 = GUI, 1 = Raw JSON
         if idx == 1:
@@ -216,24 +263,15 @@ class ServerConfigPage(QWidget):
         guild_id = self.guild_select.currentData()
         if guild_id is None:
             return
-        try:
-            from bot_core import _bot_instance
-            bot = _bot_instance
-            if not bot:
-                return
-            guild = next((g for g in getattr(bot, 'guilds', []) if g.id == guild_id), None)
-            if not guild:
-                return
-        except Exception as e:
-            logging.getLogger("silasblue").error(f"Failed to set widgets from config: {e}")
-            return
-        self.set_roles_list(self.reply_roles_list, guild, config.get("reply_roles", []))
-        self.set_roles_list(self.change_model_roles_list, guild, config.get("change_model_roles", []))
-        self.set_roles_list(self.change_permission_roles_list, guild, config.get("change_permission_roles", []))
+        roles = self._roles
+        self.set_roles_list(self.reply_roles_list, roles, config.get("reply_roles", []))
+        self.set_roles_list(self.change_model_roles_list, roles, config.get("change_model_roles", []))
+        self.set_roles_list(self.change_permission_roles_list, roles, config.get("change_permission_roles", []))
         self.pagination_enabled.setChecked(config.get("pagination_enabled", True))
         self.pagination_max_chars.setValue(config.get("pagination_max_chars", 2000))
         self.random_prompt_enabled.setChecked(config.get("random_prompt_enabled", False))
         self.random_prompt_probability.setCurrentText(f"{config.get('random_prompt_probability', 0)}%")
+        self.set_budget_widgets(config)
 
     def save_config(self):
         guild_id = self.guild_select.currentData()
@@ -247,7 +285,14 @@ class ServerConfigPage(QWidget):
                 config = json.loads(self.raw_config.toPlainText())
             except Exception:
                 return  # Invalid JSON, do not save
-        save_config(guild_id, config)
+        # The bot saves the file and applies the change immediately
+        self.save_btn.setEnabled(False)
+        self.main_window.bot_request("update_config", lambda config: self.on_saved(guild_id, config), guild_id=guild_id, changes=config)
+
+    def on_saved(self, guild_id, config):
+        self.save_btn.setEnabled(True)
+        if config is None:
+            return
         self.raw_config.setPlainText(json.dumps(config, indent=2))
         logging.getLogger("silasblue").info(f"Config for server {guild_id} saved via GUI.")
         self.show_feedback(self.save_btn, "Saved!")
@@ -265,7 +310,11 @@ class ServerConfigPage(QWidget):
         guild_id = self.guild_select.currentData()
         if guild_id is None:
             return
-        config = load_config(guild_id)
+        self.main_window.bot_request("get_config", lambda config: self.on_config_reloaded(guild_id, config), guild_id=guild_id)
+
+    def on_config_reloaded(self, guild_id, config):
+        if config is None or self.guild_select.currentData() != guild_id:
+            return
         # Only update widgets if not currently editing (i.e., not focused)
         if not self.raw_config.hasFocus():
             self.raw_config.setPlainText(json.dumps(config, indent=2))
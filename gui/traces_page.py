@@ -0,0 +1,97 @@
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QTableWidget, QTableWidgetItem, QHeaderView
+)
+from PySide6.QtCore import QTimer
+import time
+
+# Stages shown as columns, in the order they happen
+STAGE_COLUMNS = [
+    ("permissions", "Permissions"),
+    ("queue", "Queue"),
+    ("ollama.first_token", "First Token"),
+    ("ollama.load", "Model Load"),
+    ("ollama.prompt_eval", "Prompt Eval"),
+    ("ollama.eval", "Eval"),
+    ("discord.reply", "Discord Reply"),
+]
+
+class TracesPage(QWidget):
+    """
+    GUI page listing the slowest recent requests with a per-stage time breakdown.
+    Traces come from the bot process (see tracing.py).
+    """
+
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+        self.refreshing = False  # A request is on its way; timer ticks skip until it is answered
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("Show:"))
+        self.order_select = QComboBox()
+        self.order_select.addItem("Slowest requests", userData="slowest")
+        self.order_select.addItem("Most recent requests", userData="recent")
+        self.order_select.currentIndexChanged.connect(self.refresh)
+        controls.addWidget(self.order_select)
+        controls.addStretch(1)
+        self.refresh_btn = QPushButton("Refresh")
+        self.refresh_btn.clicked.connect(self.refresh)
+        controls.addWidget(self.refresh_btn)
+        self.export_btn = QPushButton("Export to JSONL")
+        self.export_btn.clicked.connect(self.export)
+        controls.addWidget(self.export_btn)
+        layout.addLayout(controls)
+
+        headers = ["Time", "Total", "Model", "Outcome"] + [label for _, label in STAGE_COLUMNS]
+        self.table = QTableWidget(0, len(headers))
+        self.table.setHorizontalHeaderLabels(headers)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        layout.addWidget(self.table)
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        # Only poll the bot while this tab is showing
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(5000)
+
+    def refresh(self):
+        if not self.isVisible() or self.refreshing:
+            return
+        self.refreshing = True
+        self.main_window.bot_request("traces", self.show_traces, timeout=2.0, quiet=True, limit=50, order=self.order_select.currentData())
+
+    def show_traces(self, traces):
+        self.refreshing = False
+        if traces is None:
+            self.status_label.setText("Bot is not running.")
+            return
+        self.table.setRowCount(len(traces))
+        for row, trace in enumerate(traces):
+            stages = {}
+            for span in trace["spans"]:
+                stages[span["name"]] = stages.get(span["name"], 0) + span["duration"]
+            values = [
+                time.strftime("%H:%M:%S", time.localtime(trace["started"])),
+                f"{trace['duration']:.2f}s",
+                trace["attrs"].get("model", ""),
+                trace["attrs"].get("outcome", ""),
+            ] + [f"{stages[name]:.2f}s" if name in stages else "" for name, _ in STAGE_COLUMNS]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+        self.status_label.setText(f"{len(traces)} requests")
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def export(self):
+        self.main_window.bot_request("export_traces", self.on_exported, timeout=5.0)
+
+    def on_exported(self, result):
+        if result is not None:
+            self.status_label.setText(f"Exported {result['count']} traces to {result['path']}")
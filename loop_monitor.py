@@ -0,0 +1,217 @@
+"""
+Event-loop watchdog for the bot.
+A heartbeat task measures how late the loop wakes it up (loop lag). A sampling thread
+watches the heartbeat and, while it is overdue, records the loop thread's stack, so a
+synchronous call that blocks the loop shows up with the code that made it. Blocks are
+grouped by call site ("offenders"), logged, and shown in the GUI's Event Loop tab.
+Optionally, asyncio's debug mode also reports every slow callback by name.
+"""
+
+import os
+import re
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import Counter as _StackCounter
+
+from metrics import EVENT_LOOP_LAG, EVENT_LOOP_BLOCKS
+from model_stats import LogHistogram
+from utils import load_app_config
+
+logger = logging.getLogger("silasblue")
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+MAX_OFFENDERS = 100
+STACK_DEPTH = 15
+
+
+def _site(stack):
+    """The innermost frame in the bot's own code, e.g. "bot_core.py:912 in models_command"."""
+    for frame in reversed(stack):
+        path = os.path.abspath(frame.filename)
+        if path.startswith(REPO_DIR) and "site-packages" not in path:
+            return f"{os.path.relpath(path, REPO_DIR)}:{frame.lineno} in {frame.name}"
+    if stack:
+        frame = stack[-1]
+        return f"{os.path.basename(frame.filename)}:{frame.lineno} in {frame.name}"
+    return "unknown"
+
+
+def _callback_site(handle):
+    """Short, stable name for an asyncio handle repr: the coroutine or function it runs."""
+    match = re.search(r"coro=<([\w.<>]+)\(", handle) or re.search(r"Handle ([\w.<>]+)\(", handle)
+    return f"callback {match.group(1)}" if match else f"callback {handle[:80]}"
+
+
+class _SlowCallbackHandler(logging.Handler):
+    """Turns asyncio debug mode's "Executing <Handle ...> took 0.300 seconds" warnings into offenders."""
+
+    def __init__(self, monitor):
+        super().__init__(logging.WARNING)
+        self.monitor = monitor
+
+    def emit(self, record):
+        if record.thread != self.monitor._thread_id:
+            return  # Another bot instance's loop (the "asyncio" logger is shared during a restart)
+        if isinstance(record.msg, str) and record.msg.startswith("Executing") and len(record.args or ()) == 2:
+            handle, duration = record.args
+            self.monitor._record(_callback_site(str(handle)), duration, str(handle), kind="callback")
+
+
+class LoopMonitor:
+    """
+    Watches one event loop. `interval` is the heartbeat period; a heartbeat more than
+    `threshold` seconds late counts as a block and its stack is sampled every
+    `sample_interval` seconds until the loop is free again.
+    """
+
+    def __init__(self, loop, interval=0.1, threshold=0.25, sample_interval=0.02, asyncio_debug=False):
+        self.loop = loop
+        self.interval = interval
+        self.threshold = threshold
+        self.sample_interval = sample_interval
+        self.asyncio_debug = asyncio_debug
+        self.lag = LogHistogram(low=0.0001, high=3600.0)
+        self.blocks = 0
+        self.offenders = {}  # site -> entry, see _record()
+        self.started = None
+        self._lock = threading.Lock()
+        self._thread_id = None
+        self._last_beat = None
+        self._samples = None  # Stacks seen during the current block
+        self._stop = threading.Event()
+        self._task = None
+        self._debug_handler = None
+
+    def start(self):
+        """Must be called on the monitored loop."""
+        self._thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self.started = time.time()
+        self._task = self.loop.create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name="loop-monitor", daemon=True).start()
+        if self.asyncio_debug:
+            self.loop.set_debug(True)
+            self.loop.slow_callback_duration = self.threshold
+            self._debug_handler = _SlowCallbackHandler(self)
+            logging.getLogger("asyncio").addHandler(self._debug_handler)
+        logger.info(f"Event loop monitor started (blocks over {self.threshold * 1000:.0f} ms are reported).")
+
+    def stop(self):
+        """Safe to call from any thread, and after the loop has closed."""
+        self._stop.set()
+        task, self._task = self._task, None
+        debug_handler, self._debug_handler = self._debug_handler, None
+        if debug_handler is not None:
+            logging.getLogger("asyncio").removeHandler(debug_handler)
+        if self.loop.is_closed():
+            return
+        try:
+            if task is not None:
+                self.loop.call_soon_threadsafe(task.cancel)
+            if debug_handler is not None:
+                self.loop.call_soon_threadsafe(self.loop.set_debug, False)
+        except RuntimeError:
+            pass  # The loop closed in the meantime
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            EVENT_LOOP_LAG.observe(lag)
+            with self._lock:
+                self.lag.add(lag)
+                self._last_beat = now
+                samples, self._samples = self._samples, None
+            if samples:
+                stacks, counts = samples
+                stack = stacks[counts.most_common(1)[0][0]]  # Where the loop spent most of the block
+                self._record(_site(stack), lag, "".join(traceback.format_list(stack)))
+
+    def _watch(self):
+        """Sampling thread: grabs the loop thread's stack while the heartbeat is overdue."""
+        while not self._stop.wait(self.sample_interval):
+            with self._lock:
+                beat = self._last_beat
+            if time.monotonic() - beat - self.interval < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)[-STACK_DEPTH:]
+            del frame
+            key = tuple((entry.filename, entry.lineno, entry.name) for entry in stack)
+            with self._lock:
+                if self._last_beat != beat:
+                    continue  # The loop caught up while we sampled; the stack is from after the block
+                if self._samples is None:
+                    self._samples = ({}, _StackCounter())
+                stacks, counts = self._samples
+                stacks.setdefault(key, stack)
+                counts[key] += 1
+
+    def _record(self, site, duration, details, kind="blocking"):
+        """`details` is the formatted stack, or the handle for slow callbacks."""
+        with self._lock:
+            if kind == "blocking":  # Slow callbacks were already counted by the sampling thread
+                EVENT_LOOP_BLOCKS.inc()
+                self.blocks += 1
+            entry = self.offenders.get(site)
+            if entry is None:
+                if len(self.offenders) >= MAX_OFFENDERS:
+                    # Make room by forgetting the offender that has cost the least
+                    del self.offenders[min(self.offenders, key=lambda key: self.offenders[key]["total_seconds"])]
+                entry = self.offenders[site] = {
+                    "site": site, "kind": kind, "count": 0, "total_seconds": 0.0, "max_seconds": 0.0,
+                    "last_seen": None, "stack": details,
+                }
+            entry["count"] += 1
+            entry["total_seconds"] += duration
+            entry["last_seen"] = time.time()
+            if duration >= entry["max_seconds"]:
+                entry["max_seconds"] = duration
+                entry["stack"] = details  # Keep the stack of the worst block
+        logger.warning(f"Event loop blocked for {duration:.2f}s at {site}:\n{details.rstrip()}")
+
+    def summary(self):
+        with self._lock:
+            offenders = sorted(self.offenders.values(), key=lambda entry: entry["total_seconds"], reverse=True)
+            return {
+                "started": self.started,
+                "interval": self.interval,
+                "threshold": self.threshold,
+                "asyncio_debug": self.asyncio_debug,
+                "lag": self.lag.summary(),
+                "blocks": self.blocks,
+                "offenders": [dict(entry) for entry in offenders],
+            }
+
+    def reset(self):
+        with self._lock:
+            self.lag = LogHistogram(low=0.0001, high=3600.0)
+            self.blocks = 0
+            self.offenders = {}
+            self.started = time.time()
+
+
+def start_loop_monitor(loop):
+    """
+    Starts a watchdog for `loop` and returns it, or None if loop_monitor_enabled is false
+    in app_config.json. Each bot instance keeps its own (bot.loop_monitor) and stops it
+    when it shuts down, so an instance draining for a restart does not touch the new one's.
+    """
+    app_config = load_app_config()
+    if not app_config.get("loop_monitor_enabled", True):
+        return None
+    monitor = LoopMonitor(
+        loop,
+        threshold=app_config.get("loop_monitor_threshold", 0.25),
+        asyncio_debug=app_config.get("loop_monitor_asyncio_debug", False),
+    )
+    monitor.start()
+    return monitor
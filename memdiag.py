@@ -0,0 +1,209 @@
+"""
+Memory diagnostics for long-running bots.
+tracemalloc snapshots, taken on demand or on a schedule, are compared with a baseline
+snapshot to show which allocation sites keep growing. Live objects of the types that
+usually leak (views, messages, sessions, ...) are counted, and RSS is reported alongside.
+tracemalloc slows allocations down, so tracing only runs when it is switched on.
+"""
+
+import gc
+import os
+import time
+import logging
+import threading
+import tracemalloc
+from collections import Counter, deque
+
+import psutil
+
+from utils import load_app_config
+
+logger = logging.getLogger("silasblue")
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+MAX_SNAPSHOTS = 5
+GROUP_BY = ("lineno", "filename", "traceback")
+
+# Type names worth watching for leaks: reply views, Discord messages, HTTP sessions, prompts
+KEY_TYPES = (
+    "PaginatedView", "StopGenerationView", "View", "Message", "ClientSession", "Session",
+    "Generation", "PromptItem", "Trace", "Task", "Future",
+)
+
+# Allocations by the import machinery and by tracemalloc itself are noise
+_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def _mb(size):
+    return size / (1024 * 1024)
+
+def _where(frame):
+    filename = frame.filename
+    if filename.startswith(REPO_DIR):
+        filename = os.path.relpath(filename, REPO_DIR)
+    return f"{filename}:{frame.lineno}"
+
+def _stat_entry(stat, group_by):
+    entry = {
+        "site": _where(stat.traceback[0]) if group_by != "filename" else _where(stat.traceback[0]).rsplit(":", 1)[0],
+        "size_kb": stat.size / 1024,
+        "count": stat.count,
+    }
+    if hasattr(stat, "size_diff"):
+        entry["size_diff_kb"] = stat.size_diff / 1024
+        entry["count_diff"] = stat.count_diff
+    if group_by == "traceback":
+        entry["stack"] = [_where(frame) for frame in stat.traceback]
+    return entry
+
+def rss_mb():
+    return _mb(psutil.Process().memory_info().rss)
+
+def object_counts(types=KEY_TYPES, limit=15):
+    """Live objects tracked by the garbage collector: the watched types, and the most common types."""
+    counts = Counter(type(obj).__name__ for obj in gc.get_objects())
+    return {
+        "watched": {name: counts.get(name, 0) for name in types},
+        "top": counts.most_common(limit),
+        "total": sum(counts.values()),
+    }
+
+
+class MemoryDiagnostics:
+    """tracemalloc snapshots of this process, the baseline they are compared with, and the schedule."""
+
+    def __init__(self):
+        self.snapshots = deque(maxlen=MAX_SNAPSHOTS)  # (time, label, snapshot, size), newest last
+        self.baseline = None
+        self.interval = 0
+        self._lock = threading.Lock()
+        self._stop = None
+
+    @staticmethod
+    def is_tracing():
+        return tracemalloc.is_tracing()
+
+    def start_tracing(self, frames=10):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(int(frames))
+            logger.info(f"Memory tracing started ({frames} frames per allocation).")
+
+    def stop_tracing(self):
+        self.stop_schedule()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("Memory tracing stopped.")
+        with self._lock:
+            self.snapshots.clear()
+            self.baseline = None
+
+    def take_snapshot(self, label="manual", baseline=False):
+        """Takes a snapshot (the first one becomes the baseline). Tracing must be on."""
+        snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+        size = sum(stat.size for stat in snapshot.statistics("filename"))
+        entry = (time.time(), label, snapshot, size)
+        with self._lock:
+            self.snapshots.append(entry)
+            if baseline or self.baseline is None:
+                self.baseline = entry
+        return self._describe(entry)
+
+    @staticmethod
+    def _describe(entry):
+        taken, label, snapshot, size = entry
+        return {"time": taken, "label": label, "size_mb": _mb(size)}
+
+    def top(self, limit=15, group_by="lineno"):
+        """Largest allocation sites in the latest snapshot."""
+        with self._lock:
+            latest = self.snapshots[-1] if self.snapshots else None
+        if latest is None:
+            return []
+        return [_stat_entry(stat, group_by) for stat in latest[2].statistics(group_by)[:limit]]
+
+    def diff(self, limit=15, group_by="lineno"):
+        """Allocation sites that grew most between the baseline and the latest snapshot."""
+        with self._lock:
+            latest = self.snapshots[-1] if self.snapshots else None
+            baseline = self.baseline
+        if latest is None or baseline is None or latest is baseline:
+            return []
+        stats = latest[2].compare_to(baseline[2], group_by)
+        stats.sort(key=lambda stat: stat.size_diff, reverse=True)
+        return [_stat_entry(stat, group_by) for stat in stats[:limit]]
+
+    def summary(self, limit=15, group_by="lineno"):
+        if group_by not in GROUP_BY:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_BY)}")
+        traced, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        with self._lock:
+            snapshots = [self._describe(entry) for entry in self.snapshots]
+            baseline = self._describe(self.baseline) if self.baseline else None
+        return {
+            "rss_mb": rss_mb(),
+            "tracing": tracemalloc.is_tracing(),
+            "traced_mb": _mb(traced),
+            "peak_traced_mb": _mb(peak),
+            "snapshot_interval": self.interval,
+            "snapshots": snapshots,
+            "baseline": baseline,
+            "top": self.top(limit, group_by),
+            "growth": self.diff(limit, group_by),
+        }
+
+    def start_schedule(self, interval, frames=10):
+        """
+        Takes a snapshot every `interval` seconds and logs the sites that grew most since the
+        baseline. Returns the schedule, for stop_schedule(schedule).
+        """
+        self.stop_schedule()
+        self.start_tracing(frames)
+        self.interval = interval
+        if self.baseline is None:
+            self.take_snapshot("baseline", baseline=True)
+        stop = self._stop = threading.Event()
+        def run():
+            while not stop.wait(interval):
+                if not tracemalloc.is_tracing():
+                    break  # Tracing was switched off
+                self.take_snapshot("scheduled")
+                growth = self.diff(limit=5)
+                if growth:
+                    sites = "; ".join(f"{entry['site']} {entry['size_diff_kb']:+.0f} KB" for entry in growth)
+                    logger.info(f"Memory: RSS {rss_mb():.0f} MB; growth since baseline: {sites}")
+        threading.Thread(target=run, name="memdiag", daemon=True).start()
+        return stop
+
+    def stop_schedule(self, schedule=None):
+        """Stops the schedule; with `schedule`, only if it is still the one start_schedule() returned."""
+        if schedule is not None and schedule is not self._stop:
+            return  # Replaced since, e.g. by the new bot instance after a graceful restart
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
+        self.interval = 0
+
+
+_diagnostics = MemoryDiagnostics()
+
+def get_memory_diagnostics():
+    return _diagnostics
+
+def start_memdiag():
+    """
+    Applies memdiag_* settings from app_config.json; called when a bot instance starts.
+    Returns the snapshot schedule it started (or None), which that instance stops on shutdown.
+    """
+    app_config = load_app_config()
+    frames = app_config.get("memdiag_tracemalloc_frames", 10)
+    interval = app_config.get("memdiag_snapshot_interval", 0)
+    if interval:
+        return _diagnostics.start_schedule(interval, frames)
+    if app_config.get("memdiag_tracemalloc", False):
+        _diagnostics.start_tracing(frames)
+    return None
@@ -0,0 +1,249 @@
+"""
+Metrics registry for Silas Blue.
+Counters, gauges and histograms with optional labels, rendered in the Prometheus text
+format by the admin API's /metrics endpoint. Updates are a dict lookup and an add under
+a per-metric lock, so they are cheap enough for the message and token hot paths.
+"""
+
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import ContextDecorator
+
+logger = logging.getLogger("silasblue")
+
+# Seconds; covers fast Discord calls up to long generations
+INF_LABEL = 'le="+Inf"'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class _Timer(ContextDecorator):
+    """Observes elapsed seconds; works as a context manager or a function decorator."""
+
+    def __init__(self, observe):
+        self._observe = observe
+
+    def _recreate_cm(self):
+        return _Timer(self._observe)  # A fresh start time per decorated call
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._observe(time.perf_counter() - self._start)
+        return False
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+
+    def labels(self, *values):
+        """Returns the child for these label values (created on first use)."""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _label_text(self, values, extra=None):
+        pairs = [f'{k}="{_escape(str(v))}"' for k, v in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = list(self._children.items())
+        for values, child in children:
+            lines.extend(child.render(self, values))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def render(self, metric, values):
+        return [f"{metric.name}{metric._label_text(values)} {_number(self.value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class _GaugeChild(_CounterChild):
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class Gauge(_Metric):
+    """A value that goes up and down. set_function() makes it read a callable at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._function = None
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+    def set_function(self, function):
+        self._function = function
+
+    def render(self):
+        if self._function is not None:
+            try:
+                self.set(self._function())
+            except Exception as e:
+                # Keep the last value, but make a broken source visible
+                logger.warning(f"Could not read gauge {self.name}: {e}")
+        return super().render()
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """Context manager that observes the elapsed seconds."""
+        return _Timer(self.observe)
+
+    def render(self, metric, values):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            le = 'le="%s"' % _number(bound)
+            lines.append(f"{metric.name}_bucket{metric._label_text(values, le)} {cumulative}")
+        lines.append(f"{metric.name}_bucket{metric._label_text(values, INF_LABEL)} {count}")
+        lines.append(f"{metric.name}_sum{metric._label_text(values)} {_number(total)}")
+        lines.append(f"{metric.name}_count{metric._label_text(values)} {count}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        if not metric.labelnames:
+            metric.labels()  # Unlabelled metrics show up as 0 before their first update
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+def counter(name, help_text, labelnames=()):
+    return REGISTRY.register(Counter(name, help_text, labelnames))
+
+def gauge(name, help_text, labelnames=()):
+    return REGISTRY.register(Gauge(name, help_text, labelnames))
+
+def histogram(name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, help_text, labelnames, buckets))
+
+
+# --- Metrics used across the bot ---
+MESSAGES_SEEN = counter("silasblue_messages_seen_total", "Messages received from Discord")
+MESSAGES_HANDLED = counter("silasblue_messages_handled_total", "Messages the bot acted on", ["kind"])
+QUEUE_DEPTH = gauge("silasblue_prompt_queue_depth", "Prompts waiting for a generation slot")
+PROMPTS_RUNNING = gauge("silasblue_prompts_running", "Prompts currently generating")
+TIME_TO_FIRST_TOKEN = histogram("silasblue_time_to_first_token_seconds", "Time from starting a generation to its first token", ["model"])
+GENERATION_TIME = histogram("silasblue_generation_seconds", "Total time to generate a reply", ["model"])
+TOKENS_PER_SECOND = histogram(
+    "silasblue_tokens_per_second", "Generation speed reported by Ollama", ["model"],
+    buckets=(1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 500)
+)
+TOKENS_GENERATED = counter("silasblue_tokens_generated_total", "Tokens generated by Ollama", ["model"])
+DISCORD_REQUEST_TIME = histogram("silasblue_discord_request_seconds", "Latency of Discord API calls", ["op"])
+DISCORD_RATE_LIMITS = counter("silasblue_discord_rate_limits_total", "Discord rate limit hits")
+CONFIG_LOAD_TIME = histogram("silasblue_config_load_seconds", "Time to load a server config")
+CONFIG_SAVE_TIME = histogram("silasblue_config_save_seconds", "Time to save a server config")
+OLLAMA_ERRORS = counter("silasblue_ollama_errors_total", "Errors from Ollama requests", ["type"])
+EVENT_LOOP_LAG = histogram(
+    "silasblue_event_loop_lag_seconds", "How late the bot's event loop ran a timer",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+EVENT_LOOP_BLOCKS = counter("silasblue_event_loop_blocks_total", "Times the event loop was blocked past the loop monitor threshold")
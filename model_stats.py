@@ -0,0 +1,217 @@
+"""
+Per-model performance statistics for Silas Blue.
+Every finished generation reports Ollama's counters (eval_count, eval_duration,
+prompt_eval_count, prompt_eval_duration, load_duration, total_duration) on its final
+chunk. They are folded into fixed-size log-scale histograms per model, so memory stays
+constant and p50/p95/p99 can be read at any time. Stats are saved to
+config/model_stats.json when the bot stops and loaded again on start. Shard group
+processes keep one file each (see use_stats_file) and their stats are merged for display.
+"""
+
+import os
+import json
+import math
+import logging
+import threading
+
+logger = logging.getLogger("silasblue")
+
+
+class LogHistogram:
+    """
+    Fixed-size histogram with buckets spaced by `ratio` between `low` and `high`.
+    Quantiles are accurate to within one bucket (about 5% with the default ratio).
+    """
+
+    def __init__(self, low=0.001, high=100000.0, ratio=1.1):
+        self.low = low
+        self.ratio = ratio
+        self._log_ratio = math.log(ratio)
+        self.size = int(math.ceil(math.log(high / low) / self._log_ratio)) + 2  # Plus under/overflow
+        self.counts = [0] * self.size
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        if value < self.low:
+            index = 0
+        else:
+            index = min(int(math.log(value / self.low) / self._log_ratio) + 1, self.size - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                if index == 0:
+                    return self.min
+                # Geometric middle of the bucket, clamped to what was actually seen
+                value = self.low * self.ratio ** (index - 0.5)
+                return max(self.min, min(self.max, value))
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "min": self.min,
+            "max": self.max,
+        }
+
+    def to_dict(self):
+        return {"counts": self.counts, "count": self.count, "total": self.total, "min": self.min, "max": self.max}
+
+    def merge(self, data):
+        """Adds the samples of another histogram's to_dict() (or a saved one)."""
+        if len(data.get("counts", [])) != self.size:
+            return  # Saved with different bucket settings
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, data["counts"])]
+        self.count += data["count"]
+        self.total += data["total"]
+        if data["min"] is not None:
+            self.min = data["min"] if self.min is None else min(self.min, data["min"])
+        if data["max"] is not None:
+            self.max = data["max"] if self.max is None else max(self.max, data["max"])
+
+
+# Statistic name -> how it is derived from a final chunk (durations are in nanoseconds)
+STATISTICS = ("tokens_per_second", "prompt_tokens_per_second", "load_seconds", "latency_seconds")
+
+def _measurements(chunk):
+    values = {}
+    if chunk.get("eval_duration"):
+        values["tokens_per_second"] = chunk.get("eval_count", 0) / (chunk["eval_duration"] / 1e9)
+    if chunk.get("prompt_eval_duration"):
+        values["prompt_tokens_per_second"] = chunk.get("prompt_eval_count", 0) / (chunk["prompt_eval_duration"] / 1e9)
+    if "load_duration" in chunk:
+        values["load_seconds"] = chunk["load_duration"] / 1e9
+    if chunk.get("total_duration"):
+        values["latency_seconds"] = chunk["total_duration"] / 1e9
+    return values
+
+
+class ModelStats:
+    """Throughput and latency histograms per model. Thread-safe."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._models = {}  # model -> {"generations": n, "tokens": n, statistic: LogHistogram}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._load()
+
+    def _entry(self, model):
+        entry = self._models.get(model)
+        if entry is None:
+            entry = {"generations": 0, "tokens": 0}
+            for name in STATISTICS:
+                entry[name] = LogHistogram()
+            self._models[model] = entry
+        return entry
+
+    def record(self, model, chunk):
+        """Adds the counters from a generation's final chunk."""
+        values = _measurements(chunk)
+        with self._lock:
+            entry = self._entry(model)
+            entry["generations"] += 1
+            entry["tokens"] += chunk.get("eval_count", 0)
+            for name, value in values.items():
+                entry[name].add(value)
+
+    def summary(self):
+        """{model: {"generations", "tokens", statistic: {count, mean, p50, p95, p99, min, max}}}"""
+        with self._lock:
+            return {
+                model: {
+                    "generations": entry["generations"],
+                    "tokens": entry["tokens"],
+                    **{name: entry[name].summary() for name in STATISTICS},
+                }
+                for model, entry in self._models.items()
+            }
+
+    def reset(self, model=None):
+        with self._lock:
+            if model is None:
+                self._models.clear()
+            else:
+                self._models.pop(model, None)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                model: {
+                    "generations": entry["generations"],
+                    "tokens": entry["tokens"],
+                    **{name: entry[name].to_dict() for name in STATISTICS},
+                }
+                for model, entry in self._models.items()
+            }
+
+    def merge(self, data):
+        """Adds stats from another ModelStats' to_dict(), e.g. another shard group's."""
+        with self._lock:
+            for model, saved in data.items():
+                entry = self._entry(model)
+                entry["generations"] += saved.get("generations", 0)
+                entry["tokens"] += saved.get("tokens", 0)
+                for name in STATISTICS:
+                    if name in saved:
+                        entry[name].merge(saved[name])
+
+    def flush(self):
+        if not self.path:
+            return
+        data = self.to_dict()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(data, f)
+        except OSError as e:
+            logger.warning(f"Could not save model stats: {e}")
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load model stats: {e}")
+            return
+        self.merge(data)
+
+
+_MODEL_STATS = None
+_MODEL_STATS_LOCK = threading.Lock()
+_STATS_FILE = "model_stats.json"
+
+def get_model_stats():
+    global _MODEL_STATS
+    with _MODEL_STATS_LOCK:
+        if _MODEL_STATS is None:
+            from utils import get_resource_path
+            _MODEL_STATS = ModelStats(os.path.join(get_resource_path("config"), _STATS_FILE))
+        return _MODEL_STATS
+
+def use_stats_file(name):
+    """
+    Keeps this process's stats in config/<name>. Each shard group process uses its own
+    file, so groups flushing on shutdown do not overwrite each other's stats.
+    """
+    global _MODEL_STATS, _STATS_FILE
+    with _MODEL_STATS_LOCK:
+        _STATS_FILE = name
+        _MODEL_STATS = None
@@ -11,6 +11,9 @@ import time
 import re
 import json
 import config
+from ollama_transport import get_transport, OllamaError, OllamaUnavailableError, RequestHandle
+from tracing import record_ollama_timings
+from model_stats import get_model_stats
 import sys  # Add this import for platform check
 
 logger = logging.getLogger("silasblue")
@@ -19,43 +22,185 @@ ANSI_ESCAPE = re.compile(r'\x1B\[[0-?]*[ -/]*[@-~]')
 def strip_ansi(text):
     return ANSI_ESCAPE.sub('', text)
 
+class PromptStream:
+    """
+    A streaming /api/generate call. Iterating yields the parsed NDJSON objects as they
+    arrive; close() aborts the request from any thread, which makes Ollama stop generating.
+    """
+
+    def __init__(self, transport, prompt, model, options=None, record_stats=True):
+        self.transport = transport
+        self.prompt = prompt
+        self.model = model
+        self.options = options
+        self.record_stats = record_stats
+        self.closed = False
+        self._resp = None
+        self._handle = RequestHandle()
+
+    def __iter__(self):
+        if self.closed:
+            return
+        data = {"model": self.model, "prompt": self.prompt, "stream": True}
+        if self.options:
+            data["options"] = self.options
+        try:
+            resp = self.transport.post_stream("/api/generate", data, self._handle)
+        except requests.RequestException:
+            self._handle.finish()
+            if self.closed:
+                return  # Aborted while Ollama was still loading the model or reading the prompt
+            raise
+        self._resp = resp
+        try:
+            if self.closed:
+                return
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if self.closed:
+                    return
+                if not line:
+                    continue
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    continue
+                if "error" in obj:
+                    raise OllamaError(obj["error"])
+                done = obj.get("done")
+                if done:
+                    record_ollama_timings(obj)
+                    if self.record_stats:
+                        get_model_stats().record(self.model, obj)
+                yield obj
+                if done:
+                    return
+        except Exception as e:
+            if self.closed:
+                return  # Aborted on purpose; the read error is expected
+            if isinstance(e, (requests.ConnectionError, requests.Timeout)):
+                self.transport.breaker.record_failure()
+            raise
+        finally:
+            self._handle.finish()
+            resp.close()
+
+    def close(self):
+        """Aborts the request, also before Ollama has answered. Safe to call more than once, from any thread."""
+        self.closed = True
+        # Shut the socket down first so a reader blocked in recv() wakes up immediately
+        self._handle.abort()
+        resp = self._resp
+        if resp is None:
+            return
+        try:
+            resp.close()
+        except Exception:
+            pass
+
+
+def join_response(chunks, max_chars=None):
+    """
+    Joins the `response` fields of streamed chunks. Stops (and closes the stream, which
+    aborts the request) as soon as `max_chars` characters have been received.
+    """
+    parts = []
+    total = 0
+    try:
+        for chunk in chunks:
+            text = chunk.get('response', '')
+            parts.append(text)
+            total += len(text)
+            if max_chars and total >= max_chars:
+                break
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+    return ''.join(parts)
+
+
+class Generation:
+    """
+    Cancellation handle for one prompt. Every stream opened for the prompt is attached,
+    so cancel() (callable from any thread) aborts all of them and Ollama stops generating.
+    """
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self.reason = None
+        self._streams = []
+        self._lock = threading.Lock()
+
+    def attach(self, stream):
+        with self._lock:
+            self._streams.append(stream)
+        if self.cancelled.is_set():
+            stream.close()
+
+    def cancel(self, reason="cancelled"):
+        with self._lock:
+            if self.cancelled.is_set():
+                return
+            self.reason = reason
+            self.cancelled.set()
+            streams = list(self._streams)
+        for stream in streams:
+            stream.close()
+
+
 class OllamaClient:
     def __init__(self, base_url=None):
         self.base_url = base_url or "http://localhost:11434"
+        self.transport = get_transport(self.base_url)
         self.ollama_process = None
 
-    def send_prompt(self, prompt, model):
+    def stream_prompt(self, prompt, model, generation=None, options=None, record_stats=True):
+        """
+        Returns a PromptStream for the prompt. Iterate it to receive chunks as they are generated.
+        If a Generation is given, cancelling it aborts the stream. `options` are passed to
+        Ollama as-is (num_predict, num_ctx, temperature, ...). Without `record_stats` the
+        run is left out of the per-model stats (used by benchmarks).
+        """
+        stream = PromptStream(self.transport, prompt, model, options, record_stats)
+        if generation is not None:
+            generation.attach(stream)
+        return stream
+
+    def send_prompt(self, prompt, model, generation=None, options=None, max_chars=None):
         """
         Sends a prompt to Ollama and returns the response.
+        If `generation` is cancelled, returns whatever was generated up to that point.
+        Generation is stopped early once the response reaches `max_chars`.
         """
-        url = f"{self.base_url}/api/generate"
-        data = {"model": model, "prompt": prompt}
         try:
-            resp = requests.post(url, json=data, timeout=60)
-            resp.raise_for_status()
-            # Always decode as UTF-8
-            text = resp.content.decode('utf-8')
-            responses = []
-            for line in text.strip().splitlines():
-                try:
-                    obj = json.loads(line)
-                    if 'response' in obj:
-                        responses.append(obj['response'])
-                except Exception:
-                    continue
-            return ''.join(responses) if responses else resp.json().get("response", "")
+            return join_response(self.stream_prompt(prompt, model, generation, options), max_chars)
+        except OllamaUnavailableError as e:
+            return str(e)
         except Exception as e:
             return f"Error: {e}"
 
+    def unload_model(self, model):
+        """
+        Asks Ollama to unload a model from memory. Returns True on success.
+        """
+        try:
+            resp = self.transport.post_stream("/api/generate", {"model": model, "keep_alive": 0})
+            ok = resp.status_code == 200
+            resp.close()
+            return ok
+        except Exception as e:
+            logger.warning(f"Could not unload model {model}: {e}")
+            return False
+
     def list_models(self):
         """
         Returns a list of available models.
         """
-        url = f"{self.base_url}/api/tags"
         if config.DEBUG:
-            print(f"[DEBUG] OllamaClient.list_models() requesting: {url}")
+            print(f"[DEBUG] OllamaClient.list_models() requesting: {self.base_url}/api/tags")
         try:
-            resp = requests.get(url, timeout=5)
+            resp = self.transport.get("/api/tags")
             if config.DEBUG:
                 print(f"[DEBUG] OllamaClient.list_models() response status: {resp.status_code}")
             if resp.status_code == 200:
@@ -71,6 +216,20 @@ class OllamaClient:
                 print(f"[DEBUG] OllamaClient.list_models() error: {e}")
             return []
 
+    def list_running_models(self):
+        """
+        Returns a list of models currently loaded in memory (via /api/ps).
+        """
+        try:
+            resp = self.transport.get("/api/ps")
+            if resp.status_code == 200:
+                return [m['name'] for m in resp.json().get('models', [])]
+            return []
+        except Exception as e:
+            if config.DEBUG:
+                print(f"[DEBUG] OllamaClient.list_running_models() error: {e}")
+            return []
+
     def download_model(self, model_name, progress_callback=None):
         """
         Downloads a model using the ollama CLI and pipes output to logger and callback.
@@ -117,11 +276,11 @@ class OllamaClient:
         """
         Returns True if Ollama is running (by checking /api/tags), False otherwise.
         """
-        url = f"{self.base_url}/api/tags"
         if config.DEBUG:
-            print(f"[DEBUG] OllamaClient.status() requesting: {url}")
+            print(f"[DEBUG] OllamaClient.status() requesting: {self.base_url}/api/tags")
         try:
-            resp = requests.get(url, timeout=5)
+            # No retries: status is polled, and a failed poll is itself the answer
+            resp = self.transport.get("/api/tags", retries=0)
             if config.DEBUG:
                 print(f"[DEBUG] OllamaClient.status() response status: {resp.status_code}")
             return resp.status_code == 200
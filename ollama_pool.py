@@ -0,0 +1,418 @@
+"""
+Ollama backend pool for Silas Blue.
+Routes prompts across several Ollama hosts, with periodic health and model-inventory checks.
+"""
+
+import threading
+import contextvars
+import logging
+import queue
+import time
+from collections import deque
+
+import config
+from ollama_api import OllamaClient, join_response
+from ollama_transport import OllamaUnavailableError
+
+logger = logging.getLogger("silasblue")
+
+DEFAULT_BASE_URL = "http://localhost:11434"
+
+
+class OllamaBackend:
+    """
+    A single Ollama host in the pool, along with its last known health and model inventory.
+    """
+
+    def __init__(self, base_url, weight=1):
+        self.base_url = base_url.rstrip("/")
+        self.weight = max(float(weight), 0.1)
+        self.client = OllamaClient(self.base_url)
+        # Assume healthy until the first check says otherwise
+        self.healthy = True
+        self.draining = False
+        self.installed_models = set()
+        self.loaded_models = set()
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.last_checked = 0.0
+
+    @property
+    def available(self):
+        return self.healthy and not self.draining and not self.client.transport.breaker.is_open()
+
+    def load(self, outstanding=None):
+        """Outstanding requests normalised by weight (lower is better); `outstanding` overrides our own count."""
+        return (self.outstanding if outstanding is None else outstanding) / self.weight
+
+    def to_dict(self):
+        return {
+            "url": self.base_url,
+            "weight": self.weight,
+            "healthy": self.healthy,
+            "draining": self.draining,
+            "outstanding": self.outstanding,
+            "installed_models": sorted(self.installed_models),
+            "loaded_models": sorted(self.loaded_models),
+            "last_checked": self.last_checked,
+        }
+
+
+class OllamaBackendPool:
+    """
+    Load balancer over several Ollama backends.
+
+    Prompts go to a healthy backend that already has the model loaded, then to one that
+    has it installed, then to any healthy backend; ties are broken by least outstanding
+    requests per unit of weight. Backends failing `failure_threshold` health checks in a
+    row are drained (no new requests) until a later check succeeds.
+
+    With hedging enabled, a prompt whose first token is slower than the recent
+    `hedge_percentile` time-to-first-token is also sent to a second backend. Whichever
+    stream produces a chunk first is used and the other is aborted. At most
+    `hedge_budget` (a fraction of all requests) may be hedged.
+    """
+
+    def __init__(self, backends=None, health_interval=15, failure_threshold=2,
+                 hedge_enabled=False, hedge_percentile=95, hedge_min_delay=0.5,
+                 hedge_default_delay=5.0, hedge_budget=0.1):
+        self._lock = threading.Lock()
+        self._shared = None  # (counts, lock) from share_load()
+        self.backends = []
+        self.health_interval = health_interval
+        self.failure_threshold = failure_threshold
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+        self.hedge_budget = hedge_budget
+        self._ttft_samples = deque(maxlen=200)
+        self._total_requests = 0
+        self._hedged_requests = 0
+        self._stop_event = threading.Event()
+        self._health_thread = None
+        if backends is None:
+            backends = [{"url": DEFAULT_BASE_URL}]
+        for entry in backends:
+            if isinstance(entry, str):
+                entry = {"url": entry}
+            self.add_backend(entry["url"], entry.get("weight", 1))
+
+    # --- Backend management ---
+    def add_backend(self, base_url, weight=1):
+        """Adds a backend (no-op if the URL is already registered). Returns the backend."""
+        base_url = base_url.rstrip("/")
+        with self._lock:
+            for backend in self.backends:
+                if backend.base_url == base_url:
+                    backend.weight = max(float(weight), 0.1)
+                    return backend
+            backend = OllamaBackend(base_url, weight)
+            self.backends.append(backend)
+        logger.info(f"Ollama backend added: {base_url} (weight {weight})")
+        return backend
+
+    def remove_backend(self, base_url):
+        base_url = base_url.rstrip("/")
+        with self._lock:
+            self.backends = [b for b in self.backends if b.base_url != base_url]
+        logger.info(f"Ollama backend removed: {base_url}")
+
+    def get_backend(self, base_url):
+        base_url = base_url.rstrip("/")
+        with self._lock:
+            return next((b for b in self.backends if b.base_url == base_url), None)
+
+    def set_draining(self, base_url, draining=True):
+        """Manually drain (or undrain) a backend. In-flight requests are allowed to finish."""
+        backend = self.get_backend(base_url)
+        if backend:
+            backend.draining = draining
+            logger.info(f"Ollama backend {base_url} {'draining' if draining else 'accepting requests'}.")
+        return backend is not None
+
+    # --- Health checks ---
+    def start(self):
+        """Starts the periodic health-check thread (first check runs immediately)."""
+        if self._health_thread and self._health_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._health_thread = threading.Thread(target=self._health_loop, daemon=True)
+        self._health_thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._health_thread:
+            self._health_thread.join(timeout=5)
+            self._health_thread = None
+
+    def _health_loop(self):
+        while not self._stop_event.is_set():
+            self.check_health()
+            self._stop_event.wait(self.health_interval)
+
+    def check_health(self):
+        """Refreshes health and model inventory for every backend."""
+        with self._lock:
+            backends = list(self.backends)
+        for backend in backends:
+            self._check_backend(backend)
+
+    def _check_backend(self, backend):
+        ok = backend.client.status()
+        backend.last_checked = time.time()
+        if ok:
+            backend.installed_models = set(backend.client.list_models())
+            backend.loaded_models = set(backend.client.list_running_models())
+            backend.consecutive_failures = 0
+            if not backend.healthy:
+                logger.info(f"Ollama backend {backend.base_url} is healthy again.")
+            backend.healthy = True
+        else:
+            backend.consecutive_failures += 1
+            if backend.healthy and backend.consecutive_failures >= self.failure_threshold:
+                logger.warning(f"Ollama backend {backend.base_url} failed {backend.consecutive_failures} health checks; draining it.")
+                backend.healthy = False
+        if config.DEBUG:
+            print(f"[DEBUG] OllamaBackendPool health {backend.base_url}: ok={ok} loaded={sorted(backend.loaded_models)}")
+
+    # --- Routing ---
+    def pick_backend(self, model, exclude=()):
+        """
+        Returns the best backend for `model`, or None if no backend is available.
+        """
+        with self._lock:
+            candidates = [b for b in self.backends if b.available and b.base_url not in exclude]
+        if not candidates:
+            return None
+        loaded = [b for b in candidates if model in b.loaded_models]
+        installed = [b for b in candidates if model in b.installed_models]
+        tier = loaded or installed or candidates
+        shared = self._shared_outstanding()
+        return min(tier, key=lambda b: (b.load(shared.get(b.base_url) if shared else None), -b.weight))
+
+    def share_load(self, counts, lock):
+        """
+        Also counts outstanding requests in `counts`, a dict of URL -> requests shared with
+        other processes (a multiprocessing.Manager dict guarded by `lock`), and routes by
+        that total. Shard group processes use this so they balance as one pool.
+        """
+        self._shared = (counts, lock)
+
+    def _shared_outstanding(self):
+        if self._shared is None:
+            return None
+        try:
+            return dict(self._shared[0])
+        except Exception as e:  # The manager process is gone; fall back to our own counts
+            logger.warning(f"Shared Ollama load is unavailable: {e}")
+            self._shared = None
+            return None
+
+    def _add_shared(self, backend, delta):
+        if self._shared is None:
+            return
+        counts, lock = self._shared
+        try:
+            with lock:
+                counts[backend.base_url] = max(0, counts.get(backend.base_url, 0) + delta)
+        except Exception as e:
+            logger.warning(f"Shared Ollama load is unavailable: {e}")
+            self._shared = None
+
+    def _acquire(self, backend):
+        with self._lock:
+            backend.outstanding += 1
+        self._add_shared(backend, 1)
+
+    def _release(self, backend, model, served):
+        with self._lock:
+            backend.outstanding -= 1
+        self._add_shared(backend, -1)
+        if served:
+            # Ollama keeps a model resident after serving it, so route follow-ups there
+            backend.loaded_models.add(model)
+
+    # --- Hedging ---
+    def hedge_delay(self):
+        """
+        Seconds to wait for a first token before hedging: the configured percentile of
+        recent time-to-first-token, or `hedge_default_delay` until enough samples exist.
+        """
+        with self._lock:
+            samples = sorted(self._ttft_samples)
+        if len(samples) < 20:
+            return self.hedge_default_delay
+        idx = min(len(samples) - 1, int(len(samples) * self.hedge_percentile / 100))
+        return max(self.hedge_min_delay, samples[idx])
+
+    def _take_hedge_budget(self):
+        with self._lock:
+            if self._hedged_requests + 1 > self.hedge_budget * self._total_requests:
+                return False
+            self._hedged_requests += 1
+            return True
+
+    def hedge_stats(self):
+        with self._lock:
+            return {
+                "total_requests": self._total_requests,
+                "hedged_requests": self._hedged_requests,
+                "ttft_samples": len(self._ttft_samples),
+            }
+
+    # --- OllamaClient-compatible API ---
+    def stream_prompt(self, prompt, model, generation=None, options=None):
+        """
+        Yields response chunks for the prompt from the best backend (hedged if enabled).
+        Cancelling `generation` aborts every attempt and ends the iteration early.
+        Raises OllamaUnavailableError if no backend is available, or the backend's error if it fails.
+        """
+        primary = self.pick_backend(model)
+        if primary is None:
+            raise OllamaUnavailableError()
+        with self._lock:
+            self._total_requests += 1
+        results = queue.Queue()
+        attempts = []
+
+        def launch(backend):
+            stream = backend.client.stream_prompt(prompt, model, generation, options)
+            attempts.append(stream)
+            self._acquire(backend)
+            def run():
+                served = False  # Only a finished generation shows the backend has the model
+                try:
+                    for chunk in stream:
+                        served = served or bool(chunk.get("done"))
+                        results.put((stream, chunk))
+                    results.put((stream, None))
+                except Exception as e:
+                    results.put((stream, e))
+                finally:
+                    self._release(backend, model, served)
+            # Threads start with an empty context; copy ours so the request's trace sees the timings
+            threading.Thread(target=contextvars.copy_context().run, args=(run,), daemon=True).start()
+
+        started = time.monotonic()
+        launch(primary)
+        hedged = not self.hedge_enabled
+        winner = None
+        failed = []
+        try:
+            while True:
+                timeout = None
+                if winner is None and not hedged:
+                    timeout = max(0.0, self.hedge_delay() - (time.monotonic() - started))
+                try:
+                    stream, item = results.get(timeout=timeout)
+                except queue.Empty:
+                    hedged = True
+                    if generation is not None and generation.cancelled.is_set():
+                        continue
+                    backup = self.pick_backend(model, exclude={primary.base_url})
+                    if backup and self._take_hedge_budget():
+                        logger.info(f"Hedging {model} request to {backup.base_url} after {time.monotonic() - started:.2f}s without a token.")
+                        launch(backup)
+                    continue
+                if winner is None:
+                    if isinstance(item, Exception) or item is None:
+                        # This attempt ended before producing anything; wait for the others
+                        failed.append(item)
+                        if len(failed) == len(attempts):
+                            error = next((e for e in failed if isinstance(e, Exception)), None)
+                            if error:
+                                raise error
+                            return
+                        continue
+                    winner = stream
+                    with self._lock:
+                        self._ttft_samples.append(time.monotonic() - started)
+                    for other in attempts:
+                        if other is not winner:
+                            other.close()
+                elif stream is not winner:
+                    continue
+                if isinstance(item, Exception):
+                    raise item
+                if item is None:
+                    return
+                yield item
+        finally:
+            for stream in attempts:
+                stream.close()
+
+    def send_prompt(self, prompt, model, generation=None, options=None, max_chars=None):
+        """
+        Sends a prompt to the best available backend and returns the response.
+        If `generation` is cancelled, returns whatever was generated up to that point.
+        Generation is stopped early once the response reaches `max_chars`.
+        """
+        try:
+            return join_response(self.stream_prompt(prompt, model, generation, options), max_chars)
+        except OllamaUnavailableError as e:
+            return str(e)
+        except Exception as e:
+            return f"Error: {e}"
+
+    def list_models(self):
+        """
+        Returns the union of models installed on healthy backends.
+        Uses the cached inventory; runs a health check first if none has completed yet.
+        """
+        with self._lock:
+            backends = list(self.backends)
+        if not any(b.last_checked for b in backends):
+            self.check_health()
+        models = []
+        for backend in backends:
+            if backend.healthy:
+                for name in sorted(backend.installed_models):
+                    if name not in models:
+                        models.append(name)
+        return models
+
+    def status(self):
+        """
+        Returns True if at least one backend is healthy and accepting requests.
+        """
+        with self._lock:
+            return any(b.available for b in self.backends)
+
+    def snapshot(self):
+        """Returns a list of dicts describing every backend (for the GUI/logs)."""
+        with self._lock:
+            return [b.to_dict() for b in self.backends]
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+def get_backend_pool():
+    """
+    Returns the process-wide backend pool, creating and starting it on first use.
+    Backends come from `ollama_backends` in app_config.json, e.g.
+    [{"url": "http://localhost:11434", "weight": 2}, {"url": "http://gpu-box:11434"}].
+    Without it the pool targets the default local Ollama, unless supervised
+    `ollama_instances` are configured (they register themselves).
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            from utils import load_app_config
+            app_config = load_app_config()
+            backends = app_config.get("ollama_backends")
+            if not backends and not app_config.get("ollama_instances"):
+                backends = [{"url": DEFAULT_BASE_URL}]
+            _POOL = OllamaBackendPool(
+                backends or [],
+                health_interval=app_config.get("ollama_health_interval", 15),
+                failure_threshold=app_config.get("ollama_failure_threshold", 2),
+                hedge_enabled=app_config.get("hedge_enabled", False),
+                hedge_percentile=app_config.get("hedge_percentile", 95),
+                hedge_min_delay=app_config.get("hedge_min_delay", 0.5),
+                hedge_default_delay=app_config.get("hedge_default_delay", 5.0),
+                hedge_budget=app_config.get("hedge_budget", 0.1),
+            )
+            _POOL.start()
+        return _POOL
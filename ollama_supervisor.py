@@ -0,0 +1,221 @@
+"""
+Supervisor for local `ollama serve` processes.
+Runs several instances on distinct ports, restarts them with backoff when they exit,
+forwards their output to the logging pipeline and registers them with the backend pool.
+"""
+
+import os
+import sys
+import subprocess
+import threading
+import logging
+import time
+
+logger = logging.getLogger("silasblue")
+ollama_logger = logging.getLogger("ollama")
+
+
+class OllamaInstance:
+    """
+    Settings and runtime state for one supervised `ollama serve` process.
+    """
+
+    def __init__(self, port, host="127.0.0.1", models_dir=None, num_parallel=None,
+                 max_loaded_models=None, weight=1, env=None):
+        self.port = int(port)
+        self.host = host
+        self.models_dir = models_dir
+        self.num_parallel = num_parallel
+        self.max_loaded_models = max_loaded_models
+        self.weight = weight
+        self.extra_env = env or {}
+        self.process = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.next_start = 0.0
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def build_env(self):
+        env = os.environ.copy()
+        env["OLLAMA_HOST"] = f"{self.host}:{self.port}"
+        if self.models_dir:
+            env["OLLAMA_MODELS"] = self.models_dir
+        if self.num_parallel:
+            env["OLLAMA_NUM_PARALLEL"] = str(self.num_parallel)
+        if self.max_loaded_models:
+            env["OLLAMA_MAX_LOADED_MODELS"] = str(self.max_loaded_models)
+        env.update({k: str(v) for k, v in self.extra_env.items()})
+        return env
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def to_dict(self):
+        return {
+            "url": self.url,
+            "pid": self.process.pid if self.process else None,
+            "running": self.is_running(),
+            "restarts": self.restarts,
+            "models_dir": self.models_dir,
+            "num_parallel": self.num_parallel,
+        }
+
+
+class OllamaSupervisor:
+    """
+    Keeps a set of `ollama serve` processes alive.
+
+    Exited processes are restarted after an exponential backoff (reset once an instance
+    has stayed up for `stable_after` seconds). While an instance is down its backend is
+    drained in the pool so prompts go elsewhere.
+    """
+
+    def __init__(self, instances, pool=None, base_backoff=1.0, max_backoff=60.0, stable_after=60.0):
+        self.instances = instances
+        self.pool = pool
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._monitor_thread = None
+
+    def start(self):
+        """Starts every instance and the monitor thread. Returns True if all processes spawned."""
+        if self._monitor_thread and self._monitor_thread.is_alive():
+            return True
+        self._stop_event.clear()
+        ok = True
+        for instance in self.instances:
+            if self.pool is not None:
+                self.pool.add_backend(instance.url, instance.weight)
+            ok = self._spawn(instance) and ok
+        self._monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
+        self._monitor_thread.start()
+        return ok
+
+    def stop(self, timeout=10):
+        """Stops the monitor and terminates every instance."""
+        self._stop_event.set()
+        if self._monitor_thread:
+            self._monitor_thread.join(timeout=5)
+            self._monitor_thread = None
+        for instance in self.instances:
+            with self._lock:
+                process = instance.process
+                instance.process = None
+            if process and process.poll() is None:
+                process.terminate()
+                try:
+                    process.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            if self.pool is not None:
+                self.pool.remove_backend(instance.url)
+        logger.info("Ollama supervisor stopped.")
+        return True
+
+    def restart(self):
+        self.stop()
+        return self.start()
+
+    def status(self):
+        return [instance.to_dict() for instance in self.instances]
+
+    def _spawn(self, instance):
+        creationflags = 0
+        if sys.platform == "win32":
+            creationflags = subprocess.CREATE_NO_WINDOW
+        try:
+            process = subprocess.Popen(
+                ["ollama", "serve"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                env=instance.build_env(),
+                creationflags=creationflags
+            )
+        except Exception as e:
+            logger.error(f"Failed to start ollama serve on {instance.url}: {e}")
+            instance.next_start = time.time() + self._backoff(instance)
+            return False
+        with self._lock:
+            instance.process = process
+            instance.started_at = time.time()
+        threading.Thread(target=self._pipe_output, args=(instance, process), daemon=True).start()
+        if self.pool is not None:
+            self.pool.set_draining(instance.url, False)
+        logger.info(f"Started ollama serve on {instance.url} (PID {process.pid}).")
+        return True
+
+    def _pipe_output(self, instance, process):
+        prefix = f"[ollama:{instance.port}]"
+        for line in process.stdout:
+            line = line.rstrip()
+            if line:
+                ollama_logger.info(f"{prefix} {line}")
+
+    def _backoff(self, instance):
+        return min(self.max_backoff, self.base_backoff * (2 ** instance.restarts))
+
+    def _monitor_loop(self):
+        while not self._stop_event.wait(1.0):
+            now = time.time()
+            for instance in self.instances:
+                with self._lock:
+                    process = instance.process
+                if process is not None and process.poll() is None:
+                    if instance.restarts and now - instance.started_at > self.stable_after:
+                        instance.restarts = 0
+                    continue
+                if process is not None:
+                    # Process exited since the last pass; schedule a restart
+                    uptime = now - instance.started_at
+                    delay = self._backoff(instance)
+                    logger.warning(f"ollama serve on {instance.url} exited with code {process.returncode} after {uptime:.0f}s; restarting in {delay:.1f}s.")
+                    with self._lock:
+                        instance.process = None
+                    instance.next_start = now + delay
+                    if self.pool is not None:
+                        self.pool.set_draining(instance.url, True)
+                    continue
+                if now >= instance.next_start and not self._stop_event.is_set():
+                    instance.restarts += 1
+                    self._spawn(instance)
+
+
+_SUPERVISOR = None
+_SUPERVISOR_LOCK = threading.Lock()
+
+def register_supervised_backends(pool):
+    """
+    Adds the configured `ollama_instances` to `pool` without starting them. Used by bot
+    processes whose Ollama instances are supervised by another process.
+    """
+    from utils import load_app_config
+    for entry in load_app_config().get("ollama_instances") or []:
+        instance = OllamaInstance(**entry)
+        pool.add_backend(instance.url, instance.weight)
+
+def get_supervisor():
+    """
+    Returns the process-wide supervisor built from `ollama_instances` in app_config.json,
+    e.g. [{"port": 11435, "models_dir": "D:/models", "num_parallel": 2}], or None if no
+    instances are configured. Instances are registered with the shared backend pool.
+    """
+    global _SUPERVISOR
+    with _SUPERVISOR_LOCK:
+        if _SUPERVISOR is None:
+            from utils import load_app_config
+            from ollama_pool import get_backend_pool
+            entries = load_app_config().get("ollama_instances") or []
+            if not entries:
+                return None
+            instances = [OllamaInstance(**entry) for entry in entries]
+            _SUPERVISOR = OllamaSupervisor(instances, pool=get_backend_pool())
+        return _SUPERVISOR
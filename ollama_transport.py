@@ -0,0 +1,269 @@
+"""
+HTTP transport for the Ollama API.
+Provides pooled sessions, connect/read timeouts, retries for idempotent calls and a circuit breaker.
+"""
+
+import random
+import socket
+import threading
+import logging
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+logger = logging.getLogger("silasblue")
+
+UNAVAILABLE_MESSAGE = "Ollama is currently unavailable. Please try again in a little while."
+
+
+class OllamaError(Exception):
+    """Raised when Ollama reports an error inside a response stream."""
+
+
+class OllamaUnavailableError(OllamaError):
+    """Raised without contacting Ollama while the circuit breaker is open."""
+
+    def __init__(self, message=UNAVAILABLE_MESSAGE):
+        super().__init__(message)
+
+
+class CircuitBreaker:
+    """
+    Fails fast after `failure_threshold` consecutive failures.
+
+    States: "closed" (normal), "open" (every call is rejected) and "half_open" (after
+    `reset_timeout` seconds one probe call is let through; success closes the circuit,
+    failure opens it again).
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Returns True if a call may go ahead."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def is_open(self):
+        with self._lock:
+            return self.state == "open" and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info(f"Ollama at {self.name} is reachable again; circuit closed.")
+            self.state = "closed"
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """For a call that ended without success or failure (aborted, or an unexpected error)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                if self.state == "closed":
+                    logger.warning(f"Ollama at {self.name} failed {self.failures} times in a row; circuit opened.")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class RequestHandle:
+    """
+    Lets another thread abort a streaming request at any point: while it connects, while
+    Ollama loads the model and evaluates the prompt (before any response header), and
+    while the body streams. Aborting shuts the socket down, so Ollama sees the client go.
+    """
+
+    def __init__(self):
+        self.aborted = False
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _attach(self, conn):
+        with self._lock:
+            self._conn = conn
+            aborted = self.aborted
+        if aborted:
+            raise requests.ConnectionError("Request aborted before it was sent.")
+
+    def finish(self):
+        """Called once the request is over, so a late abort() cannot touch a reused connection."""
+        with self._lock:
+            self._conn = None
+
+    def abort(self):
+        with self._lock:
+            self.aborted = True
+            conn = self._conn
+        sock = getattr(conn, "sock", None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)  # Wakes a reader blocked in recv() at once
+            except OSError:
+                pass
+
+
+# The handle of the request being sent on this thread, see post_stream()
+_sending = threading.local()
+
+class _HandleConnectionMixin:
+    def request(self, *args, **kwargs):
+        handle = getattr(_sending, "handle", None)
+        if handle is not None:
+            _sending.handle = None  # Only the first request belongs to the handle
+            handle._attach(self)
+        return super().request(*args, **kwargs)
+
+class _HTTPConnection(_HandleConnectionMixin, HTTPConnection):
+    pass
+
+class _HTTPSConnection(_HandleConnectionMixin, HTTPSConnection):
+    pass
+
+class _HTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _HTTPConnection
+
+class _HTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _HTTPSConnection
+
+class _AbortableAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections report themselves to the RequestHandle of the request."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _HTTPConnectionPool, "https": _HTTPSConnectionPool}
+
+
+class OllamaTransport:
+    """
+    Pooled HTTP access to one Ollama base URL.
+
+    GET requests are retried with jittered exponential backoff; streaming POSTs are not
+    retried. Connection errors, timeouts and 5xx responses count as breaker failures.
+    """
+
+    def __init__(self, base_url, connect_timeout=3.05, read_timeout=60, retries=2,
+                 backoff=0.25, pool_size=10, failure_threshold=5, reset_timeout=30.0):
+        self.base_url = base_url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = _AbortableAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.breaker = CircuitBreaker(base_url, failure_threshold, reset_timeout)
+
+    def _timeout(self, read_timeout=None):
+        return (self.connect_timeout, read_timeout or self.read_timeout)
+
+    def get(self, path, read_timeout=5, retries=None):
+        """
+        GETs `path` and returns the response. Raises OllamaUnavailableError if the
+        circuit is open, or the last error once retries are exhausted.
+        """
+        retries = self.retries if retries is None else retries
+        url = f"{self.base_url}{path}"
+        for attempt in range(retries + 1):
+            if not self.breaker.allow():
+                raise OllamaUnavailableError()
+            recorded = False
+            try:
+                resp = self.session.get(url, timeout=self._timeout(read_timeout))
+            except (requests.ConnectionError, requests.Timeout):
+                self.breaker.record_failure()
+                recorded = True
+                if attempt == retries:
+                    raise
+            else:
+                recorded = True
+                if resp.status_code >= 500:
+                    self.breaker.record_failure()
+                    if attempt == retries:
+                        return resp
+                else:
+                    self.breaker.record_success()
+                    return resp
+            finally:
+                if not recorded:  # Otherwise a half-open breaker would wait for this probe forever
+                    self.breaker.release_probe()
+            # Full jitter keeps several clients from retrying in lockstep
+            time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    def post_stream(self, path, data, handle=None):
+        """
+        POSTs `data` as JSON with a streamed response (not retried). With a RequestHandle,
+        handle.abort() from another thread ends the request even before the response
+        headers arrive; the caller calls handle.finish() once it is done with the response.
+        """
+        if not self.breaker.allow():
+            raise OllamaUnavailableError()
+        _sending.handle = handle
+        recorded = False
+        try:
+            resp = self.session.post(f"{self.base_url}{path}", json=data, stream=True, timeout=self._timeout())
+        except (requests.ConnectionError, requests.Timeout):
+            if handle is None or not handle.aborted:  # An abort says nothing about Ollama's health
+                self.breaker.record_failure()
+                recorded = True
+            raise
+        else:
+            recorded = True
+            if resp.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+        finally:
+            _sending.handle = None
+            if not recorded:  # Otherwise a half-open breaker would wait for this probe forever
+                self.breaker.release_probe()
+        return resp
+
+
+_TRANSPORTS = {}
+_TRANSPORTS_LOCK = threading.Lock()
+
+def get_transport(base_url):
+    """
+    Returns the shared transport for `base_url`, so every client of the same Ollama host
+    reuses one connection pool and one circuit breaker. Timeouts and breaker settings
+    come from app_config.json.
+    """
+    with _TRANSPORTS_LOCK:
+        transport = _TRANSPORTS.get(base_url)
+        if transport is None:
+            from utils import load_app_config
+            app_config = load_app_config()
+            transport = OllamaTransport(
+                base_url,
+                connect_timeout=app_config.get("ollama_connect_timeout", 3.05),
+                read_timeout=app_config.get("ollama_read_timeout", 60),
+                failure_threshold=app_config.get("ollama_breaker_threshold", 5),
+                reset_timeout=app_config.get("ollama_breaker_reset", 30.0),
+            )
+            _TRANSPORTS[base_url] = transport
+        return transport
@@ -0,0 +1,163 @@
+"""
+Shared page store for paginated replies.
+Keeps pages keyed by Discord message ID in a size-bounded in-memory LRU and spills
+older entries to disk, so pagination buttons keep working across bot restarts.
+"""
+
+import os
+import json
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("silasblue")
+
+
+class PageStore:
+    """
+    Pages for every paginated message, bounded in memory and on disk.
+
+    Entries are dicts: {"pages": [...], "author_id": int, "current": int, "complete": bool}.
+    `complete` is False while a streamed reply is still generating. When the pages
+    held in memory exceed `max_memory_chars`, the least recently used entries are written
+    to `directory` as JSON and dropped from memory. At most `max_disk_entries` files are
+    kept; the oldest are deleted first. Files are written and deleted on a writer thread,
+    so callers on the event loop never wait for the disk.
+    """
+
+    def __init__(self, directory, max_memory_chars=2_000_000, max_disk_entries=5000):
+        self.directory = directory
+        self.max_memory_chars = max_memory_chars
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()  # message ID -> entry
+        self._sizes = {}
+        self._memory_chars = 0
+        self._spilling = {}  # message ID -> entry queued for the writer thread
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="page-store")
+        os.makedirs(directory, exist_ok=True)
+        # Oldest first, so the disk index can be trimmed from the front
+        files = [f for f in os.listdir(directory) if f.endswith(".json")]
+        files.sort(key=lambda f: os.path.getmtime(os.path.join(directory, f)))
+        self._disk = OrderedDict((int(f[:-5]), None) for f in files if f[:-5].isdigit())
+
+    def _path(self, message_id):
+        return os.path.join(self.directory, f"{message_id}.json")
+
+    def put(self, message_id, pages, author_id, current=0, complete=True):
+        """Stores (or replaces) the pages for a message."""
+        entry = {"pages": pages, "author_id": author_id, "current": current, "complete": complete}
+        with self._lock:
+            self._drop_memory(message_id)
+            self._memory[message_id] = entry
+            self._sizes[message_id] = sum(len(p) for p in pages)
+            self._memory_chars += self._sizes[message_id]
+            self._enforce_memory_limit()
+
+    def get(self, message_id):
+        """Returns the entry for a message (loading it back from disk if needed), or None."""
+        with self._lock:
+            entry = self._memory.get(message_id)
+            if entry is not None:
+                self._memory.move_to_end(message_id)
+                return entry
+            entry = self._spilling.pop(message_id, None)  # Not written yet; the writer skips it now
+            if entry is None and message_id not in self._disk:
+                return None
+        if entry is None:
+            try:
+                with open(self._path(message_id), "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                with self._lock:
+                    self._disk.pop(message_id, None)
+                return None
+        self.put(message_id, entry["pages"], entry["author_id"], entry.get("current", 0), entry.get("complete", True))
+        return self._memory.get(message_id, entry)
+
+    def set_current(self, message_id, current):
+        with self._lock:
+            entry = self._memory.get(message_id)
+            if entry is not None:
+                entry["current"] = current
+
+    def remove(self, message_id):
+        with self._lock:
+            self._drop_memory(message_id)
+            self._spilling.pop(message_id, None)
+            on_disk = self._disk.pop(message_id, False) is not False
+        if on_disk:
+            self._writer.submit(self._delete, [message_id])
+
+    def flush(self):
+        """Writes every in-memory entry to disk and waits for pending writes (call before shutdown)."""
+        with self._lock:
+            entries = list(self._memory.items())
+        for message_id, entry in entries:
+            if self._write(message_id, entry):
+                with self._lock:
+                    trimmed = self._add_to_disk(message_id)
+                self._delete(trimmed)
+        self._writer.submit(lambda: None).result()  # Spills queued before this call
+        logger.info(f"Page store flushed {len(entries)} paginated replies to disk.")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_chars": self._memory_chars,
+                "disk_entries": len(self._disk),
+            }
+
+    def _drop_memory(self, message_id):
+        if self._memory.pop(message_id, None) is not None:
+            self._memory_chars -= self._sizes.pop(message_id, 0)
+
+    def _enforce_memory_limit(self):
+        # Always keep the newest entry in memory, even if it alone exceeds the limit
+        while self._memory_chars > self.max_memory_chars and len(self._memory) > 1:
+            message_id, entry = self._memory.popitem(last=False)
+            self._memory_chars -= self._sizes.pop(message_id, 0)
+            self._spilling[message_id] = entry
+            self._writer.submit(self._spill, message_id, entry)
+
+    def _spill(self, message_id, entry):
+        """Writer thread: moves an entry evicted from memory to disk."""
+        with self._lock:
+            if self._spilling.get(message_id) is not entry:
+                return  # Read back into memory or removed before its turn
+        written = self._write(message_id, entry)
+        with self._lock:
+            current = self._spilling.get(message_id) is entry
+            if current:
+                del self._spilling[message_id]
+            trimmed = self._add_to_disk(message_id) if written and current else []
+        if written and not current:
+            trimmed.append(message_id)  # Read back or removed while it was written; drop the stale file
+        self._delete(trimmed)
+
+    def _write(self, message_id, entry):
+        try:
+            with open(self._path(message_id), "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            return True
+        except OSError as e:
+            logger.error(f"Failed to spill pages for message {message_id}: {e}")
+            return False
+
+    def _add_to_disk(self, message_id):
+        """Indexes a written file (with the lock held); returns the IDs trimmed to stay under max_disk_entries."""
+        self._disk.pop(message_id, None)
+        self._disk[message_id] = None
+        trimmed = []
+        while len(self._disk) > self.max_disk_entries:
+            trimmed.append(self._disk.popitem(last=False)[0])
+        return trimmed
+
+    def _delete(self, message_ids):
+        for message_id in message_ids:
+            try:
+                os.remove(self._path(message_id))
+            except OSError:
+                pass
@@ -0,0 +1,159 @@
+"""
+Streaming paginator for Silas Blue.
+Splits text into Discord-sized pages as it is generated, keeping Markdown code fences intact.
+"""
+
+FENCE = "```"
+# Room kept free on a page that ends inside a code block, for "\n```"
+FENCE_CLOSE_RESERVE = len(FENCE) + 1
+
+
+class StreamingPaginator:
+    """
+    Incrementally splits text into pages of at most `max_chars` characters.
+
+    Text is fed in arbitrary chunks (e.g. tokens); complete pages are returned as soon as
+    they are full. Pages break at line ends where possible, then at spaces, then anywhere.
+    A page that ends inside a ``` code block gets a closing fence and the next page reopens
+    it with the same info string (e.g. ```python), so formatting survives page turns. A
+    block that would be empty before the break starts on the next page instead, and a
+    block still open at the end is closed.
+    Every character is copied a bounded number of times, so total work is linear.
+    """
+
+    def __init__(self, max_chars):
+        self.max_chars = max(max_chars, 20)
+        self._pending = []  # chunks of the current, not yet complete line
+        self._pending_len = 0
+        self._page = []
+        self._page_len = 0
+        self._header_len = 0  # length of the reopened fence at the top of the page
+        self._fence_open = False
+        self._fence_opener = FENCE
+        self._fence_line = None  # index in _page of the line that opened the block, if on this page
+        self._ready = []
+
+    def feed(self, text):
+        """Adds text and returns the list of pages completed by it (possibly empty)."""
+        if text:
+            self._pending.append(text)
+            self._pending_len += len(text)
+            if "\n" in text or self._pending_len > self.max_chars:
+                self._drain_pending(final=False)
+        return self._take_ready()
+
+    def finish(self):
+        """Flushes everything that is left, closing an open code block, and returns the final pages."""
+        self._drain_pending(final=True)
+        if self._page_len > self._header_len:
+            self._flush(final=True)
+        return self._take_ready()
+
+    def _take_ready(self):
+        ready, self._ready = self._ready, []
+        return ready
+
+    def _drain_pending(self, final):
+        pending = "".join(self._pending)
+        self._pending = []
+        self._pending_len = 0
+        start = 0
+        while True:
+            newline = pending.find("\n", start)
+            if newline == -1:
+                break
+            self._add_line(pending[start:newline + 1])
+            start = newline + 1
+        rest = pending[start:]
+        # An unfinished line longer than a page is split now so memory stays bounded
+        while len(rest) > self.max_chars:
+            split_at = self._split_point(rest, self.max_chars - FENCE_CLOSE_RESERVE - self._header_len)
+            self._add_line(rest[:split_at])
+            rest = rest[split_at:]
+        if final:
+            if rest:
+                self._add_line(rest)
+        elif rest:
+            self._pending = [rest]
+            self._pending_len = len(rest)
+
+    @staticmethod
+    def _split_point(line, limit):
+        """Prefers the last space in the first `limit` characters, unless that wastes over half the page."""
+        limit = max(limit, 1)
+        split_at = line.rfind(" ", 0, limit)
+        if split_at == -1 or split_at < limit // 2:
+            split_at = limit
+        return split_at
+
+    def _is_fence(self, line):
+        return line.lstrip().startswith(FENCE)
+
+    def _add_line(self, line):
+        is_fence = self._is_fence(line)
+        while line:
+            fence_open_after = self._fence_open != is_fence
+            room = self.max_chars - self._page_len - (FENCE_CLOSE_RESERVE if fence_open_after else 0)
+            if len(line) <= room:
+                self._page.append(line)
+                self._page_len += len(line)
+                if is_fence:
+                    self._toggle_fence(line)
+                return
+            if self._page_len > self._header_len:
+                self._flush()
+                continue
+            # The line does not fit even on an empty page: split it, keeping one char for "\n"
+            split_at = self._split_point(line, room - 1)
+            part = line[:split_at]
+            if not part.endswith("\n"):
+                part += "\n"
+            self._page.append(part)
+            self._page_len += len(part)
+            if is_fence:
+                self._toggle_fence(part)
+                is_fence = False
+            self._flush()
+            line = line[split_at:]
+
+    def _toggle_fence(self, line):
+        """Called right after a fence line was added to the page."""
+        if self._fence_open:
+            self._fence_open = False
+            self._fence_opener = FENCE
+            self._fence_line = None
+        else:
+            self._fence_open = True
+            self._fence_opener = line.strip()
+            self._fence_line = len(self._page) - 1
+
+    def _flush(self, final=False):
+        if self._fence_open and self._fence_line == len(self._page) - 1:
+            # The block opened on the last line: it starts on the next page (or, at the end, not at all)
+            opener = self._page.pop()
+            self._page_len -= len(opener)
+        elif self._fence_open:
+            if self._page and not self._page[-1].endswith("\n"):
+                self._page.append("\n")
+            self._page.append(FENCE)
+        if self._page:
+            self._ready.append("".join(self._page))
+        self._page = []
+        self._page_len = 0
+        self._header_len = 0
+        self._fence_line = None
+        if self._fence_open and not final:
+            header = self._fence_opener + "\n"
+            self._page.append(header)
+            self._page_len = self._header_len = len(header)
+
+
+def paginate_stream(chunks, max_chars):
+    """
+    Generator version of StreamingPaginator: consumes an iterable of text chunks and
+    yields each page as soon as it is complete.
+    """
+    paginator = StreamingPaginator(max_chars)
+    for chunk in chunks:
+        yield from paginator.feed(chunk)
+    yield from paginator.finish()
@@ -0,0 +1,185 @@
+"""
+Sampling CPU profiler for a running Silas Blue process.
+A background thread snapshots every thread's Python stack (sys._current_frames) at a
+fixed interval, so it works on the GUI thread, the bot loop thread and executor threads
+without restarting anything and with little overhead. The result is written in the
+collapsed-stack format used by flamegraph.pl, speedscope and similar tools, and the
+busiest functions are summarised for the System Log.
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+# Leaf frames of threads that are only waiting (for work, I/O or a timer); skipped by default
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("connection.py", "_recv"),
+    ("connection.py", "_poll"),
+    ("connection.py", "poll"),
+    ("socketserver.py", "serve_forever"),
+    ("SilasBlue.py", "start_gui_and_bot"),  # The GUI thread idling in Qt's app.exec()
+    ("profiler.py", "profile_for"),  # The thread that asked for the profile, sleeping until it is done
+}
+
+MAX_SECONDS = 300
+_PROFILE_LOCK = threading.Lock()
+
+
+def _frame_label(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class Profile:
+    """Sampled stacks of one profiling run."""
+
+    def __init__(self, label, interval):
+        self.label = label
+        self.interval = interval
+        self.stacks = Counter()  # (thread name, frame labels from outermost to innermost) -> samples
+        self.samples = 0
+        self.started = time.time()
+        self.duration = 0.0
+
+    def collapsed(self):
+        """Lines of "thread;outer;...;inner count", the input format of flamegraph.pl."""
+        return [
+            ";".join((thread,) + frames) + f" {count}"
+            for (thread, frames), count in self.stacks.most_common()
+        ]
+
+    def write_collapsed(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.collapsed()) + "\n")
+        return path
+
+    def top_functions(self, limit=15):
+        """Functions by samples spent in them (self) and anywhere below them (total)."""
+        own = Counter()
+        total = Counter()
+        for (thread, frames), count in self.stacks.items():
+            if frames:
+                own[frames[-1]] += count
+            for frame in set(frames):  # Recursion counts once per sample
+                total[frame] += count
+        samples = sum(self.stacks.values()) or 1
+        return [
+            {
+                "function": function,
+                "self": count,
+                "total": total[function],
+                "self_percent": 100.0 * count / samples,
+                "total_percent": 100.0 * total[function] / samples,
+            }
+            for function, count in own.most_common(limit)
+        ]
+
+    def threads(self):
+        counts = Counter()
+        for (thread, frames), count in self.stacks.items():
+            counts[thread] += count
+        return dict(counts.most_common())
+
+    def summary(self, limit=15):
+        return {
+            "label": self.label,
+            "started": self.started,
+            "duration": self.duration,
+            "interval": self.interval,
+            "samples": self.samples,
+            "busy_samples": sum(self.stacks.values()),
+            "threads": self.threads(),
+            "top": self.top_functions(limit),
+        }
+
+
+class SamplingProfiler:
+    """Samples all threads of this process every `interval` seconds until stop()."""
+
+    def __init__(self, label="process", interval=0.005, include_idle=False):
+        self.profile = Profile(label, interval)
+        self.include_idle = include_idle
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.profile
+
+    def _run(self):
+        profile = self.profile
+        own_id = threading.get_ident()
+        names = {}
+        started = time.perf_counter()
+        while not self._stop.wait(profile.interval):
+            frames = sys._current_frames()
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+                if not self.include_idle and leaf in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                thread = names.get(thread_id, f"thread-{thread_id}").replace(";", ",")  # ";" separates frames
+                profile.stacks[(thread, tuple(stack))] += 1
+            profile.samples += 1
+            del frames
+        profile.duration = time.perf_counter() - started
+
+
+def profile_for(seconds, interval=0.005, label="process", include_idle=False):
+    """Profiles this process for `seconds` and returns the Profile."""
+    profiler = SamplingProfiler(label, interval, include_idle).start()
+    time.sleep(seconds)
+    return profiler.stop()
+
+def run_profile(seconds=10, interval=0.005, label="process", include_idle=False, limit=15):
+    """
+    Profiles this process and writes logs/profile-<label>-<time>.collapsed.
+    Returns the summary plus the file path, or None if a profile is already running.
+    """
+    seconds = min(max(float(seconds), 0.1), MAX_SECONDS)
+    if not _PROFILE_LOCK.acquire(blocking=False):
+        return None
+    try:
+        profile = profile_for(seconds, float(interval), label, include_idle)
+    finally:
+        _PROFILE_LOCK.release()
+    path = os.path.join("logs", f"profile-{label}-{time.strftime('%Y%m%d-%H%M%S')}.collapsed")
+    profile.write_collapsed(path)
+    summary = profile.summary(limit)
+    summary["path"] = os.path.abspath(path)
+    return summary
+
+def format_summary(summary):
+    """Text table of a run_profile() summary, one line per function."""
+    busy = summary["busy_samples"]
+    threads = ", ".join(f"{name} {100.0 * count / (busy or 1):.0f}%" for name, count in summary["threads"].items())
+    lines = [
+        f"CPU profile of {summary['label']}: {summary['duration']:.1f}s, {summary['samples']} samples, "
+        f"{busy} busy thread samples ({threads or 'all idle'})",
+        f"{'self %':>7} {'total %':>8}  function",
+    ]
+    for entry in summary["top"]:
+        lines.append(f"{entry['self_percent']:>6.1f}% {entry['total_percent']:>7.1f}%  {entry['function']}")
+    lines.append(f"Flamegraph input: {summary['path']}")
+    return "\n".join(lines)
@@ -0,0 +1,161 @@
+"""
+Durable prompt journal for Silas Blue.
+Records every accepted prompt in SQLite with its state (queued, running, replied,
+cancelled), so prompts that were lost to a crash or restart can be answered on startup.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+from prompt_queue import PromptItem
+
+logger = logging.getLogger("silasblue")
+
+# Finished states; rows in these states are only kept for compaction bookkeeping
+TERMINAL_STATES = ("replied", "cancelled", "expired")
+
+
+class PromptJournal:
+    """
+    SQLite-backed record of accepted prompts, keyed by Discord message ID.
+
+    Storage is bounded: finished rows older than `keep_seconds` are deleted, and at most
+    `max_rows` rows are kept (oldest finished rows go first). Compaction runs on open and
+    every `compact_every` new prompts.
+    """
+
+    def __init__(self, path, max_rows=10000, keep_seconds=86400, compact_every=500):
+        self.path = path
+        self.max_rows = max_rows
+        self.keep_seconds = keep_seconds
+        self.compact_every = compact_every
+        self._since_compact = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")  # Durable across crashes of the bot, cheap per write
+        self._db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS prompts (
+                message_id INTEGER PRIMARY KEY,
+                channel_id INTEGER NOT NULL,
+                guild_id INTEGER,
+                author_id INTEGER NOT NULL,
+                author TEXT,
+                prompt TEXT NOT NULL,
+                model TEXT,
+                state TEXT NOT NULL,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS prompts_state ON prompts (state, created)")
+        self.compact()
+
+    def record_queued(self, item):
+        """Records an accepted prompt (or puts a resumed one back in the queued state)."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("""
+                INSERT INTO prompts (message_id, channel_id, guild_id, author_id, author, prompt, model, state, created, updated)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'queued', ?, ?)
+                ON CONFLICT(message_id) DO UPDATE SET state = 'queued', updated = excluded.updated
+            """, (item.message_id, item.channel_id, item.guild_id, item.author_id, item.author,
+                  item.prompt, item.model, item.enqueued_at, now))
+            self._since_compact += 1
+            compact = self._since_compact >= self.compact_every
+        if compact:
+            self.compact()
+
+    def set_state(self, message_id, state):
+        with self._lock:
+            self._db.execute("UPDATE prompts SET state = ?, updated = ? WHERE message_id = ?",
+                             (state, time.time(), message_id))
+
+    def pending(self, max_age):
+        """
+        Returns PromptItems that were never answered and are younger than `max_age` seconds,
+        oldest first. Older unanswered prompts are marked expired.
+        """
+        cutoff = time.time() - max_age
+        with self._lock:
+            self._db.execute("UPDATE prompts SET state = 'expired', updated = ? WHERE state IN ('queued', 'running') AND created < ?",
+                             (time.time(), cutoff))
+            rows = self._db.execute("""
+                SELECT message_id, channel_id, guild_id, author_id, author, prompt, model, created
+                FROM prompts WHERE state IN ('queued', 'running') ORDER BY created
+            """).fetchall()
+        items = []
+        for message_id, channel_id, guild_id, author_id, author, prompt, model, created in rows:
+            item = PromptItem(message_id, channel_id, guild_id, author_id, author, prompt, model)
+            item.enqueued_at = created
+            items.append(item)
+        return items
+
+    def sample_prompts(self, limit):
+        """Up to `limit` distinct prompt texts picked at random (for benchmarks)."""
+        with self._lock:
+            rows = self._db.execute("SELECT DISTINCT prompt FROM prompts ORDER BY RANDOM() LIMIT ?", (limit,)).fetchall()
+        return [prompt for (prompt,) in rows]
+
+    def compact(self):
+        """Deletes old finished rows, enforces `max_rows` and returns freed pages to the OS."""
+        placeholders = ",".join("?" * len(TERMINAL_STATES))
+        with self._lock:
+            self._since_compact = 0
+            self._db.execute(f"DELETE FROM prompts WHERE state IN ({placeholders}) AND updated < ?",
+                             (*TERMINAL_STATES, time.time() - self.keep_seconds))
+            (count,) = self._db.execute("SELECT COUNT(*) FROM prompts").fetchone()
+            excess = count - self.max_rows
+            if excess > 0:
+                self._db.execute(f"""
+                    DELETE FROM prompts WHERE message_id IN (
+                        SELECT message_id FROM prompts ORDER BY state IN ({placeholders}) DESC, created LIMIT ?
+                    )
+                """, (*TERMINAL_STATES, excess))
+            self._db.execute("PRAGMA incremental_vacuum")
+
+    def stats(self):
+        with self._lock:
+            rows = self._db.execute("SELECT state, COUNT(*) FROM prompts GROUP BY state").fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_JOURNAL = None
+_DISABLED = object()  # _JOURNAL once app_config.json said no, so prompts do not read it again
+_JOURNAL_LOCK = threading.Lock()
+
+def get_prompt_journal():
+    """
+    Returns the journal if `prompt_journal_enabled` is set in app_config.json, else None.
+    Other settings: prompt_journal_max_rows, prompt_journal_keep_seconds.
+    """
+    global _JOURNAL
+    with _JOURNAL_LOCK:
+        if _JOURNAL is None:
+            from utils import load_app_config, get_resource_path
+            app_config = load_app_config()
+            if not app_config.get("prompt_journal_enabled", False):
+                _JOURNAL = _DISABLED
+            else:
+                _JOURNAL = PromptJournal(
+                    os.path.join(get_resource_path("config"), "prompt_journal.db"),
+                    max_rows=app_config.get("prompt_journal_max_rows", 10000),
+                    keep_seconds=app_config.get("prompt_journal_keep_seconds", 86400),
+                )
+        return None if _JOURNAL is _DISABLED else _JOURNAL
+
+def reset_prompt_journal():
+    """Reads prompt_journal_enabled again on the next get_prompt_journal(), if it was off."""
+    global _JOURNAL
+    with _JOURNAL_LOCK:
+        if _JOURNAL is _DISABLED:
+            _JOURNAL = None
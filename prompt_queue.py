@@ -0,0 +1,195 @@
+"""
+Prompt queue for Silas Blue.
+Limits how many prompts are generated at once; the rest wait in FIFO order. Items only
+hold IDs and plain values, so the queue can be listed, cancelled and handed over remotely.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger("silasblue")
+
+
+class PromptItem:
+    """One accepted prompt, identified by its Discord message ID."""
+
+    def __init__(self, message_id, channel_id, guild_id, author_id, author, prompt, model):
+        self.message_id = message_id
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.author_id = author_id
+        self.author = author
+        self.prompt = prompt
+        self.model = model
+        self.state = "queued"
+        self.enqueued_at = time.time()
+        self.started_at = None
+
+    @classmethod
+    def from_message(cls, message, model):
+        return cls(
+            message.id,
+            message.channel.id,
+            message.guild.id if message.guild else None,
+            message.author.id,
+            str(message.author),
+            message.content,
+            model
+        )
+
+    def to_dict(self):
+        now = time.time()
+        return {
+            "message_id": self.message_id,
+            "channel_id": self.channel_id,
+            "guild_id": self.guild_id,
+            "author_id": self.author_id,
+            "author": self.author,
+            "prompt": self.prompt,
+            "model": self.model,
+            "state": self.state,
+            "enqueued_at": self.enqueued_at,
+            "waited": (self.started_at or now) - self.enqueued_at,
+            "running_for": now - self.started_at if self.started_at else None,
+        }
+
+
+class PromptQueue:
+    """
+    Runs at most `max_concurrent` prompts at a time (0 = no limit); the rest wait in order.
+    Must be used from the bot's event loop.
+    """
+
+    def __init__(self, max_concurrent=4):
+        self.max_concurrent = max_concurrent
+        self._waiting = OrderedDict()  # message ID -> (PromptItem, Future)
+        self._running = {}  # message ID -> PromptItem
+        self._idle = None  # asyncio.Event for join(), created on first use
+
+    def _has_slot(self):
+        return not self.max_concurrent or len(self._running) < self.max_concurrent
+
+    async def run(self, item, handler):
+        """
+        Waits for a free slot, then awaits handler(). Returns False if the item was
+        cancelled while it was still queued, True once the handler has run.
+        """
+        if not self._waiting and self._has_slot():
+            self._start(item)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._waiting[item.message_id] = (item, future)
+            try:
+                if not await future:
+                    return False
+            except asyncio.CancelledError:
+                self._waiting.pop(item.message_id, None)
+                if self._running.pop(item.message_id, None) is not None:
+                    self._wake_next()
+                raise
+        try:
+            await handler()
+        finally:
+            self._running.pop(item.message_id, None)
+            self._wake_next()
+            if not self._running and self._idle is not None:
+                self._idle.set()
+        return True
+
+    def _start(self, item):
+        # The slot is taken here, so nothing can overtake a prompt that was just woken
+        item.state = "running"
+        item.started_at = time.time()
+        self._running[item.message_id] = item
+
+    def _wake_next(self):
+        while self._waiting and self._has_slot():
+            _, (item, future) = self._waiting.popitem(last=False)
+            if not future.done():
+                self._start(item)
+                future.set_result(True)
+
+    def cancel(self, message_id):
+        """Drops a queued prompt. Returns True if it was waiting."""
+        entry = self._waiting.pop(message_id, None)
+        if entry is None:
+            return False
+        item, future = entry
+        item.state = "cancelled"
+        if not future.done():
+            future.set_result(False)
+        logger.info(f"Queued prompt {message_id} cancelled.")
+        return True
+
+    def cancel_waiting(self):
+        """Drops every queued prompt and returns their items."""
+        items = [item for item, _ in self._waiting.values()]
+        for item in items:
+            self.cancel(item.message_id)
+        return items
+
+    def running_ids(self):
+        return list(self._running)
+
+    def has(self, message_id):
+        """Whether the prompt is queued or running here."""
+        return message_id in self._waiting or message_id in self._running
+
+    async def join(self, timeout=None):
+        """Waits until no prompt is running. Returns False if `timeout` expired first."""
+        if not self._running:
+            return True
+        if self._idle is None:
+            self._idle = asyncio.Event()
+        self._idle.clear()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    @property
+    def depth(self):
+        return len(self._waiting)
+
+    def snapshot(self):
+        return {
+            "max_concurrent": self.max_concurrent,
+            "depth": self.depth,
+            "running": [item.to_dict() for item in self._running.values()],
+            "queued": [item.to_dict() for item, _ in self._waiting.values()],
+        }
+
+
+class PromptHandover:
+    """
+    Prompts passed from a draining bot instance to its replacement during a restart.
+    Thread-safe, since the two instances run on different event loops. Once the new
+    instance has taken the items, the handover is closed and put() returns False.
+    """
+
+    def __init__(self):
+        self._items = []
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def put(self, item):
+        with self._lock:
+            if self._closed:
+                return False
+            self._items.append(item)
+            return True
+
+    def take_all(self):
+        with self._lock:
+            items, self._items = self._items, []
+            self._closed = True
+            return items
+
+    @property
+    def closed(self):
+        with self._lock:
+            return self._closed
@@ -0,0 +1,270 @@
+"""
+Multi-process sharding for Silas Blue.
+Splits the bot's Discord shards into groups and runs each group as an AutoShardedBot in
+its own process. Guild configs are shared through the config directory, and every process
+routes prompts to the same Ollama backends, counting its requests in a table shared
+through a manager process so routing sees the load of all groups. Each group reports
+shard health back and runs control commands (config reloads, queue, cancel) sent by the
+parent, so they reach every group instead of only the parent's idle copy.
+"""
+
+import os
+import time
+import queue
+import signal
+import itertools
+import logging
+import threading
+import multiprocessing
+
+import requests
+
+logger = logging.getLogger("silasblue")
+
+# Seconds between health reports from each shard group
+REPORT_INTERVAL = 5.0
+# A group that has not reported for this long is shown as unresponsive
+REPORT_STALE_AFTER = 30.0
+# Seconds to wait for every group to answer a control command
+COMMAND_TIMEOUT = 10.0
+
+
+def fetch_recommended_shards(token):
+    """Asks Discord how many shards the bot should use. Returns 1 if that fails."""
+    try:
+        resp = requests.get(
+            "https://discord.com/api/v10/gateway/bot",
+            headers={"Authorization": f"Bot {token}"},
+            timeout=10
+        )
+        resp.raise_for_status()
+        return int(resp.json().get("shards", 1))
+    except Exception as e:
+        logger.error(f"Failed to fetch the recommended shard count: {e}")
+        return 1
+
+
+def split_shards(shard_count, processes):
+    """Splits shard IDs 0..shard_count-1 into at most `processes` contiguous groups."""
+    processes = max(1, min(processes, shard_count))
+    size, extra = divmod(shard_count, processes)
+    groups = []
+    start = 0
+    for i in range(processes):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(list(range(start, end)))
+        start = end
+    return groups
+
+
+def _serve_commands(index, commands, reports):
+    """Shard group thread: runs control commands from the parent through bot_control and reports the results."""
+    from bot_control import dispatch, ControlError
+    while True:
+        try:
+            request = commands.get()
+        except (EOFError, OSError):
+            return
+        if request is None:
+            return
+        request_id, name, args = request
+        reply = {"group": index, "reply": request_id}
+        try:
+            reply["result"] = dispatch(name, args)
+        except ControlError as e:
+            reply["error"] = str(e)
+        except Exception as e:
+            logger.error(f"Shard group command {name} failed: {e}")
+            reply["error"] = f"Error: {e}"
+        try:
+            reports.put(reply, timeout=5)
+        except Exception:
+            pass  # The parent is gone
+
+
+def _run_shard_group(index, shard_ids, shard_count, reports, stop_event, commands, shared_load):
+    """Process entry point: runs one AutoShardedBot for `shard_ids` until `stop_event` is set."""
+    import asyncio
+    # Ctrl+C reaches the whole process group; the parent stops the groups through stop_event.
+    # A group killed by it would also leave the parent stuck setting that event.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    os.makedirs("logs", exist_ok=True)
+    logging.basicConfig(
+        filename="logs/silasblue.log",
+        filemode="a",
+        format=f"%(asctime)s %(levelname)s:[shards {shard_ids[0]}-{shard_ids[-1]}] %(message)s",
+        level=logging.INFO
+    )
+    import bot_core
+    import model_stats
+    from ollama_pool import get_backend_pool
+    from ollama_supervisor import register_supervised_backends
+
+    model_stats.use_stats_file(f"model_stats-group{index}.json")  # Merged by the model_stats command
+    # Instances supervised by the parent process are not registered in this process yet
+    pool = get_backend_pool()
+    register_supervised_backends(pool)
+    pool.share_load(*shared_load)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    bot_core._bot_loop = loop
+    bot = bot_core._bot_instance = bot_core.create_bot(shard_ids=shard_ids, shard_count=shard_count)
+
+    async def report_health():
+        while True:
+            try:
+                reports.put_nowait({
+                    "group": index,
+                    "pid": os.getpid(),
+                    "time": time.time(),
+                    "shards": bot_core.get_shard_health(bot),
+                    "guilds": [(g.name, g.id, g.shard_id) for g in bot.guilds]
+                })
+            except Exception:
+                pass  # The parent is gone or the queue is full; try again next round
+            await asyncio.sleep(REPORT_INTERVAL)
+
+    async def main():
+        reporter = asyncio.create_task(report_health())
+        threading.Thread(target=_serve_commands, args=(index, commands, reports), name="shard-commands", daemon=True).start()
+        try:
+            await bot_core._run_bot(stop_event, bot)
+        finally:
+            reporter.cancel()
+
+    try:
+        loop.run_until_complete(main())
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+class ShardManager:
+    """
+    Runs the bot's shards as `processes` separate processes and collects their health.
+
+    Each process is started with the spawn method, so it imports bot_core fresh and reads
+    the same token, guild configs and Ollama settings from the config directory.
+    """
+
+    def __init__(self, shard_count, processes):
+        self.shard_count = shard_count
+        self.groups = split_shards(shard_count, processes)
+        self._ctx = multiprocessing.get_context("spawn")
+        self._reports = self._ctx.Queue(maxsize=1000)
+        self._stop_event = self._ctx.Event()
+        self._processes = []
+        self._commands = []  # One queue per group, for request()
+        self._manager = None  # Holds the Ollama load table shared by the groups
+        self._latest = {}
+        self._replies = {}  # request ID -> {group: reply}
+        self._reply_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._replied = threading.Condition(self._lock)
+        self._collector = None
+
+    def start(self):
+        self._stop_event.clear()
+        self._processes = []
+        self._manager = self._ctx.Manager()
+        shared_load = (self._manager.dict(), self._manager.Lock())
+        self._commands = [self._ctx.Queue() for _ in self.groups]
+        for index, shard_ids in enumerate(self.groups):
+            process = self._ctx.Process(
+                target=_run_shard_group,
+                args=(index, shard_ids, self.shard_count, self._reports, self._stop_event,
+                      self._commands[index], shared_load),
+                name=f"silasblue-shards-{index}",
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+            logger.info(f"Started shard group {index} (shards {shard_ids[0]}-{shard_ids[-1]} of {self.shard_count}, PID {process.pid}).")
+        self._collector = threading.Thread(target=self._collect_reports, daemon=True)
+        self._collector.start()
+
+    def stop(self, timeout=15):
+        self._stop_event.set()
+        for commands in self._commands:
+            commands.put(None)  # Ends the group's command thread
+        for process in self._processes:
+            process.join(timeout=timeout)
+            if process.is_alive():
+                logger.warning(f"Shard group process {process.pid} did not stop in time; terminating.")
+                process.terminate()
+        self._processes = []
+        self._commands = []
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+        with self._lock:
+            self._latest.clear()
+            self._replies.clear()
+        logger.info("All shard groups stopped.")
+
+    def is_running(self):
+        return any(process.is_alive() for process in self._processes)
+
+    def _collect_reports(self):
+        while not self._stop_event.is_set():
+            try:
+                report = self._reports.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            with self._lock:
+                if "reply" in report:
+                    replies = self._replies.get(report["reply"])
+                    if replies is not None:  # Otherwise the request timed out already
+                        replies[report["group"]] = report
+                        self._replied.notify_all()
+                else:
+                    self._latest[report["group"]] = report
+
+    def shard_health(self):
+        """Returns shard health entries from every group; unresponsive groups are marked as such."""
+        now = time.time()
+        health = []
+        with self._lock:
+            latest = dict(self._latest)
+        for index, shard_ids in enumerate(self.groups):
+            report = latest.get(index)
+            alive = index < len(self._processes) and self._processes[index].is_alive()
+            if report is None or not alive or now - report["time"] > REPORT_STALE_AFTER:
+                for shard_id in shard_ids:
+                    health.append({"shard_id": shard_id, "latency": None, "closed": True, "group": index, "responsive": False})
+                continue
+            for shard in report["shards"]:
+                health.append({**shard, "group": index, "responsive": True})
+        return health
+
+    def guilds(self):
+        """Returns (name, id, shard_id) for every guild reported by the shard groups."""
+        with self._lock:
+            return [guild for report in self._latest.values() for guild in report["guilds"]]
+
+    def request(self, name, args=None, timeout=COMMAND_TIMEOUT):
+        """
+        Runs bot_control command `name` in every running shard group and returns
+        {group: {"result": ...} or {"error": "..."}}. Groups that do not answer within
+        `timeout` seconds are left out.
+        """
+        groups = [index for index, process in enumerate(self._processes) if process.is_alive()]
+        with self._lock:
+            request_id = next(self._reply_ids)
+            replies = self._replies[request_id] = {}
+        for index in groups:
+            self._commands[index].put((request_id, name, args or {}))
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while len(replies) < len(groups):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"Shard groups {sorted(set(groups) - set(replies))} did not answer {name} in time.")
+                    break
+                self._replied.wait(remaining)
+            del self._replies[request_id]
+        return {index: replies[index] for index in sorted(replies)}
+
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+
+@pytest.fixture(autouse=True)
+def isolated_config(tmp_path, monkeypatch):
+    """Keeps app_config.json, model_stats.json, the prompt journal and logs written by tests out of the repo."""
+    import utils
+    import model_stats
+    import prompt_journal
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(utils, "CONFIG_DIR", str(tmp_path / "config"))
+    monkeypatch.setattr(prompt_journal, "_JOURNAL", None)
+    monkeypatch.setattr(model_stats, "_MODEL_STATS", model_stats.ModelStats(str(tmp_path / "config" / "model_stats.json")))
+    return tmp_path
@@ -0,0 +1,44 @@
+import asyncio
+import json
+
+import aiohttp
+
+import bot_control
+from admin_api import start_admin_api
+from utils import load_app_config, save_app_config
+
+
+def _request(method, path, **kwargs):
+    async def run():
+        api = await start_admin_api()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.request(method, f"http://127.0.0.1:{api.port}{path}", **kwargs) as resp:
+                    return resp.status, await resp.text()
+        finally:
+            await api.stop()
+    return asyncio.run(run())
+
+
+def test_token_is_generated_and_required(monkeypatch):
+    save_app_config({"admin_api_port": 18765})
+    monkeypatch.setitem(bot_control.COMMANDS, "status", lambda: "up")
+    status, _ = _request("GET", "/status")
+    assert status == 401
+    token = load_app_config()["admin_api_token"]
+    status, body = _request("GET", "/status", headers={"Authorization": f"Bearer {token}"})
+    assert status == 200
+    assert json.loads(body) == {"ok": True, "result": "up"}
+
+
+def test_form_bodies_are_rejected(monkeypatch):
+    save_app_config({"admin_api_port": 18765, "admin_api_token": "secret"})
+    calls = []
+    monkeypatch.setitem(bot_control.COMMANDS, "reload_config", lambda guild_id=None: calls.append(guild_id))
+    headers = {"Authorization": "Bearer secret"}
+    status, _ = _request("POST", "/reload", data="guild_id=1", headers={**headers, "Content-Type": "text/plain"})
+    assert status == 415
+    assert calls == []
+    status, _ = _request("POST", "/reload", json={"guild_id": 1}, headers=headers)
+    assert status == 200
+    assert calls == [1]
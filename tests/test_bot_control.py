@@ -0,0 +1,34 @@
+import pytest
+
+import benchmark
+import bot_control
+from bot_control import ControlError, dispatch
+
+
+class _Pool:
+    def list_models(self):
+        return ["llama3", "mistral"]
+
+
+@pytest.fixture
+def started(monkeypatch):
+    runs = []
+    monkeypatch.setattr(bot_control, "get_backend_pool", lambda: _Pool())
+    monkeypatch.setattr(benchmark, "run_benchmark", lambda models, replay: runs.append((models, replay)))
+    return runs
+
+
+@pytest.mark.parametrize("models", ["llama3", [1, 2], {"llama3": True}])
+def test_bench_rejects_models_that_are_not_a_list_of_names(started, models):
+    with pytest.raises(ControlError, match="list of model names"):
+        dispatch("bench", {"models": models})
+    assert started == []
+
+
+def test_bench_rejects_models_that_are_not_installed(started):
+    with pytest.raises(ControlError, match="Unknown models: phi3"):
+        dispatch("bench", {"models": ["llama3", "phi3"]})
+
+
+def test_bench_defaults_to_every_installed_model(started):
+    assert dispatch("bench", {"replay": "2"}) == {"started": True, "models": ["llama3", "mistral"]}
@@ -0,0 +1,37 @@
+import asyncio
+import threading
+
+from loop_monitor import start_loop_monitor
+
+
+def _run_loop():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    return loop, thread
+
+
+def _start_monitor(loop):
+    async def start():
+        return start_loop_monitor(asyncio.get_running_loop())
+    return asyncio.run_coroutine_threadsafe(start(), loop).result(timeout=5)
+
+
+def test_stopping_one_instances_monitor_leaves_the_other_running():
+    old_loop, old_thread = _run_loop()
+    new_loop, new_thread = _run_loop()
+    try:
+        old_monitor = _start_monitor(old_loop)
+        new_monitor = _start_monitor(new_loop)
+        old_task = old_monitor._task
+        old_monitor.stop()  # From this thread, not the monitored loop's
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), old_loop).result(timeout=5)
+        assert old_task.cancelled()
+        assert new_monitor._task is not None and not new_monitor._task.done()
+        assert not new_monitor._stop.is_set()
+        new_monitor.stop()
+    finally:
+        for loop, thread in ((old_loop, old_thread), (new_loop, new_thread)):
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=5)
+            loop.close()
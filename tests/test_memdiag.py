@@ -0,0 +1,20 @@
+import tracemalloc
+
+from memdiag import MemoryDiagnostics
+
+
+def test_stopping_a_replaced_schedule_keeps_the_current_one():
+    diagnostics = MemoryDiagnostics()
+    try:
+        old = diagnostics.start_schedule(3600, frames=1)
+        new = diagnostics.start_schedule(3600, frames=1)  # The replacement bot instance
+        assert old.is_set()
+        diagnostics.stop_schedule(old)
+        assert not new.is_set()
+        assert diagnostics.interval == 3600
+        diagnostics.stop_schedule(new)
+        assert new.is_set()
+        assert diagnostics.interval == 0
+    finally:
+        diagnostics.stop_tracing()
+        tracemalloc.stop()
@@ -0,0 +1,20 @@
+from metrics import Registry, Gauge
+
+
+def test_gauge_function_is_read_at_render_time():
+    registry = Registry()
+    gauge = registry.register(Gauge("test_depth", "Items waiting"))
+    items = ["a", "b"]
+    gauge.set_function(lambda: len(items))
+    assert "test_depth 2" in registry.render()
+    items.append("c")
+    assert "test_depth 3" in registry.render()
+
+
+def test_gauge_function_errors_are_logged(caplog):
+    registry = Registry()
+    gauge = registry.register(Gauge("test_broken", "Not a callable"))
+    gauge.set_function(5)
+    with caplog.at_level("WARNING", logger="silasblue"):
+        registry.render()
+    assert "test_broken" in caplog.text
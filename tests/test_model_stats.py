@@ -0,0 +1,51 @@
+import json
+
+import model_stats
+from bot_control import dispatch
+from model_stats import ModelStats
+
+
+def _chunk(seconds, tokens=100):
+    return {"eval_count": tokens, "eval_duration": int(seconds * 1e9), "total_duration": int(seconds * 1e9)}
+
+
+def test_merge_combines_counts_and_percentiles():
+    fast, slow = ModelStats(), ModelStats()
+    for _ in range(90):
+        fast.record("llama3", _chunk(1.0))
+    for _ in range(10):
+        slow.record("llama3", _chunk(10.0))
+    combined = ModelStats()
+    combined.merge(fast.to_dict())
+    combined.merge(slow.to_dict())
+    latency = combined.summary()["llama3"]["latency_seconds"]
+    assert combined.summary()["llama3"]["generations"] == 100
+    assert combined.summary()["llama3"]["tokens"] == 10000
+    assert latency["min"] == 1.0 and latency["max"] == 10.0
+    assert abs(latency["p50"] - 1.0) < 0.1
+    assert abs(latency["p99"] - 10.0) < 1.0
+
+
+def test_stats_files_are_kept_per_process(tmp_path):
+    model_stats._MODEL_STATS = None
+    model_stats.use_stats_file("model_stats-group1.json")
+    try:
+        model_stats.get_model_stats().record("llama3", _chunk(2.0))
+        model_stats.get_model_stats().flush()
+    finally:
+        model_stats.use_stats_file("model_stats.json")
+    saved = json.loads((tmp_path / "config" / "model_stats-group1.json").read_text())
+    assert saved["llama3"]["generations"] == 1
+    assert not (tmp_path / "config" / "model_stats.json").exists()
+
+
+def test_model_stats_command_merges_shard_groups(monkeypatch):
+    groups = []
+    for seconds in (1.0, 3.0):
+        stats = ModelStats()
+        stats.record("llama3", _chunk(seconds))
+        groups.append(stats.to_dict())
+    monkeypatch.setattr("bot_control._in_shard_groups", lambda name, args=None: groups if name == "model_stats_data" else None)
+    summary = dispatch("model_stats", {})
+    assert summary["llama3"]["generations"] == 2
+    assert summary["llama3"]["latency_seconds"]["max"] == 3.0
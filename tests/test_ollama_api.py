@@ -0,0 +1,46 @@
+import threading
+import time
+
+import benchmark
+from bench.mock_ollama import MockOllama
+from model_stats import get_model_stats
+from ollama_api import OllamaClient, Generation
+
+
+def test_cancel_while_the_model_loads_aborts_the_request():
+    with MockOllama(load_time=5.0, first_token_latency=0.01) as mock:
+        client = OllamaClient(mock.url)
+        generation = Generation()
+        chunks = []
+        def consume():
+            chunks.extend(client.stream_prompt("hi", "mock-llama", generation))
+        consumer = threading.Thread(target=consume)
+        started = time.monotonic()
+        consumer.start()
+        time.sleep(0.3)  # The mock is still "loading"; no response header has been sent
+        generation.cancel("timeout")
+        consumer.join(timeout=2)
+        assert not consumer.is_alive()
+        assert time.monotonic() - started < 2
+        assert chunks == []
+        assert client.transport.breaker.state == "closed"
+        assert client.transport.breaker.failures == 0
+
+
+def test_cancel_before_the_request_starts_sends_nothing():
+    with MockOllama() as mock:
+        client = OllamaClient(mock.url)
+        generation = Generation()
+        generation.cancel("stopped")
+        assert list(client.stream_prompt("hi", "mock-llama", generation)) == []
+        assert mock.requests == 0
+
+
+def test_benchmark_runs_are_left_out_of_model_stats():
+    with MockOllama(tokens_per_second=500, first_token_latency=0.01) as mock:
+        client = OllamaClient(mock.url)
+        run = benchmark._run_prompt(client, "mock-llama", "hi")
+        assert run["tokens_per_second"] > 0
+        assert get_model_stats().summary() == {}
+        list(client.stream_prompt("hi", "mock-llama", options={"num_predict": 3}))
+        assert list(get_model_stats().summary()) == ["mock-llama"]
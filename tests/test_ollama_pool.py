@@ -0,0 +1,139 @@
+import contextvars
+import threading
+import time
+
+import pytest
+
+from bench.mock_ollama import MockOllama
+from ollama_api import Generation
+from ollama_pool import OllamaBackendPool
+from tracing import start_trace
+
+
+@pytest.fixture
+def mock():
+    with MockOllama(tokens_per_second=500, first_token_latency=0.01) as server:
+        yield server
+
+
+def test_stream_prompt_records_ollama_spans_on_the_callers_trace(mock):
+    pool = OllamaBackendPool([{"url": mock.url}])
+    pool.check_health()
+
+    def run():
+        trace = start_trace("prompt")
+        chunks = list(pool.stream_prompt("hi", "mock-llama", options={"num_predict": 5}))
+        return trace, chunks
+
+    trace, chunks = contextvars.copy_context().run(run)
+    assert chunks[-1]["done"]
+    names = {span["name"] for span in trace.spans}
+    assert {"ollama.load", "ollama.prompt_eval", "ollama.eval"} <= names
+    assert trace.attrs["eval_count"] == 5
+
+
+def test_pools_sharing_load_route_by_the_combined_count():
+    counts, lock = {}, threading.Lock()
+    first = OllamaBackendPool(["http://a:11434", "http://b:11434"])
+    second = OllamaBackendPool(["http://a:11434", "http://b:11434"])
+    first.share_load(counts, lock)
+    second.share_load(counts, lock)
+    first._acquire(first.get_backend("http://a:11434"))
+    # The second pool has no requests of its own, but sees the first one's
+    assert second.pick_backend("mock-llama").base_url == "http://b:11434"
+    first._release(first.get_backend("http://a:11434"), "mock-llama", served=False)
+    assert counts == {"http://a:11434": 0}
+
+
+def test_timeout_during_model_load_ends_the_stream():
+    with MockOllama(load_time=5.0) as slow:
+        pool = OllamaBackendPool([{"url": slow.url}])
+        pool.check_health()
+        generation = Generation()
+        timer = threading.Timer(0.3, generation.cancel, ("timeout",))
+        started = time.monotonic()
+        timer.start()
+        chunks = list(pool.stream_prompt("hi", "mock-llama", generation))
+        assert chunks == []
+        assert time.monotonic() - started < 2
+        assert generation.reason == "timeout"
+
+
+def _pool(*mocks, **kwargs):
+    pool = OllamaBackendPool([{"url": mock.url} for mock in mocks], **kwargs)
+    pool.check_health()
+    return pool
+
+
+def test_pick_backend_prefers_loaded_then_installed_then_least_loaded():
+    with MockOllama(models=("other",)) as other, MockOllama() as installed, MockOllama() as loaded:
+        loaded.loaded.add("mock-llama")
+        pool = _pool(other, installed, loaded)
+        assert pool.pick_backend("mock-llama").base_url == loaded.url
+
+        loaded.loaded.clear()  # Ollama unloaded it
+        busy = pool.get_backend(installed.url)
+        pool._acquire(busy)
+        pool.check_health()
+        # Both have it installed: the one with fewer requests in flight wins
+        assert pool.pick_backend("mock-llama").base_url == loaded.url
+        pool._release(busy, "other", served=False)
+
+        # Installed nowhere: any backend, least loaded first
+        pool._acquire(pool.get_backend(other.url))
+        pool._acquire(pool.get_backend(loaded.url))
+        assert pool.pick_backend("phi3").base_url == installed.url
+
+
+def test_failed_health_checks_drain_a_backend():
+    down = MockOllama().start()
+    with MockOllama() as up:
+        down.loaded.add("mock-llama")
+        pool = _pool(down, up, failure_threshold=2)
+        assert pool.pick_backend("mock-llama").base_url == down.url
+
+        down.stop()
+        pool.get_backend(down.url).client.transport.session.close()  # Drop kept-alive connections too
+        pool.check_health()
+        assert pool.get_backend(down.url).healthy  # One failed check is not enough
+        pool.check_health()
+        assert not pool.get_backend(down.url).healthy
+        assert pool.pick_backend("mock-llama").base_url == up.url
+        chunks = list(pool.stream_prompt("hi", "mock-llama", options={"num_predict": 3}))
+        assert chunks[-1]["done"]
+        assert up.requests == 1
+
+
+def test_hedged_stream_uses_the_first_backend_to_answer():
+    with MockOllama(first_token_latency=5.0) as slow, MockOllama(first_token_latency=0.01) as fast:
+        slow.loaded.add("mock-llama")
+        fast.loaded.add("mock-llama")
+        pool = _pool(slow, fast, hedge_enabled=True, hedge_default_delay=0.2, hedge_budget=1.0)
+        assert pool.pick_backend("mock-llama").base_url == slow.url
+
+        started = time.monotonic()
+        chunks = list(pool.stream_prompt("hi", "mock-llama", options={"num_predict": 3}))
+        assert time.monotonic() - started < 3
+        assert chunks[-1]["done"] and chunks[-1]["eval_count"] == 3
+        assert pool.hedge_stats()["hedged_requests"] == 1
+        assert fast.requests == 1 and slow.requests == 1
+        # The losing attempt is aborted while still waiting for headers, and gives its slot back
+        deadline = time.monotonic() + 2
+        while pool.get_backend(slow.url).outstanding and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert pool.get_backend(slow.url).outstanding == 0
+
+
+def test_only_a_finished_generation_marks_the_model_loaded():
+    with MockOllama(first_token_latency=0.01) as mock:
+        pool = _pool(mock)
+        backend = pool.get_backend(mock.url)
+        with pytest.raises(Exception):
+            list(pool.stream_prompt("hi", "phi3"))  # Not installed: 404
+        assert "phi3" not in backend.loaded_models
+        chunks = list(pool.stream_prompt("hi", "mock-llama", options={"num_predict": 3}))
+        assert chunks[-1]["done"]
+        deadline = time.monotonic() + 2
+        while backend.outstanding and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert "mock-llama" in backend.loaded_models
@@ -0,0 +1,41 @@
+import pytest
+import requests
+
+from ollama_transport import OllamaTransport, RequestHandle
+
+
+def _half_open(transport):
+    breaker = transport.breaker
+    breaker.state = "open"
+    breaker.opened_at = 0.0  # reset_timeout has long passed
+    return breaker
+
+
+def test_probe_that_raises_unexpectedly_lets_the_next_probe_through(monkeypatch):
+    transport = OllamaTransport("http://127.0.0.1:9")
+    breaker = _half_open(transport)
+    def broken(*args, **kwargs):
+        raise ValueError("bad payload")
+    monkeypatch.setattr(transport.session, "get", broken)
+    monkeypatch.setattr(transport.session, "post", broken)
+    with pytest.raises(ValueError):
+        transport.get("/api/tags", retries=0)
+    assert breaker.state == "half_open" and breaker.allow()
+    breaker.release_probe()
+    with pytest.raises(ValueError):
+        transport.post_stream("/api/generate", {})
+    assert breaker.allow()
+
+
+def test_aborted_probe_lets_the_next_probe_through(monkeypatch):
+    transport = OllamaTransport("http://127.0.0.1:9")
+    breaker = _half_open(transport)
+    handle = RequestHandle()
+    def aborted(*args, **kwargs):
+        handle.abort()
+        raise requests.ConnectionError("aborted")
+    monkeypatch.setattr(transport.session, "post", aborted)
+    with pytest.raises(requests.ConnectionError):
+        transport.post_stream("/api/generate", {}, handle=handle)
+    assert breaker.state == "half_open" and breaker.failures == 0
+    assert breaker.allow()
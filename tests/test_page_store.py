@@ -0,0 +1,47 @@
+import asyncio
+import threading
+
+from bench.discord_fakes import FakeChannel, FakeGuild, load_bot_core
+from page_store import PageStore
+
+bot_core = load_bot_core()
+
+
+def test_complete_flag_survives_a_spill(tmp_path):
+    store = PageStore(str(tmp_path), max_memory_chars=10)
+    store.put(1, ["a" * 8], author_id=5, complete=False)
+    store.put(2, ["b" * 8], author_id=5)  # Pushes 1 out to disk
+    store.flush()
+    assert (tmp_path / "1.json").exists()
+    entry = store.get(1)
+    assert entry["complete"] is False and entry["pages"] == ["a" * 8]
+
+
+def test_entry_queued_for_the_writer_can_be_read_back_and_removed(tmp_path):
+    store = PageStore(str(tmp_path), max_memory_chars=10)
+    writer_free = threading.Event()
+    store._writer.submit(writer_free.wait)  # Nothing is written until the checks below are done
+    store.put(1, ["a" * 8], author_id=5)
+    store.put(2, ["b" * 8], author_id=5)  # 1 waits for the writer
+    assert store.get(1)["pages"] == ["a" * 8]  # Back in memory; 2 waits now
+    store.put(3, ["c" * 8], author_id=5)  # 1 waits again
+    store.remove(2)
+    writer_free.set()
+    store.flush()
+    assert not (tmp_path / "2.json").exists()
+    assert store.get(2) is None
+    assert (tmp_path / "1.json").exists()
+    assert store.get(1)["pages"] == ["a" * 8]
+
+
+def test_paginated_replies_send_buttons_that_are_not_stored_per_message():
+    channel = FakeChannel(FakeGuild())
+    async def run():
+        msg = await bot_core.send_paginated(channel, ["one", "two"], author_id=5)
+        registered = bot_core.PaginatedView()
+        return msg, registered
+    msg, registered = asyncio.run(run())
+    view = msg.view
+    assert isinstance(view, bot_core.PageButtons) and not view.is_dispatchable()
+    assert [item.custom_id for item in view.children] == [item.custom_id for item in registered.children]
+    assert [item.disabled for item in view.children] == [True, False]
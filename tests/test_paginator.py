@@ -0,0 +1,33 @@
+from paginator import StreamingPaginator, paginate_stream
+
+
+def _pages(text, max_chars=30):
+    # Token-sized chunks, as a model streams them
+    return list(paginate_stream((text[i:i + 3] for i in range(0, len(text), 3)), max_chars))
+
+
+def test_block_opened_at_a_page_break_starts_on_the_next_page():
+    pages = _pages("intro text here\n```py\nprint(123456789012345678901234)\n```\n")
+    assert pages[0] == "intro text here\n"
+    assert all(page.count("```") % 2 == 0 for page in pages)
+    assert not any("```py\n```" in page for page in pages)
+    assert pages[1].startswith("```py\nprint(")
+
+
+def test_block_still_open_at_the_end_is_closed():
+    paginator = StreamingPaginator(100)
+    pages = paginator.feed("Here:\n```python\nprint(1)\n") + paginator.finish()
+    assert pages == ["Here:\n```python\nprint(1)\n```"]
+
+
+def test_fence_with_nothing_after_it_at_the_end_is_dropped():
+    paginator = StreamingPaginator(100)
+    assert paginator.feed("Done.\n```\n") + paginator.finish() == ["Done.\n"]
+
+
+def test_long_block_is_closed_and_reopened_on_every_page():
+    pages = _pages("```js\n" + "let x = 1;\n" * 12 + "```\n")
+    assert len(pages) > 2
+    for page in pages:
+        assert page.startswith("```js\n") and page.rstrip("\n").endswith("```")
+        assert len(page) <= 30
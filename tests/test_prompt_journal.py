@@ -0,0 +1,22 @@
+import utils
+from bot_control import dispatch
+from prompt_journal import get_prompt_journal, PromptJournal
+
+
+def test_disabled_journal_is_not_looked_up_again_until_a_reload(monkeypatch):
+    utils.save_app_config({"prompt_journal_enabled": False})
+    reads = []
+    load_app_config = utils.load_app_config
+    monkeypatch.setattr(utils, "load_app_config", lambda: reads.append(1) or load_app_config())
+    assert get_prompt_journal() is None
+    assert get_prompt_journal() is None
+    assert len(reads) == 1
+
+    utils.save_app_config({"prompt_journal_enabled": True})
+    assert get_prompt_journal() is None  # Still cached
+    dispatch("reload_config", {})
+    journal = get_prompt_journal()
+    try:
+        assert isinstance(journal, PromptJournal)
+    finally:
+        journal.close()
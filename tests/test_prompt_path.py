@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+from bench.discord_fakes import FakeChannel, FakeGuild, FakeMember, load_bot_core
+from bench.mock_ollama import MockOllama, WORDS
+from ollama_api import OllamaClient
+
+bot_core = load_bot_core()
+
+
+def _prompt(mock, content, config, during=None):
+    """Runs handle_ollama_prompt for a message in a fake channel; `during(message)` runs alongside it."""
+    guild = FakeGuild()
+    channel = FakeChannel(guild)
+    message = channel.incoming(content, FakeMember(guild, "alice"))
+    async def run():
+        task = asyncio.create_task(bot_core.handle_ollama_prompt(message, config, OllamaClient(mock.url)))
+        if during is not None:
+            await during(message)
+        return await task
+    return channel, asyncio.run(run())
+
+
+def test_prompt_is_answered_in_the_channel():
+    with MockOllama(tokens_per_second=500, first_token_latency=0.01) as mock:
+        channel, reason = _prompt(mock, "Tell me a joke", {"default_model": "mock-llama", "num_predict": 5})
+    assert reason is None
+    thinking, reply = channel.sent
+    assert thinking.deleted
+    words = reply.content.split()
+    assert len(words) == 5 and set(words) <= set(WORDS)
+    assert mock.requests == 1
+
+
+def test_cancel_while_the_model_loads_ends_the_prompt():
+    async def cancel_soon(message):
+        await asyncio.sleep(0.3)
+        assert bot_core.active_generations.cancel(message.id, "admin")
+    with MockOllama(load_time=5.0) as mock:
+        started = time.monotonic()
+        channel, reason = _prompt(mock, "Tell me a joke", {"default_model": "mock-llama"}, during=cancel_soon)
+        elapsed = time.monotonic() - started
+    assert reason == "admin"
+    assert elapsed < 2
+    assert [message.deleted for message in channel.sent] == [True]  # Only the Thinking message, removed
+    assert not bot_core.active_generations.by_message
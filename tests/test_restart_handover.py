@@ -0,0 +1,59 @@
+import asyncio
+
+from bench.discord_fakes import FakeChannel, FakeGuild, FakeMember, load_bot_core
+from prompt_queue import PromptHandover, PromptItem
+
+bot_core = load_bot_core()
+
+
+def _replacement(monkeypatch, handover):
+    enqueued, resumed = [], []
+    async def enqueue_prompt(message, config, ollama, queue, resumed=False):
+        enqueued.append(message.id)
+    async def resume_prompt(bot_instance, item, ollama, queue):
+        resumed.append(item.message_id)
+    async def change_presence(**kwargs):
+        pass
+    monkeypatch.setattr(bot_core, "enqueue_prompt", enqueue_prompt)
+    monkeypatch.setattr(bot_core, "resume_prompt", resume_prompt)
+    bot = bot_core.create_bot(handover=handover)
+    bot.change_presence = change_presence
+    guild = FakeGuild()
+    channel = FakeChannel(guild)
+    bot._connection.user = channel.bot_user
+    return bot, channel, FakeMember(guild, "alice"), enqueued, resumed
+
+
+def _item(message_id):
+    return PromptItem(message_id, 1, 2, 3, "alice", "hi", "llama3")
+
+
+def test_replacement_ignores_messages_until_it_takes_the_handover(monkeypatch):
+    handover = PromptHandover()
+    bot, channel, alice, enqueued, resumed = _replacement(monkeypatch, handover)
+    early = channel.incoming("hello", alice, mentions_bot=True)
+    late = channel.incoming("hello again", alice, mentions_bot=True)
+    async def run():
+        await bot.on_message(early)  # Before on_ready: the old instance still answers this one
+        handover.put(_item(early.id))
+        await bot.on_ready()
+        await bot.on_message(late)
+        await asyncio.sleep(0)  # Let the resume tasks run
+    asyncio.run(run())
+    assert enqueued == [late.id]
+    assert resumed == [early.id]
+    assert handover.closed
+
+
+def test_handed_over_prompts_are_resumed_once(monkeypatch):
+    handover = PromptHandover()
+    bot, channel, alice, enqueued, resumed = _replacement(monkeypatch, handover)
+    handover.put(_item(10))
+    handover.put(_item(11))
+    handover.put(_item(10))
+    async def run():
+        bot.prompt_queue._running[11] = _item(11)  # Already running here
+        await bot.on_ready()
+        await asyncio.sleep(0)
+    asyncio.run(run())
+    assert resumed == [10]
@@ -0,0 +1,44 @@
+import queue
+import threading
+
+import bot_control
+from shard_manager import ShardManager, _serve_commands
+
+
+class _AliveProcess:
+    def is_alive(self):
+        return True
+
+
+def test_request_runs_the_command_in_every_group(monkeypatch):
+    calls = []
+    def reload_config(guild_id=None):
+        calls.append(guild_id)
+        return True
+    def guild_roles(guild_id):
+        if threading.current_thread().name != "group-1":
+            raise bot_control.ControlError(f"Server {guild_id} is not available in this process.")
+        return ["Admin"]
+    monkeypatch.setitem(bot_control.COMMANDS, "reload_config", reload_config)
+    monkeypatch.setitem(bot_control.COMMANDS, "guild_roles", guild_roles)
+
+    manager = ShardManager(shard_count=4, processes=2)
+    manager._reports = queue.Queue()
+    manager._processes = [_AliveProcess(), _AliveProcess()]
+    manager._commands = [queue.Queue(), queue.Queue()]
+    for index, commands in enumerate(manager._commands):
+        threading.Thread(target=_serve_commands, args=(index, commands, manager._reports), name=f"group-{index}", daemon=True).start()
+    threading.Thread(target=manager._collect_reports, daemon=True).start()
+    try:
+        assert manager.request("reload_config", {"guild_id": 7}) == {
+            0: {"group": 0, "reply": 1, "result": True},
+            1: {"group": 1, "reply": 1, "result": True},
+        }
+        assert calls == [7, 7]
+        replies = manager.request("guild_roles", {"guild_id": 7})
+        assert "error" in replies[0]
+        assert replies[1]["result"] == ["Admin"]
+    finally:
+        manager._stop_event.set()
+        for commands in manager._commands:
+            commands.put(None)
@@ -0,0 +1,9 @@
+from utils import GENERATION_DEFAULTS, get_generation_options
+
+
+def test_configs_without_budget_keys_are_not_capped():
+    assert get_generation_options({"default_model": "llama3"}) == {}
+
+
+def test_new_configs_get_the_default_budget():
+    assert get_generation_options(dict(GENERATION_DEFAULTS)) == {"num_predict": GENERATION_DEFAULTS["num_predict"]}
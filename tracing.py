@@ -0,0 +1,141 @@
+"""
+Per-request tracing for Silas Blue.
+A trace follows one prompt from on_message to the last Discord send and records a span
+for each stage (permissions, queueing, Ollama's own load/prompt eval/eval timings,
+Discord sends). The current trace travels in a context variable, so stages deep in the
+call chain can add spans without it being passed around. Finished traces are kept in a
+ring buffer for the GUI and the admin API, and can be exported as JSON lines.
+"""
+
+import json
+import time
+import itertools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+_current_trace = contextvars.ContextVar("silasblue_trace", default=None)
+_trace_ids = itertools.count(1)
+
+# Ollama reports these on the final chunk, in nanoseconds
+OLLAMA_TIMINGS = ("load_duration", "prompt_eval_duration", "eval_duration")
+
+
+class Trace:
+    """One traced request: a name, attributes and spans with offsets from the trace start."""
+
+    def __init__(self, name, **attrs):
+        self.id = next(_trace_ids)
+        self.name = name
+        self.attrs = attrs
+        self.started = time.time()
+        self.duration = None
+        self.spans = []
+        self._t0 = time.perf_counter()
+
+    def add_span(self, name, duration, start=None, **attrs):
+        """
+        Records a finished span. `start` is a time.perf_counter() value; leave it out for
+        durations reported by something else (such as Ollama), which have no offset.
+        """
+        offset = round(start - self._t0, 6) if start is not None else None
+        self.spans.append({"name": name, "offset": offset, "duration": round(duration, 6), **attrs})
+
+    @contextmanager
+    def span(self, name, **attrs):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, time.perf_counter() - start, start, **attrs)
+
+    def finish(self, **attrs):
+        self.attrs.update(attrs)
+        self.duration = round(time.perf_counter() - self._t0, 6)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "started": self.started,
+            "duration": self.duration,
+            "attrs": dict(self.attrs),
+            "spans": list(self.spans),
+        }
+
+
+class TraceBuffer:
+    """Keeps the last `size` finished traces."""
+
+    def __init__(self, size=500):
+        self._traces = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, trace):
+        with self._lock:
+            self._traces.append(trace)
+
+    def recent(self, limit=50):
+        with self._lock:
+            traces = list(self._traces)[-limit:]
+        return [trace.to_dict() for trace in reversed(traces)]
+
+    def slowest(self, limit=20):
+        with self._lock:
+            traces = sorted(self._traces, key=lambda t: t.duration, reverse=True)[:limit]
+        return [trace.to_dict() for trace in traces]
+
+    def export_jsonl(self, path):
+        """Appends every buffered trace to `path`, one JSON object per line. Returns the count."""
+        with self._lock:
+            traces = list(self._traces)
+        with open(path, "a", encoding="utf-8") as f:
+            for trace in traces:
+                f.write(json.dumps(trace.to_dict()) + "\n")
+        return len(traces)
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+
+TRACES = TraceBuffer()
+
+
+def start_trace(name, **attrs):
+    """Starts a trace and makes it current for this task (or thread)."""
+    trace = Trace(name, **attrs)
+    _current_trace.set(trace)
+    return trace
+
+def current_trace():
+    return _current_trace.get()
+
+def finish_trace(trace, **attrs):
+    """Finishes `trace` and adds it to the ring buffer."""
+    trace.finish(**attrs)
+    TRACES.add(trace)
+
+@contextmanager
+def span(name, **attrs):
+    """Times a stage of the current trace; does nothing when there is no trace."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    with trace.span(name, **attrs):
+        yield
+
+def record_ollama_timings(chunk):
+    """Adds Ollama's reported stage durations from a final chunk to the current trace."""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    for key in OLLAMA_TIMINGS:
+        if key in chunk:
+            trace.add_span("ollama." + key[:-len("_duration")], chunk[key] / 1e9)
+    if "eval_count" in chunk:
+        trace.attrs["eval_count"] = chunk["eval_count"]
+    if "prompt_eval_count" in chunk:
+        trace.attrs["prompt_eval_count"] = chunk["prompt_eval_count"]
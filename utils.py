@@ -6,6 +6,7 @@ Handles config loading/saving and paths.
 import os
 import json
 from ollama_api import OllamaClient
+from metrics import CONFIG_LOAD_TIME, CONFIG_SAVE_TIME
 import psutil
 import logging
 import sys
@@ -21,9 +22,24 @@ def get_resource_path(relative_path):
 
 CONFIG_DIR = get_resource_path("config")
 
+# Per-guild generation budget defaults, written into the config of each new guild. 0/None
+# means "use the model's own default" for num_predict, num_ctx and temperature, "no limit"
+# for generation_timeout and max_pages, and "never" for attachment_pages (replies longer
+# than that many pages are sent as a .md file). A key missing from an older config counts
+# as 0/None, so servers set up before these settings existed keep replying without caps.
+GENERATION_DEFAULTS = {
+    "num_predict": 1024,
+    "num_ctx": 0,
+    "temperature": None,
+    "generation_timeout": 120,
+    "max_pages": 5,
+    "attachment_pages": 3
+}
+
 def get_config_path(guild_id):
     return os.path.join(CONFIG_DIR, f"{guild_id}.json")
 
+@CONFIG_LOAD_TIME.time()
 def load_config(guild_id):
     """
     Loads the config for a given guild/server.
@@ -44,7 +60,8 @@ def load_config(guild_id):
             "pagination_enabled": True,
             "pagination_max_chars": 2000,
             "random_prompt_enabled": False,
-            "random_prompt_probability": 0
+            "random_prompt_probability": 0,
+            **GENERATION_DEFAULTS
         }
         save_config(guild_id, config)
         return config
@@ -56,6 +73,7 @@ def load_config(guild_id):
         save_config(guild_id, config)
     return config
 
+@CONFIG_SAVE_TIME.time()
 def save_config(guild_id, config):
     """
     Saves the config for a given guild/server.
@@ -85,6 +103,23 @@ def save_app_config(config):
     with open(path, "w") as f:
         json.dump(config, f, indent=2)
 
+def get_generation_options(config):
+    """
+    Builds the Ollama `options` dict for a guild config, leaving out unset values
+    so the model's own defaults apply.
+    """
+    options = {}
+    num_predict = config.get("num_predict")
+    if num_predict:
+        options["num_predict"] = int(num_predict)
+    num_ctx = config.get("num_ctx")
+    if num_ctx:
+        options["num_ctx"] = int(num_ctx)
+    temperature = config.get("temperature")
+    if temperature is not None:
+        options["temperature"] = float(temperature)
+    return options
+
 # Utility to set the default model for a guild
 
 def set_default_model(guild_id, model_name):